@@ -1,20 +1,43 @@
 # api/document_routes.py
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Dict, Any, List, Optional
 import json
 import os
-from core.document_generator import generate_document_content
-from core.template_manager import get_all_templates, load_template_by_id
+import time
+import asyncio
+import uuid
+from string import Formatter
+from core.document_generator import (
+    generate_document_content, stream_document_content, is_hybrid, render_fixed_sections, render_section
+)
+from core.translator import translate_text, translate_sections, translation_cache
+from core.template_manager import get_all_templates, load_template_by_id, save_template, get_template_version
+from core.response_cache import ResponseCache, make_cache_key
+from core.bulk_generator import bulk_jobs, parse_rows, stream_bulk_zip
+from core.admission import AdmissionController, Overloaded
+from config import Config
 
 router = APIRouter()
 
+response_cache = (
+    ResponseCache(Config.DOCUMENT_CACHE_DIR, Config.DOCUMENT_CACHE_MAX_ENTRIES)
+    if Config.DOCUMENT_CACHE_ENABLED else None
+)
+# Blocking generation runs here so the event loop (and /templates) stays responsive
+admission = AdmissionController(Config.GENERATION_WORKERS, Config.GENERATION_MAX_QUEUE)
+
 # Models for request/response
 class DocumentRequest(BaseModel):
     template_type: str
     language: str = "English"
     formality: str = "formal"
     details: Dict[str, Any]
+    regenerate: bool = False  # bypass the response cache
+
+class MultilingualRequest(DocumentRequest):
+    languages: List[str] = []  # target languages; defaults to all supported languages
 
 class DocumentResponse(BaseModel):
     content: str
@@ -29,6 +52,39 @@ class TemplateInfo(BaseModel):
     description: str
     required_fields: List[Dict[str, str]]
 
+def generate_with_cache(template, language, formality, details, regenerate=False):
+    """Generate content, consulting the response cache when it is enabled.
+
+    Returns (content, timings, cache_key, cache_hit).
+    """
+    version = get_template_version(template["id"])
+    cache_key = None
+    if response_cache is not None:
+        cache_key = make_cache_key(template["id"], version, language, formality, details)
+        if not regenerate:
+            content = response_cache.get(cache_key)
+            if content is not None:
+                return content, {}, cache_key, True
+
+    # Generate the document content
+    timings = {}
+    content = generate_document_content(
+        template=template,
+        language=language,
+        formality=formality,
+        details=details,
+        version=version,
+        metrics=timings
+    )
+    if response_cache is not None:
+        response_cache.put(cache_key, content)
+    return content, timings, cache_key, False
+
+@router.get("/queue-metrics")
+async def get_queue_metrics():
+    """Generation pool occupancy, rejections, queue wait and service time"""
+    return admission.metrics()
+
 @router.get("/templates", response_model=List[TemplateInfo])
 async def get_templates():
     """Get all available document templates"""
@@ -45,10 +101,8 @@ async def get_templates():
 
     return template_list
 
-@router.post("/generate", response_model=DocumentResponse)
-async def generate_document(request: DocumentRequest):
-    """Generate a document based on template and provided details"""
-    # Load the template
+def load_validated_template(request: DocumentRequest):
+    """Load the requested template, raising 404/400 for unknown templates or missing fields"""
     template = load_template_by_id(request.template_type)
     if not template:
         raise HTTPException(status_code=404, detail=f"Template '{request.template_type}' not found")
@@ -61,13 +115,42 @@ async def generate_document(request: DocumentRequest):
                 status_code=400, 
                 detail=f"Missing required field: {field_name} - {field.get('description', '')}"
             )
+    return template
 
-    # Generate the document content
-    content = generate_document_content(
-        template=template,
-        language=request.language,
-        formality=request.formality,
-        details=request.details
+def overloaded_response(e):
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+async def run_admitted(fn, *args):
+    """Run blocking generation in the bounded pool, answering 429 when the queue is full"""
+    try:
+        return await admission.run(fn, *args)
+    except Overloaded as e:
+        raise overloaded_response(e)
+
+async def run_when_admitted(fn, *args):
+    """Run blocking generation in the bounded pool, waiting for room instead of failing.
+
+    For work that is already under way (translations of an accepted
+    document, rows of a bulk job) and should queue behind other requests.
+    """
+    while True:
+        try:
+            return await admission.run(fn, *args)
+        except Overloaded as e:
+            await asyncio.sleep(e.retry_after)
+
+def sse_event(event, data):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post("/generate", response_model=DocumentResponse)
+async def generate_document(request: DocumentRequest):
+    """Generate a document based on template and provided details"""
+    template = load_validated_template(request)
+
+    content, timings, cache_key, cache_hit = await run_admitted(
+        generate_with_cache, template, request.language, request.formality,
+        request.details, request.regenerate
     )
 
     # Build response
@@ -78,21 +161,258 @@ async def generate_document(request: DocumentRequest):
         formality=request.formality,
         metadata={
             "template_name": template["name"],
-            "user_inputs": request.details
+            "user_inputs": request.details,
+            "timings": timings,
+            "cache": {
+                "enabled": response_cache is not None,
+                "hit": cache_hit,
+                "key": cache_key
+            }
         }
     )
 
     return response
 
+@router.post("/generate-stream")
+async def generate_document_stream(request: DocumentRequest, http_request: Request):
+    """Generate a document and stream it as Server-Sent Events.
+
+    Emits ``token`` events with text chunks, then a ``done`` event carrying
+    the metadata (or an ``error`` event). Generation stops as soon as the
+    client disconnects.
+    """
+    template = load_validated_template(request)
+    version = get_template_version(template["id"])
+
+    cache_key = None
+    if response_cache is not None:
+        cache_key = make_cache_key(template["id"], version, request.language, request.formality, request.details)
+    cached = None
+    if cache_key is not None and not request.regenerate:
+        cached = response_cache.get(cache_key)
+
+    timings = {}
+    tokens = None
+    if cached is None:
+        # Admit before streaming so overload is a plain 429
+        try:
+            tokens = admission.stream(
+                stream_document_content, template, request.language, request.formality,
+                request.details, version, timings
+            )
+        except Overloaded as e:
+            raise overloaded_response(e)
+
+    async def events():
+        metadata = {
+            "template_name": template["name"],
+            "cache": {"enabled": response_cache is not None, "hit": False, "key": cache_key}
+        }
+        if cached is not None:
+            metadata["cache"]["hit"] = True
+            yield sse_event("token", {"text": cached})
+            yield sse_event("done", {"metadata": metadata})
+            return
+
+        parts = []
+        try:
+            async for chunk in tokens:
+                if await http_request.is_disconnected():
+                    print(f"Client disconnected, stopping generation for '{template['id']}'")
+                    return
+                parts.append(chunk)
+                yield sse_event("token", {"text": chunk})
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e)})
+            return
+        finally:
+            # Stops the worker, which closes the model connection
+            await tokens.aclose()
+
+        if response_cache is not None:
+            response_cache.put(cache_key, "".join(parts))
+        metadata["timings"] = timings
+        yield sse_event("done", {"metadata": metadata})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def split_fixed_sections(template, details, content, language="English"):
+    """(header, translatable text, footer) of a generated document.
+
+    For hybrid templates only the LLM-written body goes through the
+    document translation; the fixed sections are rebuilt per language from
+    translated section templates, so names, addresses and dates stay exactly
+    as entered.
+    """
+    if is_hybrid(template, language):
+        header, footer = render_fixed_sections(template, details, language)
+        if content.startswith(header) and content.endswith(footer):
+            return header, content[len(header):len(content) - len(footer)], footer
+    return "", content, ""
+
+@router.post("/generate-multilingual")
+async def generate_document_multilingual(request: MultilingualRequest, http_request: Request):
+    """Generate a document once in ``language`` and translate it into ``languages``.
+
+    Streams Server-Sent Events: a ``document`` event per language as soon as
+    it is ready (the source language first), ``error`` events for failed
+    translations, then ``done``. Translations run in parallel and are cached
+    per source text and language.
+    """
+    template = load_validated_template(request)
+    source_language = request.language
+    targets = request.languages or list(Config.LANGUAGES.values())
+    targets = [lang for lang in dict.fromkeys(targets) if lang.lower() != source_language.lower()]
+
+    # Admit the source generation before streaming so overload is a plain 429
+    start = time.perf_counter()
+    content, timings, _, cache_hit = await run_admitted(
+        generate_with_cache, template, source_language, request.formality,
+        request.details, request.regenerate
+    )
+
+    async def events():
+        yield sse_event("document", {
+            "language": source_language,
+            "content": content,
+            "source": True,
+            "cache_hit": cache_hit,
+            "timings": timings
+        })
+
+        header, text, footer = split_fixed_sections(template, request.details, content, source_language)
+        semaphore = asyncio.Semaphore(Config.TRANSLATION_MAX_CONCURRENCY)
+
+        async def translate(language):
+            async with semaphore:
+                metrics = {}
+                try:
+                    translation, hit = await run_when_admitted(
+                        translate_text, text, source_language, language, translation_cache, metrics
+                    )
+                    if not (header or footer):
+                        return language, translation, hit, metrics, None
+                    sections, sections_hit = await run_when_admitted(
+                        translate_sections, template, language, translation_cache
+                    )
+                    document = (render_section(sections.get("header", ""), request.details)
+                                + translation + render_section(sections.get("footer", ""), request.details))
+                    return language, document, hit and sections_hit, metrics, None
+                except Exception as e:
+                    return language, None, False, metrics, str(e)
+
+        tasks = [asyncio.create_task(translate(language)) for language in targets]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                language, translated, hit, metrics, error = await next_done
+                if await http_request.is_disconnected():
+                    return
+                if error is None:
+                    yield sse_event("document", {
+                        "language": language,
+                        "content": translated,
+                        "source": False,
+                        "cache_hit": hit,
+                        "timings": metrics
+                    })
+                else:
+                    yield sse_event("error", {"language": language, "detail": error})
+        finally:
+            # Client went away: skip translations that have not started
+            for task in tasks:
+                task.cancel()
+
+        yield sse_event("done", {
+            "languages": [source_language] + targets,
+            "total_ms": round((time.perf_counter() - start) * 1000, 2)
+        })
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/bulk-generate")
+async def bulk_generate(
+    template_id: str = Form(...),
+    language: str = Form("English"),
+    formality: str = Form("formal"),
+    filename_field: Optional[str] = Form(None),
+    csv_file: UploadFile = File(...)
+):
+    """Mail merge: generate one document per CSV row and stream them back as a ZIP.
+
+    Every row is validated before generation starts. The ZIP ends with
+    report.csv listing the outcome of each row; progress can be polled at
+    /bulk-generate/{job_id}/progress using the X-Job-Id response header.
+    """
+    template = load_template_by_id(template_id)
+    if not template:
+        raise HTTPException(status_code=404, detail=f"Template '{template_id}' not found")
+
+    try:
+        rows, errors = parse_rows(await csv_file.read(), template["required_fields"])
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="CSV must be UTF-8 encoded")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not rows:
+        raise HTTPException(status_code=400, detail={"message": "No valid rows to generate", "errors": errors})
+
+    async def generate(details):
+        content, _, _, _ = await run_when_admitted(generate_with_cache, template, language, formality, details)
+        return content
+
+    job_id = uuid.uuid4().hex
+    stream = stream_bulk_zip(
+        job_id, rows, errors, generate,
+        max_concurrency=Config.BULK_MAX_CONCURRENCY,
+        filename_field=filename_field,
+        max_finished_jobs=Config.BULK_MAX_FINISHED_JOBS
+    )
+    return StreamingResponse(
+        stream,
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="{template_id}_bulk.zip"',
+            "X-Job-Id": job_id
+        }
+    )
+
+@router.get("/bulk-generate/{job_id}/progress")
+async def bulk_progress(job_id: str):
+    """Progress of a bulk generation job"""
+    progress = bulk_jobs.get(job_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return progress
+
+def check_placeholders(where, text, allowed):
+    """Reject template text that does not parse or names fields the template lacks"""
+    if not isinstance(text, str):
+        raise HTTPException(status_code=400, detail=f"{where} must be a string")
+    try:
+        names = {name for _, name, _, _ in Formatter().parse(text) if name is not None}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"{where} is not a valid template: {str(e)}")
+    if "" in names or any(not name.isidentifier() for name in names):
+        raise HTTPException(status_code=400, detail=f"{where} has an empty or invalid placeholder")
+    unknown = names - allowed
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{where} uses unknown fields: {', '.join(sorted(unknown))}"
+        )
+
 @router.post("/upload-template")
 async def upload_template(template_file: UploadFile = File(...)):
     """Upload a new document template"""
     try:
-        # Create templates directory if it doesn't exist
-        templates_dir = "templates"
-        if not os.path.exists(templates_dir):
-            os.makedirs(templates_dir)
-
         content = await template_file.read()
         template_data = json.loads(content)
 
@@ -102,12 +422,31 @@ async def upload_template(template_file: UploadFile = File(...)):
             if key not in template_data:
                 raise HTTPException(status_code=400, detail=f"Template missing required key: {key}")
 
-        # Save template
-        with open(os.path.join(templates_dir, f"{template_data['id']}.json"), 'w', encoding='utf-8') as f:
-            json.dump(template_data, f, indent=4)
+        # Hybrid templates: the body prompt and fixed sections may only reference the template's fields
+        if "body_prompt_template" in template_data:
+            field_names = {field["name"] for field in template_data["required_fields"]}
+            check_placeholders(
+                "body_prompt_template", template_data["body_prompt_template"], field_names | {"formality", "language"}
+            )
+            sections = template_data.get("sections", {})
+            if not isinstance(sections, dict):
+                raise HTTPException(status_code=400, detail="Template 'sections' must be an object")
+            localized = template_data.get("localized_sections", {})
+            if not isinstance(localized, dict) or not all(isinstance(v, dict) for v in localized.values()):
+                raise HTTPException(status_code=400, detail="Template 'localized_sections' must map languages to sections")
+            for section_name, section_text in sections.items():
+                check_placeholders(f"Section '{section_name}'", section_text, field_names)
+            for language, language_sections in localized.items():
+                for section_name, section_text in language_sections.items():
+                    check_placeholders(f"Section '{section_name}' ({language})", section_text, field_names)
+
+        # Save template and refresh the in-memory registry
+        save_template(template_data)
 
         return {"message": f"Template '{template_data['name']}' uploaded successfully"}
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON format")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
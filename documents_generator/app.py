@@ -3,6 +3,8 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 from api.document_routes import router as document_router
+from teaching_shared.llm_runtime import llm_metrics, warm_up_in_background
+from config import Config
 
 # Initialize FastAPI app
 app = FastAPI(title="Teacher Document Generation API")
@@ -19,6 +21,16 @@ app.add_middleware(
 # Include routers
 app.include_router(document_router, prefix="/api/document_routes", tags=["documents"])
 
+@app.on_event("startup")
+async def preload_model():
+    # Templates differ per request, so only the model load is warmed here
+    warm_up_in_background(Config.OLLAMA_MODEL, Config.OLLAMA_BASE_URL, Config.OLLAMA_KEEP_ALIVE)
+
+@app.get("/llm-metrics")
+async def get_llm_metrics():
+    """Warm-up probe (cold/warm) and time to first token and latency of recent requests"""
+    return llm_metrics
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to Teacher Document Generation API for Government of India Teachers"}
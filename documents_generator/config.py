@@ -0,0 +1,36 @@
+import os
+
+class Config:
+    OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama2")
+    OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+    # How long Ollama keeps the model loaded after a request (e.g. "30m", "-1")
+    OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+    # Opt-in cache of generated documents, keyed by template version and inputs
+    DOCUMENT_CACHE_ENABLED = os.getenv("DOCUMENT_CACHE_ENABLED", "false").lower() == "true"
+    DOCUMENT_CACHE_DIR = os.getenv("DOCUMENT_CACHE_DIR", os.path.join("cache", "documents"))
+    DOCUMENT_CACHE_MAX_ENTRIES = int(os.getenv("DOCUMENT_CACHE_MAX_ENTRIES", "500"))
+
+    # Admission control: concurrent generations and how many may wait before 429
+    GENERATION_WORKERS = int(os.getenv("GENERATION_WORKERS", "2"))
+    GENERATION_MAX_QUEUE = int(os.getenv("GENERATION_MAX_QUEUE", "8"))
+
+    # Documents generated in parallel per bulk (mail-merge) request
+    BULK_MAX_CONCURRENCY = int(os.getenv("BULK_MAX_CONCURRENCY", "4"))
+    # Finished bulk jobs whose progress stays available for polling
+    BULK_MAX_FINISHED_JOBS = int(os.getenv("BULK_MAX_FINISHED_JOBS", "100"))
+
+    # Supported Languages
+    LANGUAGES = {
+        'en': 'English',
+        'hi': 'Hindi',
+        'ta': 'Tamil',
+        'te': 'Telugu',
+        'bn': 'Bengali',
+        'mr': 'Marathi'
+    }
+
+    # Multilingual mode: the document is generated once and translated per language
+    TRANSLATION_CACHE_DIR = os.getenv("TRANSLATION_CACHE_DIR", os.path.join("cache", "translations"))
+    TRANSLATION_CACHE_MAX_ENTRIES = int(os.getenv("TRANSLATION_CACHE_MAX_ENTRIES", "2000"))
+    TRANSLATION_MAX_CONCURRENCY = int(os.getenv("TRANSLATION_MAX_CONCURRENCY", "3"))
@@ -0,0 +1,156 @@
+# core/admission.py
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+class Overloaded(Exception):
+    """Raised when the queue is full; ``retry_after`` is a hint in seconds"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Generation queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 2)
+
+class AdmissionController:
+    """Bounded worker pool with a bounded queue in front of blocking generation.
+
+    At most ``max_workers`` jobs run at once and at most ``max_queue`` wait.
+    Anything beyond that is rejected immediately with ``Overloaded`` instead of
+    piling up, so the event loop and cheap endpoints stay responsive. Queue
+    wait and service time are recorded separately.
+    """
+
+    def __init__(self, max_workers=2, max_queue=8, window=1000):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="generation")
+        self._lock = threading.Lock()
+        self._pending = 0  # queued + running
+        self._running = 0
+        self._queue_wait_ms = deque(maxlen=window)
+        self._service_ms = deque(maxlen=window)
+        self._counts = {"accepted": 0, "rejected": 0, "completed": 0, "failed": 0}
+
+    def retry_after(self):
+        """Seconds until a slot is likely to free up, from recent service times"""
+        service_s = (sum(self._service_ms) / len(self._service_ms) / 1000) if self._service_ms else 5.0
+        waves = max(1, self._pending - self.max_workers + 1) / self.max_workers
+        return max(1, math.ceil(service_s * waves))
+
+    def _admit(self):
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self._counts["rejected"] += 1
+                raise Overloaded(self.retry_after())
+            self._pending += 1
+            self._counts["accepted"] += 1
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    def _timed(self, submitted, fn, args):
+        started = time.perf_counter()
+        with self._lock:
+            self._running += 1
+            self._queue_wait_ms.append((started - submitted) * 1000)
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._service_ms.append((time.perf_counter() - started) * 1000)
+
+    def _submit(self, fn, args):
+        """Admit and queue ``fn(*args)``; the slot is freed when the work itself
+        finishes (or is cancelled before it starts), not when the caller stops
+        waiting, so abandoned requests still count against the limits"""
+        self._admit()
+        future = self._executor.submit(self._timed, time.perf_counter(), fn, args)
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, fn, *args):
+        """Run blocking ``fn(*args)`` in the pool, or raise ``Overloaded``"""
+        future = self._submit(fn, args)
+        try:
+            result = await asyncio.wrap_future(future)
+            self._counts["completed"] += 1
+            return result
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._counts["failed"] += 1
+            raise
+
+    def stream(self, fn, *args):
+        """Run blocking generator ``fn(*args)`` in the pool and return an async
+        iterator over what it yields, or raise ``Overloaded`` right away.
+
+        Closing the iterator stops the generator after its current item.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        stop = threading.Event()
+        done = object()
+
+        def produce():
+            items = fn(*args)
+            try:
+                for item in items:
+                    if stop.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, (item, None))
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, (done, e))
+                raise
+            finally:
+                items.close()
+            loop.call_soon_threadsafe(queue.put_nowait, (done, None))
+
+        future = self._submit(produce, ())
+
+        async def consume():
+            try:
+                while True:
+                    item, error = await queue.get()
+                    if error is not None:
+                        raise error
+                    if item is done:
+                        break
+                    yield item
+                self._counts["completed"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self._counts["failed"] += 1
+                raise
+            finally:
+                stop.set()
+                future.cancel()
+
+        return consume()
+
+    def metrics(self):
+        with self._lock:
+            queue_wait = sorted(self._queue_wait_ms)
+            service = sorted(self._service_ms)
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                **self._counts,
+                "queue_wait_ms": {"p50": _percentile(queue_wait, 0.5), "p95": _percentile(queue_wait, 0.95),
+                                  "max": _percentile(queue_wait, 1.0), "samples": len(queue_wait)},
+                "service_ms": {"p50": _percentile(service, 0.5), "p95": _percentile(service, 0.95),
+                               "max": _percentile(service, 1.0), "samples": len(service)},
+            }
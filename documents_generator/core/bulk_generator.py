@@ -0,0 +1,137 @@
+# core/bulk_generator.py
+import io
+import re
+import csv
+import json
+import time
+import asyncio
+import zipfile
+
+# job id -> progress counters, polled by the progress endpoint
+bulk_jobs = {}
+
+def _evict_finished(max_finished_jobs):
+    """Forget the oldest finished jobs so the progress store stays bounded"""
+    finished = sorted(
+        (progress["finished_at"], job_id) for job_id, progress in list(bulk_jobs.items())
+        if progress.get("finished_at") is not None
+    )
+    for _, job_id in finished[:max(0, len(finished) - max_finished_jobs)]:
+        bulk_jobs.pop(job_id, None)
+
+class _ZipStream(io.RawIOBase):
+    """Write-only, unseekable buffer so ZipFile can emit entries incrementally"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def parse_rows(csv_bytes, required_fields):
+    """Parse a mail-merge CSV and validate every row before any generation.
+
+    Returns (rows, errors): rows are (row_number, details) pairs ready to
+    generate, errors are (row_number, message) pairs. Raises ValueError if
+    required columns are missing altogether.
+    """
+    text = csv_bytes.decode("utf-8-sig")
+    reader = csv.DictReader(io.StringIO(text))
+    columns = [c.strip() for c in (reader.fieldnames or [])]
+    field_names = [field["name"] for field in required_fields]
+    missing = [name for name in field_names if name not in columns]
+    if missing:
+        raise ValueError(f"CSV is missing required columns: {', '.join(missing)}")
+
+    rows, errors = [], []
+    # Row numbers match the spreadsheet, with the header as row 1
+    for row_number, raw in enumerate(reader, start=2):
+        details = {k.strip(): (v or "").strip() for k, v in raw.items() if k}
+        empty = [name for name in field_names if not details.get(name)]
+        if empty:
+            errors.append((row_number, f"Empty required fields: {', '.join(empty)}"))
+        else:
+            rows.append((row_number, details))
+    return rows, errors
+
+def _filename(row_number, details, filename_field):
+    label = details.get(filename_field, "") if filename_field else ""
+    slug = re.sub(r"[^\w-]+", "_", label).strip("_")[:40]
+    return f"{row_number:04d}_{slug}.txt" if slug else f"{row_number:04d}.txt"
+
+async def stream_bulk_zip(job_id, rows, errors, generate, max_concurrency=4, filename_field=None,
+                          max_finished_jobs=100):
+    """Generate one document per row with bounded concurrency and yield ZIP
+    bytes as each document completes, ending with report.csv and summary.json.
+
+    ``generate`` is an async callable taking a row's details and returning
+    the document text (e.g. run through the admission controller). Progress of at most
+    ``max_finished_jobs`` finished jobs is kept for polling.
+    """
+    _evict_finished(max_finished_jobs)
+    progress = bulk_jobs[job_id] = {
+        "total": len(rows) + len(errors),
+        "completed": 0,
+        "failed": len(errors),
+        "status": "running",
+        "started_at": time.time(),
+    }
+    report = [(row_number, "invalid", "", message) for row_number, message in errors]
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(row_number, details):
+        async with semaphore:
+            try:
+                content = await generate(details)
+                return row_number, details, content, None
+            except Exception as e:
+                return row_number, details, None, str(e)
+
+    tasks = [asyncio.create_task(run(row_number, details)) for row_number, details in rows]
+    stream = _ZipStream()
+    try:
+        with zipfile.ZipFile(stream, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for next_done in asyncio.as_completed(tasks):
+                row_number, details, content, error = await next_done
+                if error is None:
+                    name = _filename(row_number, details, filename_field)
+                    archive.writestr(name, content)
+                    report.append((row_number, "ok", name, ""))
+                    progress["completed"] += 1
+                else:
+                    report.append((row_number, "failed", "", error))
+                    progress["failed"] += 1
+                yield stream.drain()
+
+            report_buffer = io.StringIO()
+            writer = csv.writer(report_buffer)
+            writer.writerow(["row", "status", "file", "error"])
+            writer.writerows(sorted(report))
+            archive.writestr("report.csv", report_buffer.getvalue())
+
+            elapsed = time.time() - progress["started_at"]
+            progress["status"] = "completed"
+            progress["elapsed_seconds"] = round(elapsed, 2)
+            archive.writestr("summary.json", json.dumps(progress, indent=2))
+        yield stream.drain()
+    finally:
+        # Client went away or generation finished: stop outstanding work
+        for task in tasks:
+            task.cancel()
+        if progress["status"] == "running":
+            progress["status"] = "cancelled"
+        progress["finished_at"] = time.time()
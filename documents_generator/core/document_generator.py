@@ -1,41 +1,194 @@
 # core/document_generator.py
-from langchain_community.llms import Ollama
+import threading
+import time
+from functools import lru_cache
+from string import Formatter
 from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
+from config import Config
+from teaching_shared.llm_runtime import request_timer
+
+_llm = None
+_llm_lock = threading.Lock()
+
+# (template id, hybrid) -> (template version, compiled chain)
+_chain_cache = {}
+_chain_lock = threading.Lock()
 
 # Initialize the LLM
 def get_llm():
-    """Get LLM instance with Ollama"""
-    try:
-        from langchain_ollama import OllamaLLM
-        return OllamaLLM(model="llama2")
-    except ImportError:
-        # Fallback for compatibility
-        from langchain_community.llms import Ollama
-        return Ollama(model="llama2")
-
-def generate_document_content(template, language, formality, details):
-    """Generate document content based on template and details"""
-    # Initialize LLM
-    llm = get_llm()
-
-    # Prepare the prompt template
-    prompt_template = PromptTemplate(
-        template=template["prompt_template"],
-        input_variables=["formality", "language"] + [field["name"] for field in template["required_fields"]]
+    """Get the shared LLM instance with Ollama (created once per process)"""
+    global _llm
+    if _llm is not None:
+        return _llm
+    with _llm_lock:
+        if _llm is None:
+            settings = {
+                "model": Config.OLLAMA_MODEL,
+                "base_url": Config.OLLAMA_BASE_URL,
+                "keep_alive": Config.OLLAMA_KEEP_ALIVE,
+                "callbacks": [request_timer]
+            }
+            try:
+                from langchain_ollama import OllamaLLM
+                _llm = OllamaLLM(**settings)
+            except ImportError:
+                # Fallback for compatibility
+                from langchain_community.llms import Ollama
+                _llm = Ollama(**settings)
+    return _llm
+
+@lru_cache(maxsize=256)
+def _compile_section(text):
+    """Split a section template into (literal, field name) pairs once"""
+    return tuple((literal, field) for literal, field, _, _ in Formatter().parse(text))
+
+def render_section(text, details):
+    """Fill a deterministic section from the field values, without the LLM"""
+    return "".join(
+        literal + (str(details.get(field, "")) if field else "")
+        for literal, field in _compile_section(text)
     )
 
-    # Prepare inputs for the prompt
-    prompt_inputs = {
+def section_templates(template, language="English"):
+    """Fixed section texts of a template in ``language``, or None if it has none.
+
+    ``sections`` are written in English; other languages come from
+    ``localized_sections``, keyed by language name.
+    """
+    if language.strip().lower() == "english":
+        return template.get("sections", {})
+    for name, sections in template.get("localized_sections", {}).items():
+        if name.strip().lower() == language.strip().lower():
+            return sections
+    return None
+
+def fixed_sections(template, language="English"):
+    """Header/footer templates of a hybrid template in ``language``.
+
+    Sections the template provides for the language are used as they are;
+    otherwise the English ones are translated once and cached. Returns None
+    for templates without a body prompt, or when the sections could not be
+    translated, in which case the LLM writes the whole document.
+    """
+    if "body_prompt_template" not in template:
+        return None
+    sections = section_templates(template, language)
+    if sections is not None:
+        return sections
+    try:
+        # Imported here: the translator builds on this module's LLM
+        from core.translator import translate_sections
+        return translate_sections(template, language)[0]
+    except Exception as e:
+        print(f"Could not translate fixed sections into {language}: {e}")
+        return None
+
+def is_hybrid(template, language="English"):
+    """Hybrid templates render fixed sections locally and only ask the LLM for the body"""
+    return fixed_sections(template, language) is not None
+
+def render_fixed_sections(template, details, language="English", sections=None):
+    """(header, footer) of a hybrid template"""
+    sections = sections if sections is not None else fixed_sections(template, language) or {}
+    return (render_section(sections.get("header", ""), details),
+            render_section(sections.get("footer", ""), details))
+
+def get_chain(template, version=None, hybrid=None):
+    """Get the compiled prompt | llm chain for a template.
+
+    ``hybrid`` selects the body-only prompt (default: whenever the template
+    has one). Chains are built once per template id and prompt kind and
+    rebuilt only when the template version changes (i.e. the template was
+    uploaded again).
+    """
+    if hybrid is None:
+        hybrid = "body_prompt_template" in template
+    key = (template["id"], hybrid)
+    cached = _chain_cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    with _chain_lock:
+        cached = _chain_cache.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        if hybrid:
+            prompt_template = PromptTemplate.from_template(template["body_prompt_template"])
+        else:
+            prompt_template = PromptTemplate(
+                template=template["prompt_template"],
+                input_variables=["formality", "language"] + [field["name"] for field in template["required_fields"]]
+            )
+        chain = prompt_template | get_llm()
+        _chain_cache[key] = (version, chain)
+        return chain
+
+def _prompt_inputs(language, formality, details):
+    return {
         "formality": formality,
         "language": language,
         **details
     }
 
-    # Create and run the chain
-    chain = LLMChain(llm=llm, prompt=prompt_template)
+def generate_document_content(template, language, formality, details, version=None, metrics=None):
+    """Generate document content based on template and details.
+
+    For hybrid templates the header and footer are rendered from the fields
+    (in ``language``, see ``fixed_sections``) and the LLM writes only the body. If ``metrics`` is a dict it receives
+    ``overhead_ms`` (time spent outside the model call) and ``llm_ms``.
+    """
+    start = time.perf_counter()
+    sections = fixed_sections(template, language)
+    chain = get_chain(template, version, hybrid=sections is not None)
+
+    # Prepare inputs for the prompt
+    prompt_inputs = _prompt_inputs(language, formality, details)
 
     # Generate content
-    result = chain.run(**prompt_inputs)
+    llm_start = time.perf_counter()
+    result = chain.invoke(prompt_inputs)
+    llm_end = time.perf_counter()
+
+    if sections is not None:
+        header, footer = render_fixed_sections(template, details, sections=sections)
+        result = header + result.strip() + footer
+
+    if metrics is not None:
+        metrics["llm_ms"] = round((llm_end - llm_start) * 1000, 2)
+        metrics["overhead_ms"] = round((llm_start - start + time.perf_counter() - llm_end) * 1000, 3)
+
+    return result
+
+def stream_document_content(template, language, formality, details, version=None, metrics=None):
+    """Generator yielding document text chunks as the model produces them.
+
+    Blocking; run it in a worker (``AdmissionController.stream``). Closing
+    the generator (e.g. when the client disconnects) closes the connection
+    to Ollama, which stops generation. If ``metrics`` is a dict it receives
+    ``ttft_ms`` and ``llm_ms``.
+    """
+    sections = fixed_sections(template, language)
+    chain = get_chain(template, version, hybrid=sections is not None)
+    header, footer = (
+        render_fixed_sections(template, details, sections=sections) if sections is not None else ("", "")
+    )
+    if header:
+        yield header
+
+    start = time.perf_counter()
+    first_token = None
+    for chunk in chain.stream(_prompt_inputs(language, formality, details)):
+        if first_token is None:
+            # The body should start right after the header
+            chunk = chunk.lstrip() if header else chunk
+            if not chunk:
+                continue
+            first_token = time.perf_counter()
+            if metrics is not None:
+                metrics["ttft_ms"] = round((first_token - start) * 1000, 2)
+        yield chunk
+    if metrics is not None:
+        metrics["llm_ms"] = round((time.perf_counter() - start) * 1000, 2)
 
-    return result
\ No newline at end of file
+    if footer:
+        yield footer
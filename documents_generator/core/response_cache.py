@@ -0,0 +1,73 @@
+# core/response_cache.py
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+def make_cache_key(template_id, template_version, language, formality, details):
+    """Canonical hash of everything that determines a generated document"""
+    canonical = json.dumps(
+        {
+            "template": template_id,
+            "version": template_version,
+            "language": language.strip().lower(),
+            "formality": formality.strip().lower(),
+            "details": {k: str(v).strip() for k, v in details.items()},
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """Disk-backed LRU cache of generated document content.
+
+    Each entry is a JSON file named by its key. Recency is tracked in memory
+    and mirrored in file mtimes, so LRU order survives a restart.
+    """
+
+    def __init__(self, cache_dir, max_entries=500):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+        entries = [e for e in os.scandir(cache_dir) if e.name.endswith(".json")]
+        entries.sort(key=lambda e: e.stat().st_mtime_ns)
+        self._order = OrderedDict((e.name[:-5], None) for e in entries)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._order:
+                return None
+            self._order.move_to_end(key)
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(self._path(key))
+            return entry["content"]
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self._order.pop(key, None)
+            return None
+
+    def put(self, key, content):
+        tmp_path = f"{self._path(key)}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"content": content}, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(key))
+
+        with self._lock:
+            self._order[key] = None
+            self._order.move_to_end(key)
+            while len(self._order) > self.max_entries:
+                oldest, _ = self._order.popitem(last=False)
+                try:
+                    os.remove(self._path(oldest))
+                except OSError:
+                    pass
@@ -1,6 +1,9 @@
 # core/template_manager.py
 import os
 import json
+import time
+import hashlib
+import threading
 
 def create_default_templates():
     """Create default templates if none exist"""
@@ -37,7 +40,23 @@ def create_default_templates():
             {"name": "subject", "description": "Subject of the letter"},
             {"name": "date", "description": "Date of the letter"},
             {"name": "letter_content", "description": "Main points to include in the letter"}
-        ]
+        ],
+        # Fixed parts are rendered from the fields; the LLM writes only the body
+        "body_prompt_template": """
+        Write only the body paragraphs of a formal letter from the {sender_designation} of {sender_school} to the {recipient_designation}, {recipient_organization}.
+        - Subject: {subject}
+        
+        The letter should be about: {letter_content}
+        
+        The tone should be: {formality}
+        The language should be: {language}
+        
+        Do not include the letterhead, addresses, date, subject line, salutation, closing or signature; they are added separately. Output only the body text.
+        """,
+        "sections": {
+            "header": "{sender_name}\n{sender_designation}\n{sender_school}\n\nDate: {date}\n\nTo,\n{recipient_name}\n{recipient_designation}\n{recipient_organization}\n\nSubject: {subject}\n\nDear {recipient_name},\n\n",
+            "footer": "\n\nYours faithfully,\n\n{sender_name}\n{sender_designation}\n{sender_school}\n"
+        }
     }
 
     # Email Template
@@ -65,7 +84,22 @@ def create_default_templates():
             {"name": "recipient_name", "description": "Name of the recipient(s)"},
             {"name": "subject", "description": "Subject of the email"},
             {"name": "email_content", "description": "Main points to include in the email"}
-        ]
+        ],
+        "body_prompt_template": """
+        Write only the body paragraphs of a professional email from the {sender_designation} of {sender_school} to {recipient_name}.
+        - Subject: {subject}
+        
+        The email should be about: {email_content}
+        
+        The tone should be: {formality}
+        The language should be: {language}
+        
+        Do not include the subject line, greeting, closing or signature; they are added separately. Output only the body text.
+        """,
+        "sections": {
+            "header": "Subject: {subject}\n\nDear {recipient_name},\n\n",
+            "footer": "\n\nRegards,\n{sender_name}\n{sender_designation}\n{sender_school}\n"
+        }
     }
 
     # Circular Template
@@ -98,7 +132,24 @@ def create_default_templates():
             {"name": "additional_details", "description": "Any additional information"},
             {"name": "authority_name", "description": "Name of the issuing authority"},
             {"name": "authority_designation", "description": "Designation of the issuing authority"}
-        ]
+        ],
+        "body_prompt_template": """
+        Write only the body paragraphs of a school circular issued by {school_name}.
+        - Subject: {subject}
+        
+        The circular should announce: {announcement}
+        
+        Additional details to include: {additional_details}
+        
+        The tone should be: {formality}
+        The language should be: {language}
+        
+        Do not include the header, reference number, date, subject line or signature; they are added separately. Output only the body text.
+        """,
+        "sections": {
+            "header": "{school_name}\n\nCIRCULAR\n\nRef. No.: {circular_number}\nDate: {date}\n\nSubject: {subject}\n\n",
+            "footer": "\n\n{authority_name}\n{authority_designation}\n{school_name}\n"
+        }
     }
 
     # Save default templates
@@ -108,23 +159,95 @@ def create_default_templates():
             with open(template_path, 'w', encoding='utf-8') as f:
                 json.dump(template, f, indent=4)
 
-def get_all_templates():
-    """Get all available templates"""
-    # Create default templates if none exist
-    create_default_templates()
+class TemplateRegistry:
+    """In-memory registry of templates keyed by id.
 
-    templates_dir = "templates"
-    templates = {}
+    Templates are loaded from disk once. Later lookups are dict reads; the
+    directory is re-scanned only when a file's mtime changes (checked at most
+    every ``check_interval`` seconds) or after ``save`` writes a template.
+    """
+
+    def __init__(self, templates_dir="templates", check_interval=2.0):
+        self.templates_dir = templates_dir
+        self.check_interval = check_interval
+        self._templates = {}
+        self._versions = {}
+        self._mtimes = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def _scan_mtimes(self):
+        mtimes = {}
+        for entry in os.scandir(self.templates_dir):
+            if entry.name.endswith(".json"):
+                mtimes[entry.name] = entry.stat().st_mtime_ns
+        return mtimes
+
+    def _reload(self, mtimes):
+        templates, versions = {}, {}
+        for filename in sorted(mtimes):
+            with open(os.path.join(self.templates_dir, filename), 'rb') as f:
+                raw = f.read()
+            template_data = json.loads(raw.decode('utf-8'))
+            templates[template_data["id"]] = template_data
+            versions[template_data["id"]] = hashlib.sha256(raw).hexdigest()[:12]
+        self._templates, self._versions, self._mtimes = templates, versions, mtimes
+
+    def _ensure_fresh(self):
+        now = time.monotonic()
+        if self._mtimes is not None and now - self._last_check < self.check_interval:
+            return
+        with self._lock:
+            if self._mtimes is None:
+                create_default_templates()
+            mtimes = self._scan_mtimes()
+            if mtimes != self._mtimes:
+                self._reload(mtimes)
+            self._last_check = now
 
-    for filename in os.listdir(templates_dir):
-        if filename.endswith(".json"):
-            with open(os.path.join(templates_dir, filename), 'r', encoding='utf-8') as f:
-                template_data = json.load(f)
-                templates[template_data["id"]] = template_data
+    def invalidate(self):
+        """Force a directory check on the next lookup"""
+        self._last_check = 0.0
 
-    return templates
+    def all(self):
+        self._ensure_fresh()
+        return self._templates
+
+    def get(self, template_id):
+        self._ensure_fresh()
+        return self._templates.get(template_id)
+
+    def version(self, template_id):
+        """Content hash of the template file, changes whenever it is re-uploaded"""
+        self._ensure_fresh()
+        return self._versions.get(template_id)
+
+    def save(self, template_data):
+        """Write a template to disk and make it visible immediately"""
+        if not os.path.exists(self.templates_dir):
+            os.makedirs(self.templates_dir)
+        with open(os.path.join(self.templates_dir, f"{template_data['id']}.json"), 'w', encoding='utf-8') as f:
+            json.dump(template_data, f, indent=4)
+        self.invalidate()
+        # Same-second rewrites can keep the old mtime on coarse filesystems
+        with self._lock:
+            self._mtimes = {}
+
+
+registry = TemplateRegistry()
+
+def get_all_templates():
+    """Get all available templates"""
+    return registry.all()
 
 def load_template_by_id(template_id):
     """Load template by id"""
-    templates = get_all_templates()
-    return templates.get(template_id)
\ No newline at end of file
+    return registry.get(template_id)
+
+def get_template_version(template_id):
+    """Version string of a template, for cache keys"""
+    return registry.version(template_id)
+
+def save_template(template_data):
+    """Persist an uploaded template and refresh the registry"""
+    registry.save(template_data)
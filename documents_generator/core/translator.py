@@ -0,0 +1,107 @@
+# core/translator.py
+import hashlib
+import threading
+import time
+from string import Formatter
+from langchain.prompts import PromptTemplate
+from core.document_generator import get_llm, section_templates
+from core.response_cache import ResponseCache
+from config import Config
+
+# Static instructions first so Ollama can reuse the cached prompt prefix
+TRANSLATION_PROMPT = """You are translating official school documents written by Indian government school teachers.
+Translate the document faithfully, keeping its meaning, tone, paragraph breaks and layout.
+Do not translate or alter personal names, school names, reference numbers, dates or amounts.
+Output only the translated document, with no notes or explanations.
+
+Source language: {source_language}
+Target language: {target_language}
+
+Document:
+{text}
+"""
+
+# Translations (documents and fixed sections) per source text and language
+translation_cache = ResponseCache(Config.TRANSLATION_CACHE_DIR, Config.TRANSLATION_CACHE_MAX_ENTRIES)
+
+_translation_chain = None
+_translation_lock = threading.Lock()
+
+def get_translation_chain():
+    """Compiled translation prompt | llm chain, built once per process"""
+    global _translation_chain
+    if _translation_chain is None:
+        with _translation_lock:
+            if _translation_chain is None:
+                _translation_chain = PromptTemplate.from_template(TRANSLATION_PROMPT) | get_llm()
+    return _translation_chain
+
+def translation_cache_key(text, source_language, target_language):
+    """Cache key of one translation; changes with the source text, model or prompt"""
+    digest = hashlib.sha256()
+    for part in (Config.OLLAMA_MODEL, TRANSLATION_PROMPT, source_language.strip().lower(),
+                 target_language.strip().lower(), text):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def translate_text(text, source_language, target_language, cache=None, metrics=None):
+    """Translate ``text``, reusing a cached translation when available.
+
+    Returns (translation, cache_hit). If ``metrics`` is a dict it receives
+    ``llm_ms``.
+    """
+    key = translation_cache_key(text, source_language, target_language)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached, True
+
+    start = time.perf_counter()
+    translation = get_translation_chain().invoke({
+        "source_language": source_language,
+        "target_language": target_language,
+        "text": text
+    }).strip()
+    if metrics is not None:
+        metrics["llm_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+    if cache is not None:
+        cache.put(key, translation)
+    return translation, False
+
+def _placeholders(text):
+    try:
+        return sorted(name for _, name, _, _ in Formatter().parse(text) if name)
+    except ValueError:
+        # Unbalanced braces in a translation
+        return None
+
+def translate_sections(template, target_language, cache=translation_cache):
+    """Fixed section templates of a hybrid template in ``target_language``.
+
+    Sections the template already provides in that language are used as
+    they are. Otherwise the English section text is translated with its
+    {field} placeholders in place, so field values are filled in afterwards
+    and stay exactly as entered. A section whose placeholders do not survive
+    translation stays in English. Returns (sections, cache_hit).
+    """
+    sections = section_templates(template, target_language)
+    if sections is not None:
+        return sections, True
+
+    translated, all_hits = {}, True
+    for name, text in template.get("sections", {}).items():
+        if not text.strip():
+            translated[name] = text
+            continue
+        translation, hit = translate_text(text, "English", target_language, cache)
+        all_hits = all_hits and hit
+        if _placeholders(translation) != _placeholders(text):
+            print(f"Translated '{name}' section for {target_language} lost its fields; keeping English")
+            translation = text.strip()
+        # Keep the blank lines that join the section to the body
+        leading = text[:len(text) - len(text.lstrip())]
+        trailing = text[len(text.rstrip()):]
+        translated[name] = leading + translation + trailing
+    return translated, all_hits
@@ -7,6 +7,9 @@ import os
 # Define API endpoint (adjust if needed)
 API_BASE_URL = "http://localhost:8001/api/documents"
 
+# Languages the multilingual mode translates into
+TRANSLATION_LANGUAGES = ["English", "Hindi", "Tamil", "Telugu", "Bengali", "Marathi"]
+
 def main():
     st.title("Document Generator for Government of India Teachers")
     st.write("Generate professional documents with minimal input")
@@ -50,18 +53,44 @@ def main():
             for field in selected_template["required_fields"]:
                 field_values[field["name"]] = st.text_input(field["description"], key=field["name"])
 
+            translate_to = st.multiselect(
+                "Also translate into",
+                [lang for lang in TRANSLATION_LANGUAGES if lang != language]
+            )
+
+            regenerate = st.checkbox("Regenerate (ignore previously generated result)")
+
             submit_button = st.form_submit_button(label="Generate Document")
 
         if submit_button:
             # Check if all required fields are filled
-            if all(field_values.values()):
-                # Generate document
-                with st.spinner("Generating document..."):
-                    document = generate_document(template_id, language, formality, field_values)
-
-                if document:
-                    st.success("Document generated successfully!")
-                    st.text_area("Generated Document", document["content"], height=400)
+            if all(field_values.values()) and translate_to:
+                # Generate once and show each language as its translation finishes
+                with st.spinner("Generating and translating document..."):
+                    for document in stream_multilingual(template_id, language, formality, field_values, translate_to, regenerate):
+                        doc_language = document["language"]
+                        with st.expander(doc_language, expanded=document["source"]):
+                            st.text_area("Generated Document", document["content"], height=400, key=f"doc_{doc_language}")
+                            st.download_button(
+                                label=f"Download {doc_language} Document",
+                                data=document["content"],
+                                file_name=f"{template_id}_{doc_language.lower()}.txt",
+                                mime="text/plain",
+                                key=f"download_{doc_language}"
+                            )
+            elif all(field_values.values()):
+                # Generate document, filling the text area as tokens arrive
+                placeholder = st.empty()
+                document = None
+                for document in stream_document(template_id, language, formality, field_values, regenerate):
+                    placeholder.text(document["content"])
+
+                if document and document.get("done"):
+                    if document.get("metadata", {}).get("cache", {}).get("hit"):
+                        st.success("Document generated successfully! (reused a previous result)")
+                    else:
+                        st.success("Document generated successfully!")
+                    placeholder.text_area("Generated Document", document["content"], height=400)
 
                     # Download button
                     document_text = document["content"]
@@ -74,6 +103,28 @@ def main():
             else:
                 st.warning("Please fill in all required fields.")
 
+        # Mail merge: one document per CSV row
+        st.subheader("Bulk Generation (Mail Merge)")
+        columns = ", ".join(field["name"] for field in selected_template["required_fields"])
+        st.write(f"Upload a CSV with one row per recipient and these columns: {columns}")
+        csv_file = st.file_uploader("Recipients CSV", type=["csv"], key="bulk_csv")
+        filename_field = st.selectbox(
+            "Name files by",
+            [field["name"] for field in selected_template["required_fields"]],
+            key="bulk_filename_field"
+        )
+
+        if csv_file is not None and st.button("Generate All Documents"):
+            archive = bulk_generate(template_id, language, formality, filename_field, csv_file)
+            if archive:
+                st.success("Bulk generation finished. The ZIP includes report.csv with the status of every row.")
+                st.download_button(
+                    label="Download ZIP",
+                    data=archive,
+                    file_name=f"{template_id}_bulk.zip",
+                    mime="application/zip"
+                )
+
 def fetch_templates():
     """Fetch templates from the API"""
     try:
@@ -83,22 +134,101 @@ def fetch_templates():
     except:
         return None
 
-def generate_document(template_id, language, formality, details):
-    """Generate a document using the API"""
+def stream_document(template_id, language, formality, details, regenerate=False):
+    """Stream a document from the API, yielding the text received so far"""
+    document = {"content": "", "done": False, "metadata": {}}
     try:
-        response = requests.post(
-            f"{API_BASE_URL}/generate",
+        with requests.post(
+            f"{API_BASE_URL}/generate-stream",
             json={
                 "template_type": template_id,
                 "language": language,
                 "formality": formality,
-                "details": details
-            }
-        )
-        response.raise_for_status()
-        return response.json()
+                "details": details,
+                "regenerate": regenerate
+            },
+            stream=True
+        ) as response:
+            response.raise_for_status()
+            event = None
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: "):
+                    data = json.loads(line[len("data: "):])
+                    if event == "token":
+                        document["content"] += data["text"]
+                    elif event == "done":
+                        document["done"] = True
+                        document["metadata"] = data.get("metadata", {})
+                    elif event == "error":
+                        st.error(f"Error generating document: {data.get('detail')}")
+                        return
+                    yield document
+    except Exception as e:
+        st.error(f"Error generating document: {str(e)}")
+
+def stream_multilingual(template_id, language, formality, details, languages, regenerate=False):
+    """Generate once and translate, yielding each language's document as it arrives"""
+    try:
+        with requests.post(
+            f"{API_BASE_URL}/generate-multilingual",
+            json={
+                "template_type": template_id,
+                "language": language,
+                "formality": formality,
+                "details": details,
+                "languages": languages,
+                "regenerate": regenerate
+            },
+            stream=True
+        ) as response:
+            response.raise_for_status()
+            event = None
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: "):
+                    data = json.loads(line[len("data: "):])
+                    if event == "document":
+                        yield data
+                    elif event == "error":
+                        st.error(f"Error generating {data.get('language')} document: {data.get('detail')}")
     except Exception as e:
         st.error(f"Error generating document: {str(e)}")
+
+def bulk_generate(template_id, language, formality, filename_field, csv_file):
+    """Stream a mail-merge ZIP from the API while showing progress"""
+    try:
+        response = requests.post(
+            f"{API_BASE_URL}/bulk-generate",
+            data={
+                "template_id": template_id,
+                "language": language,
+                "formality": formality,
+                "filename_field": filename_field
+            },
+            files={"csv_file": (csv_file.name, csv_file.getvalue(), "text/csv")},
+            stream=True
+        )
+        if response.status_code >= 400:
+            st.error(f"Error generating documents: {response.json().get('detail')}")
+            return None
+
+        job_id = response.headers.get("X-Job-Id")
+        progress_bar = st.progress(0.0, text="Generating documents...")
+        chunks = []
+        for chunk in response.iter_content(chunk_size=None):
+            chunks.append(chunk)
+            progress = requests.get(f"{API_BASE_URL}/bulk-generate/{job_id}/progress").json()
+            done = progress["completed"] + progress["failed"]
+            progress_bar.progress(
+                done / max(progress["total"], 1),
+                text=f"{progress['completed']} generated, {progress['failed']} failed of {progress['total']}"
+            )
+        return b"".join(chunks)
+    except Exception as e:
+        st.error(f"Error generating documents: {str(e)}")
         return None
 
 if __name__ == "__main__":
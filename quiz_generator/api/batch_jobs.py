@@ -0,0 +1,246 @@
+# api/batch_jobs.py
+import json
+import math
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from .blueprint import largest_remainder
+from .models import BlueprintCell
+from .question_generator import QuestionGenerator
+
+
+class PaperSpec(BaseModel):
+    subject: str
+    topic: str
+    grade: str
+    question_types: List[str]
+    num_questions: int
+    difficulty_dist: dict
+    bloom_dist: dict
+    context: Optional[str] = None
+    total_marks: Optional[int] = None
+    label: Optional[str] = None
+    variants: Optional[int] = None
+
+class BatchJobRequest(BaseModel):
+    papers: List[PaperSpec]
+    variants: int = 1
+    max_overlap: float = 0.0
+
+
+def shared_counts(cells: List[BlueprintCell], max_overlap: float) -> List[int]:
+    """Questions every variant shares, per blueprint cell.
+
+    The overlap budget is ``floor(total * max_overlap)`` for the whole paper
+    and is spread over the cells by largest remainder, so small cells can
+    share questions too instead of each rounding down to zero.
+    """
+    budget = math.floor(sum(cell.count for cell in cells) * max_overlap)
+    counts = largest_remainder(budget, {i: cell.count for i, cell in enumerate(cells)})
+    return [min(counts[i], cell.count) for i, cell in enumerate(cells)]
+
+
+def split_variants(pool: List[dict], count: int, variants: int,
+                   shared_count: int) -> List[List[dict]]:
+    """Deal a pool of questions for one blueprint cell out to ``variants`` papers.
+
+    The first ``shared_count`` questions are shared by every variant; the
+    rest are disjoint between variants. If the pool came up short, the
+    remaining questions are dealt round-robin so the shortfall is spread
+    across variants instead of emptying the last ones; callers compare each
+    variant's length with ``count`` to flag incomplete papers.
+    """
+    shared_count = min(shared_count, count, len(pool))
+    shared, rest = pool[:shared_count], pool[shared_count:]
+    per_variant = count - shared_count
+    return [shared + rest[v::variants][:per_variant] for v in range(variants)]
+
+
+class BatchJobManager:
+    """Runs multi-paper, multi-variant generation jobs in the background.
+
+    RAG context is retrieved once per (subject, topic, grade) per job, each
+    blueprint cell of each paper spec is generated as one task on a shared
+    worker pool, and finished jobs are written to ``results_dir`` so they can
+    be downloaded later.
+    """
+
+    def __init__(self, question_gen: QuestionGenerator, results_dir: Path,
+                 max_workers: int = 4, max_finished_jobs: int = 100):
+        self.question_gen = question_gen
+        self.results_dir = Path(results_dir)
+        self.results_dir.mkdir(parents=True, exist_ok=True)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.jobs: Dict[str, dict] = {}
+        self.max_finished_jobs = max_finished_jobs
+        self._lock = threading.Lock()
+
+    def submit(self, request: BatchJobRequest) -> str:
+        job_id = uuid.uuid4().hex
+        request.max_overlap = min(max(request.max_overlap, 0.0), 1.0)
+        self._evict_finished()
+        self.jobs[job_id] = {
+            "job_id": job_id,
+            "status": "queued",
+            "papers_requested": sum(
+                spec.variants or request.variants for spec in request.papers
+            ),
+            "tasks_total": 0,
+            "tasks_done": 0,
+            "questions_generated": 0,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "error": None,
+            "incomplete_papers": 0,
+        }
+        threading.Thread(target=self._run, args=(job_id, request), daemon=True).start()
+        return job_id
+
+    def _evict_finished(self):
+        """Forget the oldest finished jobs; their result files stay downloadable"""
+        with self._lock:
+            finished = sorted(
+                (job["finished_at"], job_id) for job_id, job in self.jobs.items()
+                if job["finished_at"] is not None
+            )
+            for _, job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+                del self.jobs[job_id]
+
+    def status(self, job_id: str) -> Optional[dict]:
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        report = dict(job)
+        started = job["started_at"]
+        if started:
+            elapsed = (job["finished_at"] or time.time()) - started
+            report["elapsed_seconds"] = round(elapsed, 2)
+            report["progress"] = (
+                job["tasks_done"] / job["tasks_total"] if job["tasks_total"] else 0.0
+            )
+            report["questions_per_minute"] = (
+                round(job["questions_generated"] * 60 / elapsed, 1) if elapsed else 0.0
+            )
+        return report
+
+    def result_path(self, job_id: str) -> Optional[Path]:
+        path = self.results_dir / f"{job_id}.json"
+        job = self.jobs.get(job_id)
+        # Evicted jobs are only on disk; results are written once the job completes
+        if (job is None or job["status"] == "completed") and path.exists():
+            return path
+        return None
+
+    def _run(self, job_id: str, request: BatchJobRequest):
+        job = self.jobs[job_id]
+        job["status"] = "running"
+        job["started_at"] = time.time()
+        try:
+            contexts = self._shared_contexts(request.papers)
+            plans = [
+                self.question_gen.plan(
+                    spec.question_types, spec.num_questions, spec.difficulty_dist,
+                    spec.bloom_dist, spec.total_marks
+                )
+                for spec in request.papers
+            ]
+            tasks: List[Tuple[int, int, BlueprintCell, int]] = []
+            for spec_idx, (spec, cells) in enumerate(zip(request.papers, plans)):
+                variants = spec.variants or request.variants
+                overlap = shared_counts(cells, request.max_overlap)
+                for cell_idx, cell in enumerate(cells):
+                    shared = overlap[cell_idx]
+                    needed = shared + variants * (cell.count - shared)
+                    tasks.append((spec_idx, cell_idx, cell, needed))
+            job["tasks_total"] = len(tasks)
+
+            pools: Dict[Tuple[int, int], List[dict]] = {}
+            futures = {
+                self.executor.submit(
+                    self._generate_pool, request.papers[spec_idx], cell, needed,
+                    contexts[self._context_key(request.papers[spec_idx])]
+                ): (spec_idx, cell_idx)
+                for spec_idx, cell_idx, cell, needed in tasks
+            }
+            for future in as_completed(futures):
+                pool = future.result()
+                pools[futures[future]] = pool
+                with self._lock:
+                    job["tasks_done"] += 1
+                    job["questions_generated"] += len(pool)
+
+            papers = self._assemble(request, plans, pools)
+            job["incomplete_papers"] = sum(1 for paper in papers if not paper["complete"])
+            with open(self.results_dir / f"{job_id}.json", "w", encoding="utf-8") as f:
+                json.dump({"job_id": job_id, "papers": papers}, f, indent=2)
+            job["status"] = "completed"
+        except Exception as e:
+            print(f"Batch job {job_id} failed: {e}")
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            job["finished_at"] = time.time()
+
+    @staticmethod
+    def _context_key(spec: PaperSpec) -> Tuple[str, str, str]:
+        return (spec.subject.lower(), spec.topic.lower(), spec.grade)
+
+    def _shared_contexts(self, specs: List[PaperSpec]) -> Dict[Tuple[str, str, str], str]:
+        """Retrieve RAG context once per distinct topic in the job"""
+        contexts = {}
+        for spec in specs:
+            key = self._context_key(spec)
+            if spec.context:
+                contexts.setdefault(key, spec.context)
+            elif key not in contexts:
+                contexts[key] = self.question_gen.rag_client.get_context(
+                    f"{spec.subject} {spec.topic} for grade {spec.grade}"
+                ) or ""
+        return contexts
+
+    def _generate_pool(self, spec: PaperSpec, cell: BlueprintCell, needed: int,
+                       context: str) -> List[dict]:
+        pool_cell = cell.copy(update={"count": needed})
+        return self.question_gen.generate_from_blueprint(
+            spec.subject, spec.topic, spec.grade, [pool_cell], context
+        )
+
+    def _assemble(self, request: BatchJobRequest, plans: List[List[BlueprintCell]],
+                  pools: Dict[Tuple[int, int], List[dict]]) -> List[dict]:
+        papers = []
+        for spec_idx, (spec, cells) in enumerate(zip(request.papers, plans)):
+            variants = spec.variants or request.variants
+            variant_questions: List[List[dict]] = [[] for _ in range(variants)]
+            planned = sum(cell.count for cell in cells)
+            overlap = shared_counts(cells, request.max_overlap)
+            for cell_idx, cell in enumerate(cells):
+                dealt = split_variants(
+                    pools.get((spec_idx, cell_idx), []), cell.count, variants,
+                    overlap[cell_idx]
+                )
+                for v in range(variants):
+                    variant_questions[v].extend(dealt[v])
+
+            base_label = spec.label or f"{spec.subject} {spec.topic} Grade {spec.grade}"
+            for v, questions in enumerate(variant_questions):
+                papers.append({
+                    "label": base_label,
+                    "variant": chr(ord("A") + v) if variants <= 26 else str(v + 1),
+                    "subject": spec.subject,
+                    "topic": spec.topic,
+                    "grade": spec.grade,
+                    "questions": questions,
+                    "total_marks": sum(q.get("marks", 1) for q in questions),
+                    # The generator came up short for this variant's blueprint
+                    "complete": len(questions) >= planned,
+                    "missing_questions": max(0, planned - len(questions)),
+                    "marks_warning": self.question_gen.planner.marks_warning(cells, spec.total_marks),
+                })
+        return papers
@@ -0,0 +1,158 @@
+# api/blueprint.py
+import math
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from .models import BlueprintCell
+
+
+def largest_remainder(total: int, weights: Dict[Hashable, float]) -> Dict[Hashable, int]:
+    """Split ``total`` into integer counts proportional to ``weights``.
+
+    Every key gets the floor of its quota and the leftover units go to the
+    largest fractional remainders. Ties are broken by the order of the keys,
+    so the same input always produces the same allocation.
+    """
+    positive = {k: max(float(w), 0.0) for k, w in weights.items()}
+    weight_sum = sum(positive.values())
+    if total <= 0 or not positive:
+        return {k: 0 for k in weights}
+    if weight_sum == 0:
+        positive = {k: 1.0 for k in positive}
+        weight_sum = float(len(positive))
+
+    quotas = {k: total * w / weight_sum for k, w in positive.items()}
+    counts = {k: math.floor(q) for k, q in quotas.items()}
+    order = sorted(quotas, key=lambda k: quotas[k] - counts[k], reverse=True)
+    for k in order[:total - sum(counts.values())]:
+        counts[k] += 1
+    return counts
+
+
+def _controlled_round(rows: Dict[Hashable, int],
+                      cols: Dict[Hashable, int]) -> Dict[Tuple, int]:
+    """Integer matrix with the given row and column totals whose cells are as
+    close as possible to the independent (row * col / total) expectation"""
+    total = sum(rows.values())
+    cells = {}
+    remainders = []
+    for r, r_total in rows.items():
+        for c, c_total in cols.items():
+            expected = r_total * c_total / total if total else 0
+            cells[(r, c)] = math.floor(expected)
+            remainders.append((expected - cells[(r, c)], (r, c)))
+
+    row_left = {r: rows[r] - sum(cells[(r, c)] for c in cols) for r in rows}
+    col_left = {c: cols[c] - sum(cells[(r, c)] for r in rows) for c in cols}
+
+    # Round up the largest fractions first while both margins still need units
+    for _, (r, c) in sorted(remainders, key=lambda item: item[0], reverse=True):
+        if row_left[r] > 0 and col_left[c] > 0:
+            cells[(r, c)] += 1
+            row_left[r] -= 1
+            col_left[c] -= 1
+
+    # Any units still missing can go to any cell whose row and column need them
+    for r in rows:
+        for c in cols:
+            extra = min(row_left[r], col_left[c])
+            if extra > 0:
+                cells[(r, c)] += extra
+                row_left[r] -= extra
+                col_left[c] -= extra
+    return cells
+
+
+class BlueprintPlanner:
+    """Deterministic allocation of a paper across type x difficulty x Bloom level.
+
+    Type, difficulty and Bloom level totals each match the requested
+    distribution exactly (largest-remainder rounding), and the joint cells are
+    rounded so their margins agree. When a ``total_marks`` target is given the
+    joint cells are rearranged towards it without changing the number of
+    questions or any of those totals; ``marks_warning`` reports a target the
+    requested mix cannot reach.
+    """
+
+    def __init__(self, marks_fn: Callable[[str, str], int]):
+        self.marks_fn = marks_fn
+
+    def plan(self, question_types: List[str], num_questions: int,
+             difficulty_dist: Dict[str, float], bloom_dist: Dict[str, float],
+             total_marks: Optional[int] = None) -> List[BlueprintCell]:
+        if not question_types:
+            return []
+        return self._plan_cells(question_types, num_questions, difficulty_dist,
+                                bloom_dist, total_marks)
+
+    def _plan_cells(self, question_types: List[str], num_questions: int,
+                    difficulty_dist: Dict[str, float], bloom_dist: Dict[str, float],
+                    total_marks: Optional[int]) -> List[BlueprintCell]:
+        num_questions = max(num_questions, len(question_types))
+
+        type_counts = largest_remainder(num_questions, {t: 1 for t in question_types})
+        difficulty_counts = largest_remainder(num_questions, difficulty_dist)
+        bloom_counts = largest_remainder(num_questions, bloom_dist)
+
+        type_difficulty = _controlled_round(type_counts, difficulty_counts)
+        joint = _controlled_round(type_difficulty, bloom_counts)
+        counts = {(t, d, b): n for ((t, d), b), n in joint.items() if n > 0}
+
+        if total_marks:
+            self._fit_marks(counts, total_marks)
+
+        return [
+            BlueprintCell(
+                question_type=t, difficulty=d, bloom_level=b, count=n,
+                marks=self.marks_fn(d, b)
+            )
+            for (t, d, b), n in counts.items() if n > 0
+        ]
+
+    def total_marks(self, cells: List[BlueprintCell]) -> int:
+        return sum(cell.count * cell.marks for cell in cells)
+
+    def marks_warning(self, cells: List[BlueprintCell],
+                      total_marks: Optional[int]) -> Optional[str]:
+        """Why the plan misses ``total_marks``, or None when it hits it"""
+        if not total_marks:
+            return None
+        planned = self.total_marks(cells)
+        if planned == total_marks:
+            return None
+        return (f"The requested question count and difficulty/Bloom mix give {planned} "
+                f"marks, not {total_marks}; change the number of questions or the mix "
+                f"to reach the target")
+
+    def _fit_marks(self, counts: Dict[Tuple[str, str, str], int], target: int):
+        """Swap labels between pairs of questions of the same type until the
+        paper totals ``target`` marks (or no swap helps).
+
+        One question moves (d1, b1) -> (d1, b2) while another moves
+        (d2, b2) -> (d2, b1), so the type, difficulty and Bloom totals and
+        the number of questions never change.
+        """
+        current = sum(n * self.marks_fn(d, b) for (_, d, b), n in counts.items())
+        for _ in range(sum(counts.values())):
+            gap = target - current
+            if gap == 0:
+                return
+            best = None
+            cells = sorted(cell for cell, n in counts.items() if n > 0)
+            for i, (t, d1, b1) in enumerate(cells):
+                for t2, d2, b2 in cells[i + 1:]:
+                    if t2 != t or d1 == d2 or b1 == b2:
+                        continue
+                    delta = (self.marks_fn(d1, b2) + self.marks_fn(d2, b1)
+                             - self.marks_fn(d1, b1) - self.marks_fn(d2, b2))
+                    if delta == 0 or abs(gap - delta) >= abs(gap):
+                        continue
+                    if best is None or abs(gap - delta) < best[0]:
+                        best = (abs(gap - delta), (t, d1, b1), (t, d2, b2), delta)
+            if best is None:
+                return
+            _, (t, d1, b1), (_, d2, b2), delta = best
+            counts[(t, d1, b1)] -= 1
+            counts[(t, d2, b2)] -= 1
+            counts[(t, d1, b2)] = counts.get((t, d1, b2), 0) + 1
+            counts[(t, d2, b1)] = counts.get((t, d2, b1), 0) + 1
+            current += delta
@@ -0,0 +1,179 @@
+# api/dedup.py
+import re
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+class QuestionDeduplicator:
+    """Near-duplicate detection for question text using MinHash signatures.
+
+    Each question is normalised, split into character shingles and reduced to a
+    fixed-size MinHash signature. The fraction of matching signature slots
+    estimates the Jaccard similarity of the shingle sets, so comparing many
+    questions is a single vectorised operation. Small sets (one paper) are
+    compared all-pairs; large sets (a question bank) go through LSH banding so
+    only candidate pairs are compared.
+    """
+
+    def __init__(self, threshold: float = 0.7, shingle_size: int = 3,
+                 num_perm: int = 64, bands: int = 16, seed: int = 7,
+                 chunk_rows: int = 2048, max_bucket: int = 32,
+                 bucket_window: int = 4, chunk_pairs: int = 65536):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        if not 1 <= shingle_size <= 8:
+            raise ValueError("shingle_size must be between 1 and 8")
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.num_perm = num_perm
+        self.bands = bands
+        self.chunk_rows = chunk_rows
+        self.max_bucket = max_bucket
+        self.bucket_window = bucket_window
+        self.chunk_pairs = chunk_pairs
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hash family: h(x) = (a*x + b) >> 32 over uint64
+        self._a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        text = re.sub(r"[^\w\s]", " ", (text or "").lower())
+        return " ".join(text.split())
+
+    def _shingles(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Pack every character shingle of every text into a uint64.
+
+        Returns the flat shingle array and the offset of each text's first
+        shingle, so per-text reductions can use ``np.minimum.reduceat``.
+        """
+        k = self.shingle_size
+        encoded = [self.normalize(t).encode("utf-8").ljust(k) for t in texts]
+        lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+        counts = lengths - k + 1
+        buf = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+
+        text_starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        # Global start position of every shingle without a Python loop
+        positions = np.arange(counts.sum()) - np.repeat(offsets - text_starts, counts)
+
+        packed = np.zeros(len(positions), dtype=np.uint64)
+        for j in range(k):
+            packed |= buf[positions + j] << np.uint64(8 * j)
+        return packed, offsets
+
+    def signatures(self, texts: List[str]) -> np.ndarray:
+        """Return a (len(texts), num_perm) MinHash signature matrix"""
+        sigs = np.empty((len(texts), self.num_perm), dtype=np.uint64)
+        for start in range(0, len(texts), self.chunk_rows):
+            chunk = texts[start:start + self.chunk_rows]
+            packed, offsets = self._shingles(chunk)
+            permuted = (self._a[:, None] * packed[None, :] + self._b[:, None]) >> np.uint64(32)
+            sigs[start:start + len(chunk)] = np.minimum.reduceat(permuted, offsets, axis=1).T
+        return sigs
+
+    @staticmethod
+    def similarity_matrix(sig_a: np.ndarray, sig_b: np.ndarray) -> np.ndarray:
+        """Estimated Jaccard similarity between every row of sig_a and sig_b"""
+        return (sig_a[:, None, :] == sig_b[None, :, :]).mean(axis=2)
+
+    def unique_indices(self, texts: List[str],
+                       existing: Optional[List[str]] = None) -> List[int]:
+        """Indices of texts to keep, in order, dropping near-duplicates of
+        earlier texts and of anything in ``existing``"""
+        if not texts:
+            return []
+        sigs = self.signatures(texts)
+        dup = np.zeros(len(texts), dtype=bool)
+        if existing:
+            similar_existing = self.similarity_matrix(sigs, self.signatures(existing))
+            dup |= (similar_existing >= self.threshold).any(axis=1)
+
+        similar = self.similarity_matrix(sigs, sigs) >= self.threshold
+        keep = []
+        for i in range(len(texts)):
+            if dup[i]:
+                continue
+            keep.append(i)
+            # Anything later that resembles a kept question is a duplicate
+            dup[i + 1:] |= similar[i, i + 1:]
+        return keep
+
+    def deduplicate(self, questions: List[dict],
+                    existing: Optional[List[str]] = None) -> List[dict]:
+        """Drop questions whose text is a near-duplicate of an earlier one"""
+        keep = self.unique_indices([q.get("text", "") for q in questions], existing)
+        return [questions[i] for i in keep]
+
+    def _bucket_pairs(self, members: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Candidate pairs of one LSH bucket.
+
+        Small buckets give every pair. Buckets larger than ``max_bucket``
+        (e.g. many copies of one templated question) pair each member only
+        with the next ``bucket_window`` members, so the cost is linear in
+        the bucket size; duplicates further apart are still linked through
+        the members between them.
+        """
+        if len(members) <= self.max_bucket:
+            i, j = np.triu_indices(len(members), k=1)
+            return members[i], members[j]
+        left, right = [], []
+        for step in range(1, self.bucket_window + 1):
+            left.append(members[:-step])
+            right.append(members[step:])
+        return np.concatenate(left), np.concatenate(right)
+
+    def _verify(self, sigs: np.ndarray, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        """Pair keys (i * len(sigs) + j) of candidates at or above the threshold"""
+        kept = []
+        for start in range(0, len(left), self.chunk_pairs):
+            i = left[start:start + self.chunk_pairs]
+            j = right[start:start + self.chunk_pairs]
+            similar = (sigs[i] == sigs[j]).mean(axis=1) >= self.threshold
+            kept.append(i[similar].astype(np.int64) * len(sigs) + j[similar])
+        return np.concatenate(kept)
+
+    def find_duplicate_pairs(self, texts: List[str]) -> List[Tuple[int, int, float]]:
+        """Scan a large collection (e.g. a question bank) for near-duplicate
+        pairs using LSH banding. Returns (i, j, similarity) with i < j.
+
+        Candidates are verified a chunk at a time after each band, so memory
+        grows with the number of duplicates found rather than with the
+        candidates, and oversized buckets are not expanded into every pair.
+        """
+        if len(texts) < 2:
+            return []
+        sigs = self.signatures(texts)
+        rows_per_band = self.num_perm // self.bands
+        found = []
+        for band in range(self.bands):
+            block = sigs[:, band * rows_per_band:(band + 1) * rows_per_band]
+            # Signature values are 32-bit, so fold the band into one uint64 key
+            key = np.zeros(len(block), dtype=np.uint64)
+            for col in block.T:
+                key = (key * np.uint64(0x100000001B3)) ^ col
+            _, bucket = np.unique(key, return_inverse=True)
+            bucket = bucket.ravel()
+            # Only rows sharing a bucket with another row can form a pair
+            shared = np.flatnonzero(np.bincount(bucket)[bucket] > 1)
+            if not len(shared):
+                continue
+            order = shared[np.argsort(bucket[shared], kind="stable")]
+            boundaries = np.flatnonzero(np.diff(bucket[order])) + 1
+            left, right = [], []
+            for members in np.split(order, boundaries):
+                i, j = self._bucket_pairs(members)
+                left.append(i)
+                right.append(j)
+            found.append(self._verify(sigs, np.concatenate(left), np.concatenate(right)))
+
+        if not found:
+            return []
+        pair_i, pair_j = np.divmod(np.unique(np.concatenate(found)), len(sigs))
+        sims = np.concatenate([
+            (sigs[pair_i[k:k + self.chunk_pairs]] == sigs[pair_j[k:k + self.chunk_pairs]]).mean(axis=1)
+            for k in range(0, len(pair_i), self.chunk_pairs)
+        ] or [np.zeros(0)])
+        return [(int(i), int(j), float(sim)) for i, j, sim in zip(pair_i, pair_j, sims)]
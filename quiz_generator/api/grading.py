@@ -0,0 +1,194 @@
+# api/grading.py
+import io
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+OBJECTIVE_TYPES = {"mcq", "true_false", "fill_blanks", "match_following"}
+OPTION_LETTERS = "abcdefghij"
+TRUE_WORDS = {"true", "t", "yes", "y", "1", "correct", "right", "sahi"}
+FALSE_WORDS = {"false", "f", "no", "n", "0", "incorrect", "wrong", "galat"}
+_PAIR = re.compile(r"(\w+)\s*(?:-|:|=|>|->|→)+\s*(\w+)")
+
+
+def normalize_answers(values: pd.Series) -> pd.Series:
+    """Lower-case, strip punctuation and collapse whitespace"""
+    return (values.fillna("").astype(str).str.lower()
+            .str.replace(r"[^\w\s]", " ", regex=True)
+            .str.replace(r"\s+", " ", regex=True)
+            .str.strip())
+
+
+def _mcq_aliases(options: List[str]) -> Dict[str, str]:
+    """Every accepted spelling of each option (text, letter, number) -> letter.
+
+    Exact option texts take precedence over labels. Positional numbers
+    ("1", "2", ...) are only accepted when no option text is itself a
+    number, otherwise "1" would be ambiguous between a position and a text.
+    """
+    normalized = normalize_answers(pd.Series(options, dtype=object)).tolist()
+    letters = OPTION_LETTERS[:len(normalized)]
+    numeric_texts = any(text.replace(" ", "").isdigit() for text in normalized)
+
+    aliases = {}
+    for letter, text in zip(letters, normalized):
+        if text:
+            aliases.setdefault(text, letter)
+    for i, (letter, text) in enumerate(zip(letters, normalized)):
+        spellings = [letter, f"{letter} {text}"]
+        if not numeric_texts:
+            spellings += [str(i + 1), f"{i + 1} {text}"]
+        for alias in spellings:
+            if alias.strip():
+                aliases.setdefault(alias.strip(), letter)
+    return aliases
+
+
+def _match_pairs(text: str) -> set:
+    return {f"{left}-{right}" for left, right in _PAIR.findall(text.lower())}
+
+
+def score_unique_responses(question: dict, uniques: pd.Series) -> np.ndarray:
+    """Credit (0..1) for each distinct response to one question.
+
+    Grading distinct responses instead of every answer sheet keeps the cost
+    proportional to the number of different answers, which for objective
+    questions is tiny compared with the number of students.
+    """
+    q_type = question.get("type")
+    key = str(question.get("answer") or "")
+    normalized = normalize_answers(uniques)
+
+    if q_type == "mcq":
+        aliases = _mcq_aliases(question.get("options") or [])
+        key_letter = aliases.get(normalize_answers(pd.Series([key])).iloc[0])
+        if key_letter is None:
+            return np.zeros(len(uniques))
+        return (normalized.map(aliases) == key_letter).to_numpy(dtype=float)
+
+    if q_type == "true_false":
+        def truth(series):
+            return series.map(lambda v: True if v in TRUE_WORDS else
+                              False if v in FALSE_WORDS else None)
+        key_truth = truth(normalize_answers(pd.Series([key]))).iloc[0]
+        if key_truth is None:
+            return np.zeros(len(uniques))
+        return (truth(normalized) == key_truth).to_numpy(dtype=float)
+
+    if q_type == "match_following":
+        key_pairs = _match_pairs(key)
+        if not key_pairs:
+            return np.zeros(len(uniques))
+        # Partial credit per correctly matched pair
+        return np.array([
+            len(_match_pairs(str(v)) & key_pairs) / len(key_pairs) for v in uniques
+        ])
+
+    # Fill in the blanks: any "|" or "/" separated alternative is accepted
+    alternatives = normalize_answers(pd.Series(re.split(r"[|/]", key))).tolist()
+    alternatives = [a for a in alternatives if a]
+    return normalized.isin(alternatives).to_numpy(dtype=float)
+
+
+def _question_columns(frame: pd.DataFrame, num_questions: int) -> List[Optional[str]]:
+    """Map question numbers to response columns named Q1, q1, 1, ..."""
+    lookup = {str(col).strip().lower().lstrip("q"): col for col in frame.columns}
+    return [lookup.get(str(i)) for i in range(1, num_questions + 1)]
+
+
+def grade_responses(paper: dict, responses_csv: bytes) -> dict:
+    """Grade a class's answer sheets against a paper.
+
+    ``responses_csv`` has a ``student_id`` column (or the first column is used)
+    and one column per question named ``Q1``..``Qn``. Returns per-student
+    scores as a DataFrame plus per-question difficulty and discrimination.
+    """
+    frame = pd.read_csv(io.BytesIO(responses_csv), dtype=str, keep_default_na=False)
+    id_column = next((c for c in frame.columns if str(c).strip().lower() == "student_id"),
+                     frame.columns[0])
+    questions = paper["questions"]
+    columns = _question_columns(frame, len(questions))
+
+    graded = [i for i, q in enumerate(questions)
+              if q.get("type") in OBJECTIVE_TYPES and columns[i] is not None]
+    credit = np.zeros((len(frame), len(graded)), dtype=np.float32)
+    answered = np.zeros(len(graded))
+    for j, i in enumerate(graded):
+        codes, uniques = pd.factorize(frame[columns[i]])
+        unique_credit = score_unique_responses(questions[i], pd.Series(uniques, dtype=object))
+        # Missing responses get code -1; append a zero-credit slot for them
+        credit[:, j] = np.append(unique_credit, 0.0)[codes]
+        answered[j] = (frame[columns[i]].str.strip() != "").mean()
+
+    marks = np.array([questions[i].get("marks", 1) for i in graded], dtype=np.float32)
+    scores = (credit @ marks).astype(np.float64)
+    max_score = float(marks.sum())
+
+    students = pd.DataFrame({
+        "student_id": frame[id_column],
+        "score": np.round(scores, 2),
+        "max_score": max_score,
+        "percentage": np.round(scores / max_score * 100, 2) if max_score else 0.0,
+    })
+
+    return {
+        "students": students,
+        "summary": _summary(scores, max_score),
+        "questions": _item_statistics(credit, marks, scores, graded, questions, answered),
+        "ungraded_questions": [i + 1 for i in range(len(questions)) if i not in graded],
+    }
+
+
+def _summary(scores: np.ndarray, max_score: float) -> dict:
+    if not len(scores):
+        return {"students": 0, "max_score": max_score}
+    return {
+        "students": int(len(scores)),
+        "max_score": max_score,
+        "mean": round(float(scores.mean()), 2),
+        "median": round(float(np.median(scores)), 2),
+        "std": round(float(scores.std()), 2),
+        "min": round(float(scores.min()), 2),
+        "max": round(float(scores.max()), 2),
+    }
+
+
+def _item_statistics(credit: np.ndarray, marks: np.ndarray, scores: np.ndarray,
+                     graded: List[int], questions: List[dict],
+                     answered: np.ndarray) -> List[dict]:
+    """Classical item analysis for every graded question at once.
+
+    - difficulty: proportion of full credit earned (p-value)
+    - discrimination: upper 27% minus lower 27% mean credit
+    - point_biserial: correlation of item credit with the rest-of-test score
+    """
+    n = len(scores)
+    if n == 0 or not graded:
+        return []
+    difficulty = credit.mean(axis=0)
+
+    order = np.argsort(scores, kind="stable")
+    group = max(1, int(round(n * 0.27)))
+    discrimination = credit[order[-group:]].mean(axis=0) - credit[order[:group]].mean(axis=0)
+
+    rest = scores[:, None] - credit * marks[None, :]
+    item_dev = credit - difficulty
+    rest_dev = rest - rest.mean(axis=0)
+    denom = np.sqrt((item_dev ** 2).sum(axis=0) * (rest_dev ** 2).sum(axis=0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        point_biserial = np.where(denom > 0, (item_dev * rest_dev).sum(axis=0) / denom, 0.0)
+
+    return [
+        {
+            "question": i + 1,
+            "type": questions[i].get("type"),
+            "marks": float(marks[j]),
+            "answered_rate": round(float(answered[j]), 3),
+            "difficulty": round(float(difficulty[j]), 3),
+            "discrimination": round(float(discrimination[j]), 3),
+            "point_biserial": round(float(point_biserial[j]), 3),
+        }
+        for j, i in enumerate(graded)
+    ]
@@ -1,12 +1,23 @@
 # api/main.py
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query
+from fastapi.responses import FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import requests
 from typing import List, Optional
 import os
+import time
+import asyncio
+import json
+import uuid
 from .question_generator import QuestionGenerator
 from .syllabus_mapping import SyllabusMapper
+from .batch_jobs import BatchJobManager, BatchJobRequest
+from teaching_shared.llm_runtime import llm_metrics, warm_up_in_background
+from .paper_renderer import PaperRenderer, FORMATS
+from .models import TestPaper
+from .grading import grade_responses
+from config import Config
 
 app = FastAPI()
 
@@ -21,11 +32,33 @@ app.add_middleware(
 # Initialize components
 question_gen = QuestionGenerator()
 syllabus_mapper = SyllabusMapper()
+batch_jobs = BatchJobManager(
+    question_gen, Config.BATCH_RESULTS_FOLDER, max_workers=Config.BATCH_MAX_WORKERS,
+    max_finished_jobs=Config.BATCH_MAX_FINISHED_JOBS
+)
+paper_renderer = PaperRenderer(
+    Config.RENDER_CACHE_FOLDER, max_workers=Config.RENDER_MAX_WORKERS
+)
+
+
+@app.on_event("startup")
+async def preload_model():
+    warm_up_in_background(
+        Config.OLLAMA_MODEL, Config.OLLAMA_BASE_URL, Config.OLLAMA_KEEP_ALIVE,
+        prefix=question_gen.prompt_prefix
+    )
+
+
+@app.get("/llm-metrics")
+async def get_llm_metrics():
+    """Warm-up probe (cold/warm) and time to first token and latency of recent requests"""
+    return llm_metrics
 
 
 class TopicRequest(BaseModel):
     subject: str
     grade: str
+    board: Optional[str] = None
 
 class QuestionRequest(BaseModel):
     subject: str
@@ -36,19 +69,71 @@ class QuestionRequest(BaseModel):
     difficulty_dist: dict
     bloom_dist: dict
     context: Optional[str] = None
+    total_marks: Optional[int] = None
+
+class RenderRequest(BaseModel):
+    paper: TestPaper
+    format: str = "pdf"
+    answer_key: bool = False
 
 @app.post("/suggest-topics")
 async def suggest_topics(request: TopicRequest):
     try:
-        topics = syllabus_mapper.get_related_topics(request.subject, request.grade)
+        topics = syllabus_mapper.get_related_topics(
+            request.subject, request.grade, request.board
+        )
         return {"topics": topics}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/topics/search")
+async def search_topics(q: str, subject: Optional[str] = None,
+                        grade: Optional[str] = None, board: Optional[str] = None,
+                        limit: int = Query(10, ge=1, le=50)):
+    """Ranked topic suggestions for autocomplete (prefix match, then fuzzy)"""
+    start = time.perf_counter()
+    results = syllabus_mapper.search_topics(
+        q, limit=limit, subject=subject, grade=grade, board=board
+    )
+    return {
+        "query": q,
+        "results": results,
+        "took_ms": round((time.perf_counter() - start) * 1000, 3)
+    }
+
+
+@app.post("/plan-blueprint")
+async def plan_blueprint(request: QuestionRequest):
+    """Preview the exact question allocation without calling the LLM"""
+    try:
+        cells = question_gen.plan(
+            question_types=request.question_types,
+            num_questions=request.num_questions,
+            difficulty_dist=request.difficulty_dist,
+            bloom_dist=request.bloom_dist,
+            total_marks=request.total_marks
+        )
+        return {
+            "blueprint": [cell.dict() for cell in cells],
+            "num_questions": sum(cell.count for cell in cells),
+            "total_marks": question_gen.planner.total_marks(cells),
+            "marks_warning": question_gen.planner.marks_warning(cells, request.total_marks)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/generate-questions")
 async def generate_questions(request: QuestionRequest):
     try:
+        blueprint = question_gen.plan(
+            question_types=request.question_types,
+            num_questions=request.num_questions,
+            difficulty_dist=request.difficulty_dist,
+            bloom_dist=request.bloom_dist,
+            total_marks=request.total_marks
+        )
         questions = question_gen.generate(
             subject=request.subject,
             topic=request.topic,
@@ -57,8 +142,95 @@ async def generate_questions(request: QuestionRequest):
             num_questions=request.num_questions,
             difficulty_dist=request.difficulty_dist,
             bloom_dist=request.bloom_dist,
-            context=request.context
+            context=request.context,
+            blueprint=blueprint
         )
-        return {"questions": questions}
+        planned = sum(cell.count for cell in blueprint)
+        return {
+            "questions": questions,
+            "blueprint": [cell.dict() for cell in blueprint],
+            "total_marks": sum(q.get("marks", 1) for q in questions),
+            # Shortfall and placeholders left by failed LLM calls
+            "missing_questions": max(0, planned - len(questions)),
+            "fallback_questions": sum(1 for q in questions if q.get("fallback")),
+            "marks_warning": question_gen.planner.marks_warning(blueprint, request.total_marks)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/batch-jobs")
+async def create_batch_job(request: BatchJobRequest):
+    """Queue generation of several papers, each in one or more variants"""
+    if not request.papers:
+        raise HTTPException(status_code=400, detail="At least one paper spec is required")
+    job_id = batch_jobs.submit(request)
+    return {"job_id": job_id, "status": "queued"}
+
+
+@app.get("/batch-jobs/{job_id}")
+async def get_batch_job(job_id: str):
+    status = batch_jobs.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Batch job '{job_id}' not found")
+    return status
+
+
+@app.get("/batch-jobs/{job_id}/download")
+async def download_batch_job(job_id: str):
+    path = batch_jobs.result_path(job_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Batch job results are not available")
+    return FileResponse(path, media_type="application/json", filename=f"papers_{job_id}.json")
+
+
+@app.post("/render-paper")
+async def render_paper(request: RenderRequest):
+    """Print-ready PDF/DOCX of a paper or its answer key (cached by content)"""
+    if request.format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {request.format}")
+    try:
+        path = await asyncio.wrap_future(paper_renderer.submit(
+            request.paper.dict(), request.format, request.answer_key
+        ))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Rendering failed: {e}")
+    suffix = "answer_key" if request.answer_key else "paper"
+    return FileResponse(
+        path, media_type=FORMATS[request.format],
+        filename=f"{request.paper.subject}_{request.paper.topic}_{suffix}.{request.format}"
+    )
+
+
+@app.post("/grade")
+async def grade(paper: str = Form(...), responses: UploadFile = File(...)):
+    """Grade a CSV of answer sheets (student_id, Q1..Qn) against a paper's
+    objective questions and return score and item statistics"""
+    try:
+        # Round-trip through JSON so enum fields become plain strings
+        paper_data = json.loads(TestPaper(**json.loads(paper)).json())
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=f"Invalid paper: {e}")
+    content = await responses.read()
+    try:
+        result = await asyncio.to_thread(grade_responses, paper_data, content)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not grade responses: {e}")
+
+    results_id = uuid.uuid4().hex
+    Config.GRADING_RESULTS_FOLDER.mkdir(parents=True, exist_ok=True)
+    result["students"].to_csv(Config.GRADING_RESULTS_FOLDER / f"{results_id}.csv", index=False)
+    return {
+        "results_id": results_id,
+        "summary": result["summary"],
+        "questions": result["questions"],
+        "ungraded_questions": result["ungraded_questions"]
+    }
+
+
+@app.get("/grade/{results_id}/download")
+async def download_grades(results_id: str):
+    path = Config.GRADING_RESULTS_FOLDER / f"{results_id}.csv"
+    if not results_id.isalnum() or not path.exists():
+        raise HTTPException(status_code=404, detail="Grading results not found")
+    return FileResponse(path, media_type="text/csv", filename=f"scores_{results_id}.csv")
\ No newline at end of file
@@ -28,7 +28,7 @@ class Question(BaseModel):
     text: str
     type: QuestionType
     options: List[str] = None
-    answer: str
+    answer: str = ""
     bloom_level: BloomLevel
     difficulty: DifficultyLevel
     marks: int = 1
@@ -38,4 +38,11 @@ class TestPaper(BaseModel):
     topic: str
     grade: str
     questions: List[Question]
-    total_marks: int
\ No newline at end of file
+    total_marks: int
+
+class BlueprintCell(BaseModel):
+    question_type: str
+    difficulty: str
+    bloom_level: str
+    count: int
+    marks: int = 1
@@ -0,0 +1,178 @@
+# api/paper_renderer.py
+import hashlib
+import io
+import json
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+
+from config import Config
+
+# Bump when the layout changes so cached artifacts are re-rendered
+RENDERER_VERSION = "2"
+FORMATS = {"pdf": "application/pdf",
+           "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document"}
+OPTION_LABELS = "abcdefghij"
+# Unicode TTFs tried in order when PAPER_FONT_PATH is not set; each covers
+# Latin plus Devanagari so Hindi papers print correctly
+FONT_CANDIDATES = (
+    "/usr/share/fonts/truetype/noto/NotoSansDevanagari-Regular.ttf",
+    "/usr/share/fonts/noto/NotoSansDevanagari-Regular.ttf",
+    "/usr/share/fonts/truetype/freefont/FreeSerif.ttf",
+    "/usr/share/fonts/gnu-free/FreeSerif.ttf",
+    "/usr/share/fonts/truetype/lohit-devanagari/Lohit-Devanagari.ttf",
+    "C:/Windows/Fonts/Nirmala.ttf",
+    "/System/Library/Fonts/Supplemental/Devanagari Sangam MN.ttc",
+)
+
+
+def _paper_lines(paper: dict, answer_key: bool):
+    """Yield (kind, text) pairs shared by every output format"""
+    title = f"{paper['subject']} - {paper['topic']}"
+    yield "title", title + (" (Answer Key)" if answer_key else "")
+    yield "subtitle", f"Grade {paper['grade']}    Total Marks: {paper['total_marks']}"
+    for i, q in enumerate(paper["questions"], 1):
+        yield "question", f"Q{i}. {q['text']} ({q.get('marks', 1)} mark(s))"
+        if answer_key:
+            yield "answer", f"Answer: {q.get('answer') or '-'}"
+            continue
+        for label, option in zip(OPTION_LABELS, q.get("options") or []):
+            yield "option", f"({label}) {option}"
+        if q.get("type") in ("short_answer", "long_answer"):
+            lines = 3 if q["type"] == "short_answer" else 8
+            for _ in range(lines):
+                yield "blank", "_" * 80
+
+
+def _unicode_font() -> Optional[str]:
+    for path in (Config.PAPER_FONT_PATH, *FONT_CANDIDATES):
+        if path and path.lower().endswith(".ttf") and os.path.exists(path):
+            return path
+    return None
+
+
+def render_pdf(paper: dict, answer_key: bool = False) -> bytes:
+    import fpdf
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    font_path = _unicode_font()
+    if font_path:
+        # Don't write font metric caches next to system fonts
+        fpdf.set_global("FPDF_CACHE_MODE", 1)
+        for font_style in ("", "B", "I"):
+            # Separate bold/italic files are rarely installed; reuse the regular face
+            pdf.add_font("PaperFont", font_style, font_path, uni=True)
+    else:
+        print("No Unicode font found (set PAPER_FONT_PATH); non-Latin text will not print")
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+    styles = {
+        "title": ("B", 16, 10),
+        "subtitle": ("", 11, 8),
+        "question": ("B", 11, 7),
+        "option": ("", 11, 6),
+        "answer": ("I", 11, 6),
+        "blank": ("", 9, 6),
+    }
+    for kind, text in _paper_lines(paper, answer_key):
+        style, size, height = styles[kind]
+        if kind == "question":
+            pdf.ln(3)
+        if font_path:
+            pdf.set_font("PaperFont", style, size)
+            safe = text
+        else:
+            pdf.set_font("Arial", style, size)
+            # Core PDF fonts are Latin-1 only
+            safe = text.encode("latin-1", "replace").decode("latin-1")
+        indent = 8 if kind in ("option", "answer") else 0
+        pdf.set_x(pdf.l_margin + indent)
+        pdf.multi_cell(0, height, safe, align="C" if kind in ("title", "subtitle") else "L")
+    output = pdf.output(dest="S")
+    return output.encode("latin-1") if isinstance(output, str) else bytes(output)
+
+
+def render_docx(paper: dict, answer_key: bool = False) -> bytes:
+    from docx import Document
+    from docx.shared import Pt
+
+    document = Document()
+    for kind, text in _paper_lines(paper, answer_key):
+        if kind == "title":
+            document.add_heading(text, level=1)
+        elif kind == "subtitle":
+            document.add_paragraph(text)
+        elif kind == "question":
+            document.add_paragraph().add_run(text).bold = True
+        elif kind == "answer":
+            document.add_paragraph().add_run(text).italic = True
+        else:
+            paragraph = document.add_paragraph(text)
+            paragraph.paragraph_format.left_indent = Pt(18 if kind == "option" else 0)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def _render_to_file(paper: dict, fmt: str, answer_key: bool, path: str) -> str:
+    """Worker entry point: render and write atomically to ``path``"""
+    data = render_pdf(paper, answer_key) if fmt == "pdf" else render_docx(paper, answer_key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return path
+
+
+class PaperRenderer:
+    """Renders test papers in a process pool with a content-addressed cache.
+
+    Artifacts are keyed by a hash of the canonical paper JSON, the format and
+    whether it is the answer key, so printing the same paper many times (or
+    asking for it concurrently) renders it once.
+    """
+
+    def __init__(self, cache_dir: Path, max_workers: int = 2):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_workers = max_workers
+        self._executor = None
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cache_key(paper: dict, fmt: str, answer_key: bool) -> str:
+        canonical = json.dumps(paper, sort_keys=True, separators=(",", ":"), default=str)
+        digest = hashlib.sha256(
+            f"{RENDERER_VERSION}|{fmt}|{int(answer_key)}|{canonical}".encode("utf-8")
+        )
+        return digest.hexdigest()
+
+    def submit(self, paper: dict, fmt: str, answer_key: bool = False) -> Future:
+        """Future resolving to the path of the rendered artifact"""
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format: {fmt}")
+        key = self.cache_key(paper, fmt, answer_key)
+        path = self.cache_dir / f"{key}.{fmt}"
+
+        with self._lock:
+            if path.exists():
+                done = Future()
+                done.set_result(str(path))
+                return done
+            if key in self._in_flight:
+                return self._in_flight[key]
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            future = self._executor.submit(_render_to_file, paper, fmt, answer_key, str(path))
+            self._in_flight[key] = future
+
+        future.add_done_callback(lambda _: self._forget(key))
+        return future
+
+    def _forget(self, key: str):
+        with self._lock:
+            self._in_flight.pop(key, None)
@@ -2,10 +2,15 @@
 from langchain_community.llms import Ollama
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.messages import get_buffer_string
 from typing import List, Dict
 import json
 import requests
-from .models import Question, QuestionType, DifficultyLevel, BloomLevel
+from teaching_shared.llm_runtime import request_timer
+from .models import Question, QuestionType, DifficultyLevel, BloomLevel, BlueprintCell
+from .dedup import QuestionDeduplicator
+from .blueprint import BlueprintPlanner
+from config import Config
 
 class RAGClient:
     def __init__(self, backend_url: str = "http://localhost:8001"):
@@ -33,105 +38,170 @@ class RAGClient:
         return None
 
 
+BATCH_SYSTEM_PROMPT = """You are an expert educational test paper generator for Indian government schools.
+You will be asked for an exact number of questions of one type, difficulty and Bloom's taxonomy level.
+
+Rules:
+1. Ensure ALL questions are DISTINCT and cover different aspects
+2. Vary question phrasing and focus areas
+3. For MCQs: provide 4 options per question
+4. For fill-in-the-blanks: underline blanks like _____
+5. For match: provide 4 pairs per question
+6. For true/false: provide the correct answer
+
+Return ONLY this JSON structure:
+{{
+    "questions": [
+        {{
+            "question": "question text",
+            "type": "the requested question type",
+            "difficulty": "the requested difficulty",
+            "bloom_level": "the requested Bloom's level",
+            "options": ["option1", ...],  // if applicable
+            "answer": "the correct answer"
+        }},
+        // more questions...
+    ]
+}}
+"""
+
+
+def _answer_text(answer) -> str:
+    """Models sometimes answer with a bool, number or list; the paper schema wants text"""
+    if isinstance(answer, list):
+        return ", ".join(str(a) for a in answer)
+    return "" if answer is None else str(answer)
+
+
 class QuestionGenerator:
-    def __init__(self):
-        self.llm = Ollama(model="llama2")
+    def __init__(self, dedup_threshold: float = 0.7, max_topup_rounds: int = 2):
+        self.llm = Ollama(
+            model=Config.OLLAMA_MODEL,
+            base_url=Config.OLLAMA_BASE_URL,
+            keep_alive=Config.OLLAMA_KEEP_ALIVE,
+            callbacks=[request_timer]
+        )
         self.parser = JsonOutputParser()
         self.rag_client = RAGClient()
+        self.deduplicator = QuestionDeduplicator(threshold=dedup_threshold)
+        self.max_topup_rounds = max_topup_rounds
+        self.planner = BlueprintPlanner(self._calculate_marks)
         
+        # The system message has no template variables so every call shares an
+        # identical prefix that Ollama can reuse from its prompt cache.
+        # Request-specific details go in the human message after it.
         self.batch_prompt_template = ChatPromptTemplate.from_messages([
-            ("system", """You are an expert educational test paper generator for Indian government schools.
-            Generate EXACTLY {num_questions} UNIQUE questions of type {question_type} based on:
+            ("system", BATCH_SYSTEM_PROMPT),
+            ("human", """Generate EXACTLY {num_questions} UNIQUE questions of type {question_type} based on:
             - Subject: {subject}
             - Topic: {topic}
             - Grade: {grade}
-            - Difficulty distribution: {difficulty_dist}
-            - Bloom's taxonomy distribution: {bloom_dist}
-            
-            Rules:
-            1. Ensure ALL questions are DISTINCT and cover different aspects
-            2. Vary question phrasing and focus areas
-            3. For MCQs: provide 4 options per question
-            4. For fill-in-the-blanks: underline blanks like _____
-            5. For match: provide 4 pairs per question
-            6. For true/false: provide the correct answer
-            
-            Return ONLY this JSON structure:
-            {{
-                "questions": [
-                    {{
-                        "question": "question text",
-                        "type": "{question_type}",
-                        "difficulty": "easy/medium/hard",
-                        "bloom_level": "remember/understand/etc",
-                        "options": ["option1", ...]  // if applicable
-                    }},
-                    // more questions...
-                ]
-            }}
-            """),
-            ("human", "Generate {num_questions} {question_type} questions about {topic} in {subject} for grade {grade}")
+            - Difficulty: {difficulty} (every question)
+            - Bloom's taxonomy level: {bloom_level} (every question)""")
         ])
         
         self.batch_chain = self.batch_prompt_template | self.llm | self.parser
+        # Rendered static prefix, used to prime the runtime's prompt cache
+        self.prompt_prefix = get_buffer_string(
+            [self.batch_prompt_template.messages[0].format()]
+        )
+
+    def plan(self, question_types: List[str], num_questions: int,
+             difficulty_dist: Dict[str, float], bloom_dist: Dict[str, float],
+             total_marks: int = None) -> List[BlueprintCell]:
+        """Exact per-cell question counts for the requested blueprint"""
+        return self.planner.plan(
+            question_types, num_questions, difficulty_dist, bloom_dist, total_marks
+        )
 
     def generate(self, subject: str, topic: str, grade: str, 
                 question_types: List[str], num_questions: int,
                 difficulty_dist: Dict[str, float], 
                 bloom_dist: Dict[str, float],
-                context: str = None) -> List[dict]:
+                context: str = None,
+                total_marks: int = None,
+                blueprint: List[BlueprintCell] = None) -> List[dict]:
         
         # Get context once at the beginning
         rag_context = context or self.rag_client.get_context(
             f"{subject} {topic} for grade {grade}"
         ) or ""
         print("📝📝📝📝📝📝📝📝📝📝📝", rag_context)
-        
+
+        # Fix the exact paper layout before spending any LLM calls
+        cells = blueprint or self.plan(
+            question_types, num_questions, difficulty_dist, bloom_dist, total_marks
+        )
+        return self.generate_from_blueprint(subject, topic, grade, cells, rag_context)
+
+    def generate_from_blueprint(self, subject: str, topic: str, grade: str,
+                                cells: List[BlueprintCell], rag_context: str) -> List[dict]:
+        """Generate questions for a fixed blueprint with already-retrieved context"""
         questions = []
-        for q_type in question_types:
-            num = num_questions // len(question_types)
-            if num < 1:
-                num = 1
-                
+        for cell in cells:
+            num = cell.count
             try:
-                # Generate all questions of this type in one batch
-                response = self.batch_chain.invoke({
-                    "subject": subject,
-                    "topic": topic,
-                    "grade": grade,
-                    "question_type": q_type,
-                    "num_questions": num,
-                    "difficulty_dist": difficulty_dist,
-                    "bloom_dist": bloom_dist,
-                    "context": rag_context
-                })
-                
-                if not isinstance(response, dict) or "questions" not in response:
-                    raise ValueError("Invalid response format")
-                
-                for q in response["questions"]:
-                    questions.append({
-                        "text": q.get("question", f"Question about {topic}"),
-                        "type": q_type,
-                        "options": q.get("options", []),
-                        "bloom_level": q.get("bloom_level", 
-                            self._select_from_distribution(bloom_dist)),
-                        "difficulty": q.get("difficulty",
-                            self._select_from_distribution(difficulty_dist)),
-                        "marks": self._calculate_marks(
-                            q.get("difficulty", "easy"),
-                            q.get("bloom_level", "remember"))
-                    })
-                    
+                # One targeted call per blueprint cell
+                batch = self._generate_batch(subject, topic, grade, cell, num, rag_context)
+                fresh = self.deduplicator.deduplicate(
+                    batch, existing=[q["text"] for q in questions]
+                )[:num]
+
+                # Top up with follow-up calls when duplicates were dropped
+                rounds = 0
+                while len(fresh) < num and rounds < self.max_topup_rounds:
+                    rounds += 1
+                    extra = self._generate_batch(
+                        subject, topic, grade, cell, num - len(fresh), rag_context
+                    )
+                    fresh.extend(self.deduplicator.deduplicate(
+                        extra, existing=[q["text"] for q in questions + fresh]
+                    ))
+                questions.extend(fresh[:num])
+
             except Exception as e:
-                print(f"Error batch generating {q_type} questions: {e}")
+                print(f"Error batch generating {cell.question_type} questions: {e}")
                 # Fallback to individual generation if batch fails
-                questions.extend(self._generate_individual_questions(
-                    subject, topic, grade, q_type, num,
-                    difficulty_dist, bloom_dist, rag_context
+                individual = self._generate_individual_questions(
+                    subject, topic, grade, cell.question_type, num,
+                    cell.difficulty, cell.bloom_level, rag_context
+                )
+                # Placeholders are identical by design; only real questions are deduplicated
+                generated = [q for q in individual if not q.get("fallback")]
+                questions.extend(self.deduplicator.deduplicate(
+                    generated, existing=[q["text"] for q in questions]
                 ))
+                questions.extend(q for q in individual if q.get("fallback"))
         return questions
 
+    def _generate_batch(self, subject, topic, grade, cell: BlueprintCell,
+                        num: int, context) -> List[dict]:
+        """Generate up to ``num`` questions for one blueprint cell in a single LLM call"""
+        response = self.batch_chain.invoke({
+            "subject": subject,
+            "topic": topic,
+            "grade": grade,
+            "question_type": cell.question_type,
+            "num_questions": num,
+            "difficulty": cell.difficulty,
+            "bloom_level": cell.bloom_level,
+            "context": context
+        })
+
+        if not isinstance(response, dict) or "questions" not in response:
+            raise ValueError("Invalid response format")
+
+        # Labels and marks come from the plan, not from the model's output
+        return [{
+            "text": q.get("question", f"Question about {topic}"),
+            "type": cell.question_type,
+            "options": [str(option) for option in q.get("options") or []],
+            "answer": _answer_text(q.get("answer", "")),
+            "bloom_level": cell.bloom_level,
+            "difficulty": cell.difficulty,
+            "marks": cell.marks
+        } for q in response["questions"]]
+
     def _create_fallback_question(self, subject, topic, q_type, difficulty, bloom_level):
         """Create a simple fallback question when generation fails"""
         base_question = f"Explain {topic} in {subject}"
@@ -144,7 +214,8 @@ class QuestionGenerator:
                 "answer": "Option 1",
                 "bloom_level": bloom_level,
                 "difficulty": difficulty,
-                "marks": 1
+                "marks": self._calculate_marks(difficulty, bloom_level),
+                "fallback": True
             }
         return {
             "text": base_question,
@@ -152,19 +223,17 @@ class QuestionGenerator:
             "answer": f"Sample answer about {topic}",
             "bloom_level": bloom_level,
             "difficulty": difficulty,
-            "marks": 1 if difficulty == "easy" else 2
+            "marks": self._calculate_marks(difficulty, bloom_level),
+            "fallback": True
         }
 
     def _generate_individual_questions(self, subject, topic, grade, q_type, num,
-                                     difficulty_dist, bloom_dist, context):
+                                     difficulty, bloom_level, context):
         """Fallback method for individual question generation"""
         questions = []
         existing_questions = set()
         
         while len(questions) < num:
-            difficulty = self._select_from_distribution(difficulty_dist)
-            bloom_level = self._select_from_distribution(bloom_dist)
-            
             try:
                 response = self.chain.invoke({
                     "subject": subject,
@@ -200,13 +269,6 @@ class QuestionGenerator:
         
         return questions
     
-    def _select_from_distribution(self, distribution: Dict[str, float]) -> str:
-        import random
-        return random.choices(
-            list(distribution.keys()), 
-            weights=list(distribution.values())
-        )[0]
-    
     def _calculate_marks(self, difficulty: str, bloom_level: str) -> int:
         base = 1
         if difficulty == "medium": base += 0.5
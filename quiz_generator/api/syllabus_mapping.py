@@ -1,17 +1,197 @@
-# Sample syllabus mapping for Indian curriculum
-SYLLABUS = {
-    "mathematics": {
-        "5": ["Numbers", "Operations", "Fractions", "Geometry", "Measurement"],
-        "6": ["Integers", "Algebra", "Ratio and Proportion", "Basic Geometry"],
-        "7": ["Number System", "Algebra", "Data Handling", "Mensuration"]
-    },
-    "science": {
-        "5": ["Plants", "Animals", "Natural Resources", "Environment"],
-        "6": ["Food", "Materials", "Living Organisms", "Motion"],
-        "7": ["Nutrition", "Fibre to Fabric", "Heat", "Acids and Bases"]
-    }
-}
+# api/syllabus_mapping.py
+import csv
+import json
+import re
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+SYLLABUS_FOLDER = Path(__file__).resolve().parent.parent / "syllabi"
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _TrieNode:
+    __slots__ = ("children", "entries", "ranked")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        # entry id -> whether the whole topic name starts at this node's prefix
+        self.entries: Dict[int, bool] = {}
+        self.ranked: Optional[List[tuple]] = None
+
+
+class TopicIndex:
+    """In-memory topic search over every loaded syllabus.
+
+    Each word suffix of a topic name ("linear equations", "equations") is
+    inserted into a prefix trie whose nodes hold every topic below them in
+    rank order, so autocomplete is a walk of ``len(query)`` nodes plus reading
+    the first ``limit`` matches. Queries with too few prefix matches fall back
+    to trigram similarity for typos.
+    """
+
+    def __init__(self):
+        self.entries: List[dict] = []
+        self._root = _TrieNode()
+        self._trigram_index: Dict[str, List[int]] = defaultdict(list)
+        self._trigram_counts: List[int] = []
+        self._by_subject_grade: Dict[tuple, List[int]] = defaultdict(list)
+
+    def add(self, board: str, subject: str, grade: str, topic: str):
+        entry_id = len(self.entries)
+        normalized = _normalize(topic)
+        self.entries.append({
+            "board": board,
+            "subject": subject.lower(),
+            "grade": str(grade),
+            "topic": topic,
+            "normalized": normalized,
+        })
+        self._by_subject_grade[(subject.lower(), str(grade))].append(entry_id)
+
+        words = normalized.split()
+        for start in range(len(words)):
+            node = self._root
+            for char in " ".join(words[start:]):
+                node = node.children.setdefault(char, _TrieNode())
+                node.entries[entry_id] = node.entries.get(entry_id, False) or start == 0
+                node.ranked = None
+        grams = _trigrams(normalized)
+        for gram in grams:
+            self._trigram_index[gram].append(entry_id)
+        self._trigram_counts.append(len(grams))
+
+    def prepare(self):
+        """Rank every trie node up front so no query pays for sorting"""
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            self._ranked(node)
+            stack.extend(node.children.values())
+
+    def topics_for(self, subject: str, grade: str,
+                   board: Optional[str] = None) -> List[str]:
+        topics = []
+        for entry_id in self._by_subject_grade.get((subject.lower(), str(grade)), []):
+            entry = self.entries[entry_id]
+            if board and entry["board"].lower() != board.lower():
+                continue
+            if entry["topic"] not in topics:
+                topics.append(entry["topic"])
+        return topics
+
+    def _ranked(self, node: _TrieNode) -> List[tuple]:
+        """(entry id, score) pairs for a node, best first, cached until the
+        next insert. Whole-name prefixes beat word prefixes; shorter names
+        come first."""
+        if node.ranked is None:
+            node.ranked = sorted(
+                ((entry_id, (2.0 if starts else 1.5)
+                  - len(self.entries[entry_id]["normalized"]) / 1000)
+                 for entry_id, starts in node.entries.items()),
+                key=lambda item: item[1], reverse=True
+            )
+        return node.ranked
+
+    def search(self, query: str, limit: int = 10, subject: Optional[str] = None,
+               grade: Optional[str] = None, board: Optional[str] = None) -> List[dict]:
+        query = _normalize(query)
+        if not query:
+            return []
+
+        def allowed(entry):
+            return ((not subject or entry["subject"] == subject.lower())
+                    and (not grade or entry["grade"] == str(grade))
+                    and (not board or entry["board"].lower() == board.lower()))
+
+        scored = {}
+        node = self._root
+        for char in query:
+            node = node.children.get(char)
+            if node is None:
+                break
+        else:
+            for entry_id, score in self._ranked(node):
+                if allowed(self.entries[entry_id]):
+                    scored[entry_id] = score
+                    if len(scored) >= limit:
+                        break
+
+        if len(scored) < limit:
+            grams = _trigrams(query)
+            shared = defaultdict(int)
+            for gram in grams:
+                for entry_id in self._trigram_index.get(gram, ()):
+                    shared[entry_id] += 1
+            for entry_id, count in shared.items():
+                if entry_id in scored:
+                    continue
+                entry = self.entries[entry_id]
+                dice = 2 * count / (len(grams) + self._trigram_counts[entry_id])
+                if dice >= 0.3 and allowed(entry):
+                    scored[entry_id] = dice
+
+        ranked = sorted(scored.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [
+            {
+                "topic": self.entries[entry_id]["topic"],
+                "subject": self.entries[entry_id]["subject"],
+                "grade": self.entries[entry_id]["grade"],
+                "board": self.entries[entry_id]["board"],
+                "score": round(score, 3),
+            }
+            for entry_id, score in ranked
+        ]
+
+
+def load_syllabi(folder: Path = SYLLABUS_FOLDER) -> TopicIndex:
+    """Build a TopicIndex from every *.json and *.csv syllabus in ``folder``.
+
+    JSON files hold ``{"board": ..., "subjects": {subject: {grade: [topics]}}}``;
+    CSV files have ``board,subject,grade,topic`` columns.
+    """
+    index = TopicIndex()
+    folder = Path(folder)
+    if not folder.exists():
+        print(f"Syllabus folder not found: {folder}")
+        return index
+
+    for path in sorted(folder.iterdir()):
+        try:
+            if path.suffix == ".json":
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                board = data.get("board", path.stem)
+                for subject, grades in data.get("subjects", {}).items():
+                    for grade, topics in grades.items():
+                        for topic in topics:
+                            index.add(board, subject, grade, topic)
+            elif path.suffix == ".csv":
+                with open(path, "r", encoding="utf-8", newline="") as f:
+                    for row in csv.DictReader(f):
+                        index.add(row.get("board") or path.stem, row["subject"],
+                                  row["grade"], row["topic"])
+        except Exception as e:
+            print(f"Error loading syllabus {path.name}: {e}")
+    index.prepare()
+    return index
+
 
 class SyllabusMapper:
-    def get_related_topics(self, subject: str, grade: str) -> list[str]:
-        return SYLLABUS.get(subject.lower(), {}).get(grade, [])
\ No newline at end of file
+    def __init__(self, folder: Path = SYLLABUS_FOLDER):
+        self.index = load_syllabi(folder)
+
+    def get_related_topics(self, subject: str, grade: str,
+                           board: Optional[str] = None) -> list[str]:
+        return self.index.topics_for(subject, grade, board)
+
+    def search_topics(self, query: str, limit: int = 10, **filters) -> List[dict]:
+        return self.index.search(query, limit=limit, **filters)
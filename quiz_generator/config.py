@@ -3,8 +3,10 @@ from pathlib import Path
 
 class Config:
     # Ollama Configuration
-    OLLAMA_MODEL = "llama2"
-    OLLAMA_BASE_URL = "http://localhost:11434"
+    OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama2")
+    OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+    # How long Ollama keeps the model loaded after a request (e.g. "30m", "-1")
+    OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
     
     # FastAPI Configuration
     API_HOST = "0.0.0.0"
@@ -13,6 +15,17 @@ class Config:
     # File Storage
     UPLOAD_FOLDER = Path("uploads")
     UPLOAD_FOLDER.mkdir(exist_ok=True)
+    BATCH_RESULTS_FOLDER = UPLOAD_FOLDER / "batch_jobs"
+    RENDER_CACHE_FOLDER = UPLOAD_FOLDER / "rendered"
+    GRADING_RESULTS_FOLDER = UPLOAD_FOLDER / "grading"
+    
+    # Bulk generation
+    BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "4"))
+    RENDER_MAX_WORKERS = int(os.getenv("RENDER_MAX_WORKERS", "2"))
+    # Unicode TTF for printed papers (e.g. NotoSansDevanagari-Regular.ttf for Hindi)
+    PAPER_FONT_PATH = os.getenv("PAPER_FONT_PATH", "")
+    # Finished batch jobs kept in memory for status polling
+    BATCH_MAX_FINISHED_JOBS = int(os.getenv("BATCH_MAX_FINISHED_JOBS", "100"))
     
     # Supported Languages
     LANGUAGES = {
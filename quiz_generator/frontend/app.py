@@ -4,11 +4,20 @@ from typing import List, Dict
 import json
 from pathlib import Path
 import os
+from components.paper_preview import build_paper, render_download_buttons
 
 # Configuration
 BACKEND_URL = "http://localhost:8000"  # Update with your FastAPI URL
 SUBJECTS = ["Mathematics", "Science", "Social Studies", "English", "Hindi"]
 GRADES = ["5", "6", "7", "8"]
+QUESTION_TYPES = {
+    "MCQ": "mcq",
+    "Short Answer": "short_answer",
+    "Long Answer": "long_answer",
+    "Fill in the Blanks": "fill_blanks",
+    "Match the Following": "match_following",
+    "True/False": "true_false"
+}
 
 def initialize_session_state():
     """Initialize all required session state variables"""
@@ -72,12 +81,16 @@ def main():
         # Question types
         question_types = st.multiselect(
             "Question Types",
-            ["MCQ", "Short Answer", "Long Answer", "Fill in the Blanks", "Match the Following", "True/False"],
+            list(QUESTION_TYPES),
             default=["MCQ", "Short Answer"]
         )
         
         # Number of questions
         num_questions = st.slider("Number of Questions", 5, 50, 10)
+        total_marks = st.number_input(
+            "Target Total Marks", min_value=0, max_value=200, value=0,
+            help="0 keeps the marks implied by the question mix"
+        )
         
         # Difficulty distribution
         st.subheader("Difficulty Distribution")
@@ -121,11 +134,12 @@ def main():
             "subject": st.session_state.subject,
             "topic": topic,
             "grade": st.session_state.grade,
-            "question_types": [q.lower().replace(" ", "_") for q in question_types],
+            "question_types": [QUESTION_TYPES[q] for q in question_types],
             "num_questions": num_questions,
             "difficulty_dist": difficulty_dist,
             "bloom_dist": bloom_dist,
-            "context": st.session_state.context
+            "context": st.session_state.context,
+            "total_marks": total_marks or None
         }
         
         with st.spinner("Generating questions..."):
@@ -135,8 +149,15 @@ def main():
             )
             
             if response.status_code == 200:
-                st.session_state.questions = response.json()["questions"]
+                result = response.json()
+                st.session_state.questions = result["questions"]
                 st.success("Test paper generated successfully!")
+                if result.get("missing_questions"):
+                    st.warning(f"{result['missing_questions']} question(s) could not be generated")
+                if result.get("marks_warning"):
+                    st.warning(result["marks_warning"])
+                if result.get("fallback_questions"):
+                    st.warning(f"{result['fallback_questions']} placeholder question(s) need replacing")
             else:
                 st.error(f"Failed to generate questions: {response.text}")
     
@@ -180,6 +201,13 @@ def main():
                 file_name=f"{st.session_state.subject}_{topic}_test.txt",
                 mime="text/plain"
             )
+        
+        # Print-ready output rendered by the backend
+        render_download_buttons(
+            BACKEND_URL,
+            build_paper(st.session_state.subject, topic, st.session_state.grade,
+                        st.session_state.questions)
+        )
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,56 @@
+# frontend/components/paper_preview.py
+import requests
+import streamlit as st
+
+
+def build_paper(subject: str, topic: str, grade: str, questions: list) -> dict:
+    """TestPaper payload for the backend renderer"""
+    return {
+        "subject": subject,
+        "topic": topic,
+        "grade": grade,
+        "questions": questions,
+        "total_marks": sum(q.get("marks", 1) for q in questions)
+    }
+
+
+@st.cache_data(show_spinner=False)
+def fetch_rendered(backend_url: str, paper: dict, fmt: str, answer_key: bool):
+    """Rendered file bytes; cached per paper so reruns do not refetch"""
+    response = requests.post(
+        f"{backend_url}/render-paper",
+        json={"paper": paper, "format": fmt, "answer_key": answer_key}
+    )
+    if response.status_code == 200:
+        return response.content
+    return None
+
+
+def render_download_buttons(backend_url: str, paper: dict):
+    """Download buttons for the print-ready paper and answer key"""
+    base_name = f"{paper['subject']}_{paper['topic']}"
+    mimes = {
+        "pdf": "application/pdf",
+        "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+    }
+    columns = st.columns(4)
+    buttons = [
+        ("pdf", False, "Paper (PDF)"),
+        ("docx", False, "Paper (DOCX)"),
+        ("pdf", True, "Answer Key (PDF)"),
+        ("docx", True, "Answer Key (DOCX)"),
+    ]
+    for column, (fmt, answer_key, label) in zip(columns, buttons):
+        with column:
+            data = fetch_rendered(backend_url, paper, fmt, answer_key)
+            if data is None:
+                st.caption(f"{label} unavailable")
+                continue
+            suffix = "answer_key" if answer_key else "test"
+            st.download_button(
+                label=f"Download {label}",
+                data=data,
+                file_name=f"{base_name}_{suffix}.{fmt}",
+                mime=mimes[fmt],
+                key=f"download_{fmt}_{suffix}"
+            )
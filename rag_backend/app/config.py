@@ -0,0 +1,8 @@
+# app/config.py
+import os
+
+class Config:
+    OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama2")
+    OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+    # How long Ollama keeps the model loaded after a request (e.g. "30m", "-1")
+    OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
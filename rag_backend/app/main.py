@@ -4,8 +4,10 @@ from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional
-from app.rag import RAGSystem
+from app.rag import RAGSystem, QA_PROMPT_PREFIX
 from app.models import Query
+from app.config import Config
+from teaching_shared.llm_runtime import llm_metrics, warm_up_in_background
 
 app = FastAPI(title="RAG PDF Processor")
 
@@ -21,6 +23,18 @@ app.add_middleware(
 # Initialize RAG system
 rag_system = RAGSystem()
 
+@app.on_event("startup")
+async def preload_model():
+    warm_up_in_background(
+        Config.OLLAMA_MODEL, Config.OLLAMA_BASE_URL, Config.OLLAMA_KEEP_ALIVE,
+        prefix=QA_PROMPT_PREFIX
+    )
+
+@app.get("/llm-metrics/")
+def get_llm_metrics():
+    """Warm-up probe (cold/warm) and time to first token and latency of recent requests"""
+    return llm_metrics
+
 @app.post("/upload/")
 async def upload_pdf(file: UploadFile = File(...)):
     try:
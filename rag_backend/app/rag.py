@@ -7,12 +7,23 @@ from langchain.llms import Ollama
 from langchain.prompts import PromptTemplate
 from langchain.chains import RetrievalQA
 import os
+from teaching_shared.llm_runtime import request_timer
+from app.config import Config
+
+QA_PROMPT_PREFIX = """Use the following pieces of context to answer the question at the end. 
+        If you don't know the answer, just say that you don't know, don't try to make up an answer.
+        """
 
 class RAGSystem:
     def __init__(self):
         # Initialize embeddings and LLM
-        self.embeddings = OllamaEmbeddings(model="llama2")
-        self.llm = Ollama(model="llama2")
+        self.embeddings = OllamaEmbeddings(model=Config.OLLAMA_MODEL, base_url=Config.OLLAMA_BASE_URL)
+        self.llm = Ollama(
+            model=Config.OLLAMA_MODEL,
+            base_url=Config.OLLAMA_BASE_URL,
+            keep_alive=Config.OLLAMA_KEEP_ALIVE,
+            callbacks=[request_timer]
+        )
         
         # Initialize vector store
         self.vector_store = None
@@ -43,9 +54,8 @@ class RAGSystem:
             return
             
         self.retriever = self.vector_store.as_retriever(search_kwargs={"k": 3})
-        prompt_template = """Use the following pieces of context to answer the question at the end. 
-        If you don't know the answer, just say that you don't know, don't try to make up an answer.
-        
+        # Static instructions stay ahead of {context} so the prefix is cacheable
+        prompt_template = QA_PROMPT_PREFIX + """
         {context}
         
         Question: {question}
@@ -2,7 +2,14 @@
 from fastapi import FastAPI, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
 from .scheduler import ScheduleGenerator
+from .timetable_solver import solve_timetable, TimetableError
+from .conflicts import ConflictIndex
+from .schedule_store import ScheduleStore, ScheduleNotFound
+from .school_planner import school_jobs, start_school_job
 from .utils import extract_text_from_pdf, extract_text_from_excel, speech_to_text
+from teaching_shared.llm_runtime import llm_metrics, warm_up_in_background
+from .stt import stt_metrics, REPORTED_METRICS, warm_up_stt_in_background
+from config import Config
 import json
 from typing import Optional
 from fastapi import Request 
@@ -19,6 +26,35 @@ app.add_middleware(
 )
 
 scheduler = ScheduleGenerator()
+# Teacher/room occupancy of every registered section, for clash detection
+conflict_index = ConflictIndex()
+# Every generated schedule and its refinements, addressed by schedule id
+schedule_store = ScheduleStore(Config.SCHEDULE_STORE_DIR, Config.SCHEDULE_SNAPSHOT_EVERY)
+
+@app.on_event("startup")
+async def preload_model():
+    warm_up_in_background(
+        Config.OLLAMA_MODEL, Config.OLLAMA_BASE_URL, Config.OLLAMA_KEEP_ALIVE,
+        prefix=scheduler.prompt_prefix
+    )
+    warm_up_stt_in_background()
+
+@app.get("/llm_metrics")
+async def get_llm_metrics():
+    """Warm-up probe (cold/warm) and time to first token and latency of recent requests"""
+    return llm_metrics
+
+@app.get("/stt_metrics")
+async def get_stt_metrics():
+    """Speech-to-text engine, model load time, latency and real-time factor"""
+    return stt_metrics
+
+@app.post("/stt_metrics")
+async def report_stt_metrics(request: Request):
+    """Measurements from the live recorder, which transcribes in the Streamlit process"""
+    data = await request.json()
+    stt_metrics.update({key: data[key] for key in REPORTED_METRICS if key in data})
+    return {"status": "success"}
 
 @app.post("/generate_with_context")
 async def generate_with_context(request: Request):
@@ -30,24 +66,174 @@ async def generate_with_context(request: Request):
         schedule_type=data.get('schedule_type', 'weekly_timetable'),
         preferences=data.get('preferences', {})
     )
+    if result.get("status") == "success":
+        result.update(schedule_store.create(result["schedule"]))
     return result
 
+@app.post("/solve_timetable")
+async def solve_timetable_endpoint(request: Request):
+    """Solve a weekly timetable from structured constraints, without the LLM"""
+    data = await request.json()
+    try:
+        timetable = solve_timetable(data.get('constraints', data))
+    except (TimetableError, KeyError, TypeError, ValueError) as e:
+        return {"status": "error", "message": f"Timetable constraints cannot be met: {str(e)}"}
+    return {"status": "success", "schedule": timetable, **schedule_store.create(timetable, source="solve")}
+
 @app.post("/refine_schedule")
 async def refine_schedule(request: Request):
+    """Refine the latest version of ``schedule_id`` (or an inline ``current_schedule``)"""
     data = await request.json()
+    schedule_id = data.get('schedule_id')
+    if schedule_id:
+        try:
+            current_schedule = schedule_store.latest(schedule_id)["schedule"]
+        except ScheduleNotFound as e:
+            return {"status": "error", "message": str(e)}
+    else:
+        current_schedule = data['current_schedule']
     result = scheduler.refine_schedule(
-        current_schedule=data['current_schedule'],
+        current_schedule=current_schedule,
         text_feedback=data.get('text', ''),
         voice_feedback=data.get('voice', '')
     )
+    if result.get("status") == "success":
+        mode = result.get("refinement", {}).get("mode", "full")
+        if schedule_id:
+            result.update(schedule_store.commit(schedule_id, result["schedule"], note=f"{mode} refinement"))
+        else:
+            result.update(schedule_store.create(result["schedule"], source="refine"))
+    if data.get('section_id') and result.get("status") == "success":
+        result["conflicts"] = conflict_index.check_section(data['section_id'], result["schedule"])
     return result
 
+@app.post("/timetables/batch")
+async def batch_timetables(request: Request):
+    """Plan timetables for a whole school without teacher or room clashes.
+
+    Body: {"sections": [{"section_id", "constraints"} or {"section_id", "requirements"}],
+    "shared": {bell schedule, "teacher_unavailable", "fixed"}, "register": true}.
+    Returns a job id; poll /timetables/batch/{job_id} for progress and results.
+    """
+    data = await request.json()
+    sections = data.get('sections') or []
+    if isinstance(sections, dict):
+        sections = [{"section_id": key, "constraints": value} for key, value in sections.items()]
+    if not sections or any("section_id" not in s for s in sections):
+        return {"status": "error", "message": "Provide a list of sections, each with a section_id"}
+    section_ids = [str(s["section_id"]) for s in sections]
+    duplicates = sorted({section_id for section_id in section_ids if section_ids.count(section_id) > 1})
+    if duplicates:
+        return {"status": "error", "message": f"Duplicate section_id: {', '.join(duplicates)}"}
+    register = data.get('register', True)
+
+    def on_planned(section_id, timetable):
+        if register:
+            conflict_index.set_section(section_id, timetable)
+        return schedule_store.create(timetable, source="batch")
+
+    job_id = start_school_job(
+        sections, data.get('shared') or {},
+        extract=lambda text: scheduler.extract_timetable_constraints(text, {}),
+        on_planned=on_planned,
+    )
+    return {"status": "success", "job_id": job_id, "total": len(sections)}
+
+@app.get("/timetables/batch/{job_id}")
+async def batch_timetables_progress(job_id: str):
+    job = school_jobs.get(job_id)
+    if job is None:
+        return {"status": "error", "message": f"Unknown job: {job_id}"}
+    return job
+
+@app.get("/schedules/{schedule_id}")
+async def get_schedule(schedule_id: str, version: Optional[int] = None):
+    """The latest version of a schedule, or a specific one with ?version="""
+    try:
+        if version is None:
+            return {"status": "success", **schedule_store.latest(schedule_id)}
+        return {"status": "success", "schedule_id": schedule_id, "version": version,
+                "schedule": schedule_store.get(schedule_id, version)}
+    except ScheduleNotFound as e:
+        return {"status": "error", "message": str(e)}
+
+@app.get("/schedules/{schedule_id}/history")
+async def schedule_history(schedule_id: str):
+    try:
+        return {"status": "success", "schedule_id": schedule_id, "versions": schedule_store.history(schedule_id)}
+    except ScheduleNotFound as e:
+        return {"status": "error", "message": str(e)}
+
+@app.get("/schedules/{schedule_id}/diff")
+async def schedule_diff(schedule_id: str, from_version: int, to_version: Optional[int] = None):
+    """JSON Patch operations between two versions (default: up to the latest)"""
+    try:
+        operations = schedule_store.diff(schedule_id, from_version, to_version)
+    except ScheduleNotFound as e:
+        return {"status": "error", "message": str(e)}
+    return {"status": "success", "schedule_id": schedule_id, "operations": operations}
+
+@app.post("/schedules/{schedule_id}/rollback")
+async def rollback_schedule(schedule_id: str, request: Request):
+    """Restore {"version": n} as a new latest version; later versions stay in the history"""
+    data = await request.json()
+    try:
+        result = schedule_store.rollback(schedule_id, int(data['version']))
+    except (ScheduleNotFound, KeyError, TypeError, ValueError) as e:
+        return {"status": "error", "message": f"Cannot roll back: {str(e)}"}
+    return {"status": "success", **result}
+
+@app.post("/validate")
+async def validate(request: Request):
+    """Detect teacher/room double-booking across sections.
+
+    Send {"section_id", "schedule"} to check one section against all
+    registered ones, or {"sections": {id: timetable}} to check many at once.
+    With "register": true the timetables are stored for later checks.
+    """
+    data = await request.json()
+    register = bool(data.get('register', False))
+
+    if data.get('section_id'):
+        conflicts = conflict_index.check_section(data['section_id'], data.get('schedule') or {})
+        if register:
+            conflict_index.set_section(data['section_id'], data.get('schedule') or {})
+    else:
+        index = conflict_index if register else conflict_index.copy()
+        for section_id, timetable in (data.get('sections') or {}).items():
+            index.set_section(section_id, timetable)
+        conflicts = index.conflicts()
+
+    return {
+        "status": "success",
+        "valid": not conflicts,
+        "conflicts": conflicts,
+        "registered_sections": len(conflict_index.sections())
+    }
+
+@app.post("/validate/edit")
+async def validate_edit(request: Request):
+    """Check one slot change (teacher and/or room) against every other section"""
+    data = await request.json()
+    conflicts = conflict_index.check_edit(
+        data['section_id'], data['day'], data['period'],
+        teacher=data.get('teacher'), room=data.get('room')
+    )
+    return {"status": "success", "valid": not conflicts, "conflicts": conflicts}
+
+@app.delete("/validate/sections/{section_id}")
+async def unregister_section(section_id: str):
+    conflict_index.remove_section(section_id)
+    return {"status": "success", "registered_sections": len(conflict_index.sections())}
+
 
 @app.post("/process_audio")
 async def process_audio_endpoint(audio_file: UploadFile = File(...)):
     audio_bytes = await audio_file.read()
-    processed = process_audio_buffer(audio_bytes)
-    if processed:
-        text = speech_to_text(processed)
+    try:
+        # Decoding, resampling and silence trimming happen in one pass inside speech_to_text
+        text = speech_to_text(audio_bytes)
         return {"text": text}
-    return {"error": "Audio processing failed"}
\ No newline at end of file
+    except Exception as e:
+        print(f"Audio processing error: {e}")
+        return {"error": "Audio processing failed"}
\ No newline at end of file
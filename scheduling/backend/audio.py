@@ -0,0 +1,204 @@
+#backend/audio.py
+import io
+from typing import Optional, Tuple
+
+import numpy as np
+from config import Config
+
+TARGET_RATE = 16000
+_SCALES = {"u8": 128.0, "s16": 32768.0, "s32": 2147483648.0, "flt": 1.0, "dbl": 1.0}
+
+
+def frame_to_mono(frame) -> np.ndarray:
+    """Float32 mono samples in [-1, 1] from a PyAV AudioFrame of any sample format"""
+    samples = frame.to_ndarray()
+    name = frame.format.name
+    channels = len(frame.layout.channels)
+    planar = name.endswith("p")
+    base = name[:-1] if planar else name
+    data = samples.astype(np.float32)
+    if base == "u8":
+        data -= 128.0
+    data /= _SCALES.get(base, 1.0)
+    if planar:
+        return data.reshape(channels, -1).mean(axis=0)
+    return data.reshape(-1, channels).mean(axis=1)
+
+
+def decode_audio(audio_bytes: bytes) -> Tuple[np.ndarray, int]:
+    """(float32 mono samples, sample rate) from an audio file's bytes.
+
+    Container formats (WAV, FLAC, OGG) carry their own rate and channel
+    count; anything else is treated as raw int16 mono at AUDIO_SAMPLE_RATE.
+    """
+    try:
+        import soundfile as sf
+        samples, sample_rate = sf.read(io.BytesIO(audio_bytes), dtype="float32", always_2d=True)
+        return samples.mean(axis=1), sample_rate
+    except Exception:
+        raw = np.frombuffer(audio_bytes[:len(audio_bytes) // 2 * 2], dtype=np.int16)
+        return raw.astype(np.float32) / 32768.0, Config.AUDIO_SAMPLE_RATE
+
+
+def _lowpass_taps(cutoff: float, num_taps: int = 63) -> np.ndarray:
+    """Hann-windowed sinc low-pass; ``cutoff`` as a fraction of the sample rate"""
+    n = np.arange(num_taps) - (num_taps - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hanning(num_taps)
+    return (taps / taps.sum()).astype(np.float32)
+
+
+class StreamResampler:
+    """Anti-aliased resampling of consecutive chunks without seams.
+
+    The filter history and the fractional read position carry over between
+    chunks, so feeding a signal in pieces gives the same result as feeding
+    it whole.
+    """
+
+    def __init__(self, source_rate: int, target_rate: int = TARGET_RATE):
+        self.step = source_rate / target_rate
+        self.taps = _lowpass_taps(0.45 / self.step) if source_rate > target_rate else None
+        self._history = np.zeros(0 if self.taps is None else len(self.taps) - 1, dtype=np.float32)
+        self._carry = np.zeros(0, dtype=np.float32)
+        self._position = 0.0
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        if self.step == 1.0:
+            return samples.astype(np.float32)
+        if self.taps is not None:
+            padded = np.concatenate([self._history, samples])
+            self._history = padded[len(padded) - len(self._history):] if len(self._history) else self._history
+            samples = np.convolve(padded, self.taps, mode="valid")
+        buffer = np.concatenate([self._carry, samples])
+        if len(buffer) < 2:
+            self._carry = buffer
+            return np.zeros(0, dtype=np.float32)
+        positions = np.arange(self._position, len(buffer) - 1, self.step)
+        output = np.interp(positions, np.arange(len(buffer)), buffer).astype(np.float32)
+        next_position = positions[-1] + self.step if len(positions) else self._position
+        self._position = next_position - (len(buffer) - 1)
+        self._carry = buffer[-1:]
+        return output
+
+
+class VoiceActivityTrimmer:
+    """Energy-based voice activity detection that drops silence.
+
+    Audio is cut into ``frame_ms`` frames whose energy is computed in one
+    vectorized pass. A frame is speech when it is ``margin_db`` above the
+    tracked noise floor (and above ``min_db``). Speech keeps ``pre_ms`` of
+    audio before it and ``hangover_ms`` after it, so word edges survive.
+
+    The floor comes from the quietest frames of the last ``window_ms`` and
+    is never above ``max_noise_db``, so continuous speech is not mistaken
+    for noise. When the recent frames are within ``flat_db`` of each other
+    and louder than ``max_noise_db`` there is no silence to find and
+    nothing is trimmed.
+    """
+
+    def __init__(self, sample_rate: int = TARGET_RATE, frame_ms: int = 30, margin_db: float = 10.0,
+                 min_db: float = -50.0, pre_ms: int = 150, hangover_ms: int = 300,
+                 floor_rise_db: float = 0.05, max_noise_db: float = -45.0, flat_db: float = 6.0,
+                 window_ms: int = 3000):
+        self.frame = int(sample_rate * frame_ms / 1000)
+        self.pre = max(1, pre_ms // frame_ms)
+        self.post = max(1, hangover_ms // frame_ms)
+        self.margin_db = margin_db
+        self.min_db = min_db
+        self.floor_rise_db = floor_rise_db
+        self.max_noise_db = max_noise_db
+        self.flat_db = flat_db
+        self.window = max(1, window_ms // frame_ms)
+        self._rest = np.zeros(0, dtype=np.float32)
+        self._tail = np.zeros((0, self.frame), dtype=np.float32)
+        self._hang = 0
+        self._noise_db: Optional[float] = None
+        self._recent_db = np.zeros(0)
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        data = np.concatenate([self._rest, samples.astype(np.float32)])
+        count = len(data) // self.frame
+        self._rest = data[count * self.frame:]
+        if count == 0:
+            return np.zeros(0, dtype=np.float32)
+        frames = data[:count * self.frame].reshape(count, self.frame)
+
+        energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+        # Levels over the recent window (the whole chunk when it is longer)
+        recent = np.concatenate([self._recent_db, energy_db])
+        recent = recent[-max(self.window, count):]
+        self._recent_db = recent[-self.window:]
+        quiet, loud = (float(v) for v in np.percentile(recent, [10, 90]))
+
+        # Noise floor follows quiet frames down at once and rises slowly per frame
+        if self._noise_db is None:
+            self._noise_db = quiet
+        else:
+            self._noise_db = min(self._noise_db + self.floor_rise_db * count, quiet)
+        self._noise_db = min(self._noise_db, self.max_noise_db)
+
+        if loud - quiet < self.flat_db and quiet > self.max_noise_db:
+            # Steady, loud signal (e.g. continuous speech): keep all of it
+            speech = energy_db > self.min_db
+        else:
+            speech = energy_db > max(self._noise_db + self.margin_db, self.min_db)
+
+        held = len(self._tail)
+        frames = np.concatenate([self._tail, frames])
+        speech = np.concatenate([np.zeros(held, dtype=bool), speech])
+        keep = self._dilate(speech)
+        keep[held:held + self._hang] = True
+
+        speech_at = np.flatnonzero(speech)
+        if len(speech_at):
+            self._hang = max(0, self.post - (len(speech) - 1 - speech_at[-1]))
+        else:
+            self._hang = max(0, self._hang - count)
+
+        # Trailing silence may still become pre-roll for speech in the next chunk
+        kept_at = np.flatnonzero(keep)
+        last_kept = kept_at[-1] if len(kept_at) else -1
+        hold_from = max(last_kept + 1, len(frames) - self.pre)
+        self._tail = frames[hold_from:]
+        return frames[:hold_from][keep[:hold_from]].reshape(-1)
+
+    def _dilate(self, speech: np.ndarray) -> np.ndarray:
+        """Frames within ``pre`` before or ``post`` after any speech frame"""
+        kernel = np.ones(self.pre + self.post + 1)
+        # Full convolution index i + pre covers speech in [i - post, i + pre]
+        spread = np.convolve(speech.astype(np.float32), kernel)[self.post:self.post + len(speech)]
+        return spread > 0
+
+
+class AudioPreprocessor:
+    """Downmixed float samples at any rate -> trimmed 16 kHz int16 for recognition"""
+
+    def __init__(self, source_rate: int, vad: bool = True):
+        self.source_rate = source_rate
+        self.resampler = StreamResampler(source_rate, TARGET_RATE)
+        self.trimmer = VoiceActivityTrimmer(TARGET_RATE) if vad else None
+        self.input_seconds = 0.0
+        self.output_seconds = 0.0
+
+    def process(self, mono: np.ndarray) -> np.ndarray:
+        self.input_seconds += len(mono) / self.source_rate
+        samples = self.resampler.process(mono)
+        if self.trimmer is not None:
+            samples = self.trimmer.process(samples)
+        self.output_seconds += len(samples) / TARGET_RATE
+        return (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+
+
+def preprocess_audio(audio_bytes: bytes, vad: bool = True) -> Tuple[np.ndarray, dict]:
+    """Decode, downmix, resample to 16 kHz and trim silence in one pass.
+
+    Returns int16 samples at 16 kHz and the before/after durations.
+    """
+    mono, sample_rate = decode_audio(audio_bytes)
+    preprocessor = AudioPreprocessor(sample_rate, vad=vad)
+    samples = preprocessor.process(mono)
+    return samples, {
+        "source_rate": sample_rate,
+        "input_seconds": round(preprocessor.input_seconds, 3),
+        "speech_seconds": round(preprocessor.output_seconds, 3),
+    }
@@ -0,0 +1,156 @@
+#backend/conflicts.py
+import copy
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+RESOURCE_GRIDS = {"teacher": "teachers", "room": "rooms"}
+
+
+def timetable_cells(timetable: Dict[str, Any]) -> List[Tuple[str, str, str, str]]:
+    """(kind, resource, day, period) for every occupied teacher/room slot.
+
+    Break columns are skipped; periods are identified by their label so
+    sections on the same bell schedule share slots.
+    """
+    periods = timetable.get("periods") or []
+    break_labels = set((timetable.get("breaks") or {}).keys()) if isinstance(timetable.get("breaks"), dict) else set()
+    cells = []
+    for kind, grid_key in RESOURCE_GRIDS.items():
+        grid = timetable.get(grid_key)
+        if not isinstance(grid, dict):
+            continue
+        for day, row in grid.items():
+            for label, resource in zip(periods, row or []):
+                if resource and label not in break_labels:
+                    cells.append((kind, str(resource).strip(), day, label))
+    return cells
+
+
+class ConflictIndex:
+    """Occupancy of teachers and rooms per slot across all sections.
+
+    Occupancy is a uint8 array indexed [resource, section, slot] with a
+    running [resource, slot] count, so a whole-school conflict report is one
+    vectorized scan and checking a single edit is O(1).
+    """
+
+    def __init__(self):
+        self._resources: Dict[Tuple[str, str], int] = {}
+        self._sections: Dict[str, int] = {}
+        self._slots: Dict[Tuple[str, str], int] = {}
+        self._free_rows: List[int] = []
+        self._occ = np.zeros((16, 16, 64), dtype=np.uint8)
+        self._counts = np.zeros((16, 64), dtype=np.uint16)
+
+    def copy(self) -> "ConflictIndex":
+        clone = copy.copy(self)
+        clone._resources = dict(self._resources)
+        clone._sections = dict(self._sections)
+        clone._slots = dict(self._slots)
+        clone._free_rows = list(self._free_rows)
+        clone._occ = self._occ.copy()
+        clone._counts = self._counts.copy()
+        return clone
+
+    def _grow(self, resources: int, sections: int, slots: int):
+        r, s, t = self._occ.shape
+        if resources <= r and sections <= s and slots <= t:
+            return
+        shape = (max(r, _next_size(resources)), max(s, _next_size(sections)), max(t, _next_size(slots)))
+        occ = np.zeros(shape, dtype=np.uint8)
+        occ[:r, :s, :t] = self._occ
+        counts = np.zeros((shape[0], shape[2]), dtype=np.uint16)
+        counts[:r, :t] = self._counts
+        self._occ, self._counts = occ, counts
+
+    @staticmethod
+    def _id(table: dict, key) -> int:
+        if key not in table:
+            table[key] = len(table)
+        return table[key]
+
+    def _section_row(self, section_id: str) -> int:
+        if section_id not in self._sections:
+            self._sections[section_id] = self._free_rows.pop() if self._free_rows else len(self._sections)
+        return self._sections[section_id]
+
+    def _encode(self, cells: Iterable[Tuple[str, str, str, str]]) -> Tuple[np.ndarray, np.ndarray]:
+        resource_ids, slot_ids = [], []
+        for kind, resource, day, period in cells:
+            resource_ids.append(self._id(self._resources, (kind, resource)))
+            slot_ids.append(self._id(self._slots, (day, period)))
+        self._grow(len(self._resources), self._occ.shape[1], len(self._slots))
+        return np.array(resource_ids, dtype=np.intp), np.array(slot_ids, dtype=np.intp)
+
+    def set_section(self, section_id: str, timetable: Dict[str, Any]):
+        """Register (or replace) a section's timetable"""
+        self.remove_section(section_id)
+        row = self._section_row(section_id)
+        resources, slots = self._encode(timetable_cells(timetable))
+        self._grow(self._occ.shape[0], row + 1, self._occ.shape[2])
+        if len(resources):
+            # A resource listed twice in one slot of one section is still one booking
+            self._occ[resources, row, slots] = 1
+            self._counts += self._occ[:, row, :]
+
+    def remove_section(self, section_id: str):
+        row = self._sections.pop(section_id, None)
+        if row is None:
+            return
+        self._counts -= self._occ[:, row, :]
+        self._occ[:, row, :] = 0
+        self._free_rows.append(row)
+
+    def sections(self) -> List[str]:
+        return sorted(self._sections)
+
+    def _occupants(self, resource: int, slot: int, exclude_row: Optional[int] = None) -> List[str]:
+        rows = set(np.nonzero(self._occ[resource, :, slot])[0].tolist()) - {exclude_row}
+        return sorted(section for section, row in self._sections.items() if row in rows)
+
+    def conflicts(self) -> List[Dict[str, Any]]:
+        """Every teacher or room booked by more than one section in the same slot"""
+        resource_names = {v: k for k, v in self._resources.items()}
+        slot_names = {v: k for k, v in self._slots.items()}
+        section_names = {v: k for k, v in self._sections.items()}
+        report = []
+        for resource, slot in np.argwhere(self._counts > 1):
+            kind, name = resource_names[resource]
+            day, period = slot_names[slot]
+            rows = np.nonzero(self._occ[resource, :, slot])[0]
+            report.append({
+                "type": kind, "resource": name, "day": day, "period": period,
+                "sections": sorted(section_names[r] for r in rows.tolist()),
+            })
+        return report
+
+    def check_section(self, section_id: str, timetable: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Conflicts a (possibly edited) section would have with every other section"""
+        own_row = self._sections.get(section_id)
+        report = []
+        for kind, resource, day, period in set(timetable_cells(timetable)):
+            r = self._resources.get((kind, resource))
+            t = self._slots.get((day, period))
+            if r is None or t is None:
+                continue
+            others = int(self._counts[r, t]) - (int(self._occ[r, own_row, t]) if own_row is not None else 0)
+            if others > 0:
+                report.append({
+                    "type": kind, "resource": resource, "day": day, "period": period,
+                    "sections": [section_id] + self._occupants(r, t, exclude_row=own_row),
+                })
+        return sorted(report, key=lambda c: (c["day"], c["period"], c["type"], c["resource"]))
+
+    def check_edit(self, section_id: str, day: str, period: str,
+                   teacher: Optional[str] = None, room: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Conflicts from placing ``teacher``/``room`` in one slot of a section"""
+        cells = {"periods": [period], "teachers": {day: [teacher]}, "rooms": {day: [room]}}
+        return self.check_section(section_id, cells)
+
+
+def _next_size(n: int) -> int:
+    size = 16
+    while size < n:
+        size *= 2
+    return size
@@ -0,0 +1,241 @@
+#backend/lesson_planner.py
+import json
+import time
+from typing import Any, Dict, List
+
+from langchain_core.prompts import ChatPromptTemplate
+from config import Config
+
+# How long plans are cut up: unit name, default count, most allowed, default weeks per unit
+SPLITS = {
+    "term": ("term", 3, 4, 13),
+    "month": ("month", 10, 12, 4),
+    "week": ("week", 4, 6, 1),
+}
+LIST_KEYS = ("teaching_methods", "assessments", "resources")
+
+
+class LessonPlanError(ValueError):
+    """A sub-plan is missing topics or is not a JSON object"""
+
+
+def _as_list(value: Any) -> List[str]:
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        return []
+    return [str(item).strip() for item in value if str(item).strip()]
+
+
+def _unique(items: List[str]) -> List[str]:
+    seen, result = set(), []
+    for item in items:
+        key = item.lower()
+        if key not in seen:
+            seen.add(key)
+            result.append(item)
+    return result
+
+
+def _number(value: Any, default: float) -> float:
+    try:
+        number = float(value)
+        return number if number > 0 else default
+    except (TypeError, ValueError):
+        return default
+
+
+def _weeks(value: float):
+    return int(value) if float(value).is_integer() else round(value, 1)
+
+
+def normalize_outline(raw: Any, unit: str, count: int, weeks: int) -> Dict[str, Any]:
+    """Segments from the outline call, or ``count`` default ones if it gave none.
+
+    At most ``count`` segments are kept and repeated names get a number,
+    since segments are keyed by name when the plans are merged. A shorter
+    outline is kept as it is.
+    """
+    raw = raw if isinstance(raw, dict) else {}
+    segments, used = [], set()
+    raw_segments = raw.get("segments") if isinstance(raw.get("segments"), list) else []
+    for segment in raw_segments:
+        if len(segments) == count:
+            break
+        if not isinstance(segment, dict):
+            continue
+        base = str(segment.get("name") or "").strip() or f"{unit.capitalize()} {len(segments) + 1}"
+        name, n = base, 2
+        while name.lower() in used:
+            name, n = f"{base} ({n})", n + 1
+        used.add(name.lower())
+        segments.append({
+            "name": name,
+            "weeks": _number(segment.get("weeks"), weeks),
+            "focus": _as_list(segment.get("focus")),
+        })
+    if not segments:
+        segments = [{"name": f"{unit.capitalize()} {i + 1}", "weeks": weeks, "focus": []} for i in range(count)]
+    return {"segments": segments, **{key: _as_list(raw.get(key)) for key in LIST_KEYS}}
+
+
+def normalize_sub_plan(raw: Any) -> Dict[str, Any]:
+    """Coerce one segment's JSON into the lesson_plan structure"""
+    if not isinstance(raw, dict):
+        raise LessonPlanError("Sub-plan is not a JSON object")
+    topics = _as_list(raw.get("topics"))
+    if not topics:
+        raise LessonPlanError("Sub-plan has no topics")
+    allocation = raw.get("time_allocation") if isinstance(raw.get("time_allocation"), dict) else {}
+    return {"topics": topics, "time_allocation": allocation, **{key: _as_list(raw.get(key)) for key in LIST_KEYS}}
+
+
+def merge_plans(outline: Dict[str, Any], sub_plans: List[Dict[str, Any]], unit: str) -> Dict[str, Any]:
+    """Reduce step: one lesson plan in the ``topics``/``time_allocation`` format.
+
+    Topics keep teaching order and drop repeats; weeks add up across
+    segments; methods, assessments and resources are merged with the
+    outline's. The per-segment breakdown is kept under ``time_allocation``.
+    """
+    topics, breakdown, hours = [], {}, []
+    for segment, plan in zip(outline["segments"], sub_plans):
+        allocation = plan["time_allocation"]
+        weeks = _number(allocation.get("total_weeks"), segment["weeks"])
+        if allocation.get("hours_per_week") is not None:
+            hours.append(_number(allocation["hours_per_week"], 0))
+        topics.extend(plan["topics"])
+        breakdown[segment["name"]] = {"weeks": _weeks(weeks), "topics": plan["topics"]}
+
+    total_weeks = sum(entry["weeks"] for entry in breakdown.values())
+    hours = [h for h in hours if h]
+    merged = {
+        "topics": _unique(topics),
+        "time_allocation": {
+            "total_weeks": _weeks(total_weeks),
+            "hours_per_week": round(sorted(hours)[len(hours) // 2], 1) if hours else None,
+            f"by_{unit}": breakdown,
+        },
+    }
+    for key in LIST_KEYS:
+        merged[key] = _unique(outline[key] + [item for plan in sub_plans for item in plan[key]])
+    return merged
+
+
+class LessonPlanner:
+    """Annual and monthly plans generated as map-reduce over terms, months or weeks.
+
+    One short outline call fixes the segments and their focus areas. Each
+    segment is then planned by its own small call, several at a time, and
+    the results are merged and validated locally. No single response has to
+    hold a whole year, so outputs stay well inside the context window.
+    """
+
+    def __init__(self, llm, parser):
+        self.llm = llm
+        self.parser = parser
+        # Static instructions first, request data last (prompt-cache friendly)
+        self.outline_prompt = ChatPromptTemplate.from_template("""You outline school lesson plans.
+        Return only JSON of the form
+        {{"segments": [{{"name": "Term 1", "weeks": 12, "focus": ["Number systems", "Fractions"]}}],
+          "teaching_methods": [...], "assessments": [...], "resources": [...]}}
+        List the segments in teaching order with 2-5 short focus areas each. Do not write the detailed plan.
+
+        Requirements:
+        {input}
+
+        Preferences: {preferences}
+
+        Split this {plan_type} plan into {count} {unit}s.
+        """)
+        self.segment_prompt = ChatPromptTemplate.from_template("""You are an expert at creating lesson plans.
+        Return only JSON with:
+        - "topics" (list of topics to cover, in order)
+        - "time_allocation" (dict with "total_weeks" and "hours_per_week")
+        - "teaching_methods" (list)
+        - "assessments" (list)
+        - "resources" (list)
+        Plan only the part of the course you are asked for.
+
+        Requirements:
+        {input}
+
+        Preferences: {preferences}
+
+        Course outline: {outline}
+
+        Plan {segment} ({weeks} weeks), covering: {focus}
+        """)
+
+    def split_for(self, plan_type: str, preferences: Dict[str, Any]) -> tuple:
+        split = preferences.get("split") or ("week" if plan_type == "monthly" else Config.ANNUAL_PLAN_SPLIT)
+        unit, count, most, weeks = SPLITS.get(split, SPLITS["term"])
+        # Each segment costs an LLM call, so the count is capped
+        count = max(1, min(int(_number(preferences.get(f"{unit}s"), count)), most))
+        return unit, count, weeks
+
+    def generate(self, plan_type: str, input_content: str, preferences: Dict[str, Any]) -> Dict[str, Any]:
+        preferences = preferences or {}
+        unit, count, weeks = self.split_for(plan_type, preferences)
+        preferences_text = json.dumps(preferences) if preferences else "None"
+        start = time.perf_counter()
+
+        try:
+            raw_outline = (self.outline_prompt | self.llm | self.parser).invoke({
+                "input": input_content, "preferences": preferences_text,
+                "plan_type": plan_type, "count": count, "unit": unit,
+            })
+        except Exception as e:
+            print(f"Lesson plan outline failed, using default {unit}s: {e}")
+            raw_outline = None
+        outline = normalize_outline(raw_outline, unit, count, weeks)
+        outline_text = json.dumps(
+            [{"name": s["name"], "focus": s["focus"]} for s in outline["segments"]], separators=(",", ":")
+        )
+
+        inputs = [{
+            "input": input_content, "preferences": preferences_text, "outline": outline_text,
+            "segment": segment["name"], "weeks": _weeks(segment["weeks"]),
+            "focus": ", ".join(segment["focus"]) or "the next part of the course",
+        } for segment in outline["segments"]]
+        sub_plans = self._map(inputs)
+
+        failed = [segment["name"] for segment, plan in zip(outline["segments"], sub_plans) if plan is None]
+        if len(failed) == len(sub_plans):
+            return {"status": "error", "message": f"AI generation failed for every {unit} of the plan"}
+        # A segment that failed twice falls back to its outline focus areas
+        sub_plans = [
+            plan or {"topics": segment["focus"] or [segment["name"]], "time_allocation": {},
+                     **{key: [] for key in LIST_KEYS}}
+            for segment, plan in zip(outline["segments"], sub_plans)
+        ]
+        schedule = merge_plans(outline, sub_plans, unit)
+        return {
+            "status": "success",
+            "schedule": schedule,
+            "generation": {
+                "mode": "map_reduce", "segments": len(sub_plans), "unit": unit,
+                "failed_segments": failed, "seconds": round(time.perf_counter() - start, 2),
+            },
+        }
+
+    def _map(self, inputs: List[Dict[str, Any]]) -> List[Any]:
+        """Plan every segment, a bounded number at a time; failures are retried once"""
+        chain = self.segment_prompt | self.llm | self.parser
+        config = {"max_concurrency": Config.LESSON_PLAN_CONCURRENCY}
+        results: List[Any] = [None] * len(inputs)
+        pending = list(range(len(inputs)))
+        for _ in range(2):
+            if not pending:
+                break
+            outputs = chain.batch([inputs[i] for i in pending], config=config, return_exceptions=True)
+            retry = []
+            for i, output in zip(pending, outputs):
+                try:
+                    if isinstance(output, Exception):
+                        raise output
+                    results[i] = normalize_sub_plan(output)
+                except Exception as e:
+                    print(f"Sub-plan '{inputs[i]['segment']}' failed: {e}")
+                    retry.append(i)
+            pending = retry
+        return results
@@ -0,0 +1,202 @@
+#backend/schedule_patch.py
+import copy
+from typing import Any, Dict, List
+
+
+class PatchError(ValueError):
+    """A patch is malformed, does not apply, or breaks the schedule structure"""
+
+
+def _parse_pointer(path: str) -> List[str]:
+    """RFC 6901 JSON pointer -> list of reference tokens"""
+    if path == "":
+        return []
+    if not isinstance(path, str) or not path.startswith("/"):
+        raise PatchError(f"Invalid JSON pointer: {path!r}")
+    return [token.replace("~1", "/").replace("~0", "~") for token in path[1:].split("/")]
+
+
+def _index(container: list, token: str, allow_end: bool = False) -> int:
+    if allow_end and token == "-":
+        return len(container)
+    if not token.isdigit():
+        raise PatchError(f"Invalid list index: {token!r}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise PatchError(f"List index out of range: {index}")
+    return index
+
+
+def _resolve(doc: Any, tokens: List[str]) -> Any:
+    node = doc
+    for token in tokens:
+        if isinstance(node, dict):
+            if token not in node:
+                raise PatchError(f"Path not found: /{'/'.join(tokens)}")
+            node = node[token]
+        elif isinstance(node, list):
+            node = node[_index(node, token)]
+        else:
+            raise PatchError(f"Path not found: /{'/'.join(tokens)}")
+    return node
+
+
+def _get(doc, path):
+    return _resolve(doc, _parse_pointer(path))
+
+
+def _add(doc, path, value):
+    tokens = _parse_pointer(path)
+    if not tokens:
+        return value
+    parent = _resolve(doc, tokens[:-1])
+    if isinstance(parent, dict):
+        parent[tokens[-1]] = value
+    elif isinstance(parent, list):
+        parent.insert(_index(parent, tokens[-1], allow_end=True), value)
+    else:
+        raise PatchError(f"Cannot add at {path}")
+    return doc
+
+
+def _remove(doc, path):
+    tokens = _parse_pointer(path)
+    if not tokens:
+        raise PatchError("Cannot remove the whole schedule")
+    parent = _resolve(doc, tokens[:-1])
+    if isinstance(parent, dict):
+        if tokens[-1] not in parent:
+            raise PatchError(f"Path not found: {path}")
+        return parent.pop(tokens[-1])
+    if isinstance(parent, list):
+        return parent.pop(_index(parent, tokens[-1]))
+    raise PatchError(f"Cannot remove {path}")
+
+
+def _replace(doc, path, value):
+    tokens = _parse_pointer(path)
+    if not tokens:
+        return value
+    parent = _resolve(doc, tokens[:-1])
+    if isinstance(parent, dict):
+        if tokens[-1] not in parent:
+            raise PatchError(f"Path not found: {path}")
+        parent[tokens[-1]] = value
+    elif isinstance(parent, list):
+        parent[_index(parent, tokens[-1])] = value
+    else:
+        raise PatchError(f"Cannot replace {path}")
+    return doc
+
+
+def apply_patch(document: Dict[str, Any], operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Apply RFC 6902 operations (add, remove, replace, move, copy, test) to a copy.
+
+    The original document is never modified; any failing operation raises
+    ``PatchError`` and nothing is applied.
+    """
+    if not isinstance(operations, list):
+        raise PatchError("Patch must be a list of operations")
+    doc = copy.deepcopy(document)
+    for op in operations:
+        if not isinstance(op, dict) or "op" not in op or "path" not in op:
+            raise PatchError(f"Malformed operation: {op!r}")
+        kind, path = op["op"], op["path"]
+        if kind in ("add", "replace", "test") and "value" not in op:
+            raise PatchError(f"Operation {kind} on {path} needs a value")
+        if kind == "add":
+            doc = _add(doc, path, copy.deepcopy(op["value"]))
+        elif kind == "remove":
+            _remove(doc, path)
+        elif kind == "replace":
+            doc = _replace(doc, path, copy.deepcopy(op["value"]))
+        elif kind == "move":
+            value = _remove(doc, op["from"])
+            doc = _add(doc, path, value)
+        elif kind == "copy":
+            doc = _add(doc, path, copy.deepcopy(_get(doc, op["from"])))
+        elif kind == "test":
+            if _get(doc, path) != op["value"]:
+                raise PatchError(f"Test failed at {path}")
+        else:
+            raise PatchError(f"Unsupported operation: {kind!r}")
+    return doc
+
+
+def validate_schedule(original: Dict[str, Any], updated: Dict[str, Any]) -> None:
+    """Reject patches that break the shape of the schedule.
+
+    The top-level keys must be kept. For timetables, every day must still
+    have one entry per period, and the schedule may only use known days.
+    """
+    if not isinstance(updated, dict):
+        raise PatchError("Patched schedule is not an object")
+    missing = [key for key in original if key not in updated]
+    if missing:
+        raise PatchError(f"Patch removed required keys: {', '.join(missing)}")
+
+    if isinstance(updated.get("schedule"), dict) and isinstance(updated.get("periods"), list):
+        days = updated.get("days") or list(updated["schedule"])
+        for day, row in updated["schedule"].items():
+            if day not in days:
+                raise PatchError(f"Unknown day in schedule: {day}")
+            if not isinstance(row, list) or len(row) != len(updated["periods"]):
+                raise PatchError(f"{day} must have exactly {len(updated['periods'])} entries")
+        for grid_key in ("teachers", "rooms"):
+            grid = updated.get(grid_key)
+            if isinstance(grid, dict):
+                for day, row in grid.items():
+                    if not isinstance(row, list) or len(row) != len(updated["periods"]):
+                        raise PatchError(f"{grid_key.capitalize()} row for {day} must have exactly {len(updated['periods'])} entries")
+
+
+def sync_teacher_grid(original: Dict[str, Any], updated: Dict[str, Any]) -> Dict[str, Any]:
+    """Recompute the per-slot teacher (and room) grids after subjects were moved around"""
+    if not isinstance(updated.get("schedule"), dict):
+        return updated
+    for grid_key in ("teachers", "rooms"):
+        if not isinstance(original.get(grid_key), dict):
+            continue
+        owner_of = {}
+        for day, row in original["schedule"].items():
+            for subject, owner in zip(row, original[grid_key].get(day, [])):
+                if subject and owner:
+                    owner_of.setdefault(subject, owner)
+        updated[grid_key] = {
+            day: [owner_of.get(subject, "") for subject in row]
+            for day, row in updated["schedule"].items()
+        }
+    return updated
+
+
+def _escape(token: str) -> str:
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def diff_schedules(old: Any, new: Any, path: str = "") -> List[Dict[str, Any]]:
+    """RFC 6902 operations turning ``old`` into ``new``.
+
+    Objects are compared key by key and equal-length lists element by
+    element, so moving a lesson yields a couple of cell replacements rather
+    than a copy of the whole timetable. Lists that change length are
+    replaced wholesale.
+    """
+    if old == new:
+        return []
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            if key not in old:
+                ops.append({"op": "add", "path": f"{path}/{_escape(key)}", "value": copy.deepcopy(value)})
+            else:
+                ops.extend(diff_schedules(old[key], value, f"{path}/{_escape(key)}"))
+        return ops
+    if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        ops = []
+        for index, (a, b) in enumerate(zip(old, new)):
+            ops.extend(diff_schedules(a, b, f"{path}/{index}"))
+        return ops
+    return [{"op": "replace", "path": path, "value": copy.deepcopy(new)}]
@@ -0,0 +1,176 @@
+#backend/schedule_store.py
+import copy
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from .schedule_patch import apply_patch, diff_schedules
+
+
+class ScheduleNotFound(KeyError):
+    """Unknown schedule id or version"""
+
+
+class _History:
+    """Versions of one schedule: a base document plus one forward delta per version.
+
+    Every ``snapshot_every`` versions a full copy is kept so rebuilding an
+    old version replays at most that many deltas. The latest version is
+    held in memory, so reading it never replays anything.
+    """
+
+    def __init__(self, schedule_id: str, base: Dict[str, Any], meta: Dict[str, Any], snapshot_every: int):
+        self.schedule_id = schedule_id
+        self.snapshot_every = snapshot_every
+        # One entry per version: {"delta": [...]} or {"snapshot": {...}}, plus metadata
+        self.versions: List[Dict[str, Any]] = [{"snapshot": copy.deepcopy(base), **meta}]
+        self.latest = copy.deepcopy(base)
+
+    @property
+    def version(self) -> int:
+        return len(self.versions)
+
+    def append(self, schedule: Dict[str, Any], meta: Dict[str, Any]) -> bool:
+        delta = diff_schedules(self.latest, schedule)
+        if not delta:
+            return False
+        if self.version % self.snapshot_every == 0:
+            entry = {"snapshot": copy.deepcopy(schedule)}
+        else:
+            entry = {"delta": delta}
+        self.versions.append({**entry, "changes": len(delta), **meta})
+        self.latest = copy.deepcopy(schedule)
+        return True
+
+    def get(self, version: int) -> Dict[str, Any]:
+        if not 1 <= version <= self.version:
+            raise ScheduleNotFound(f"Schedule {self.schedule_id} has no version {version}")
+        if version == self.version:
+            return copy.deepcopy(self.latest)
+        return self._replay(version)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        return [
+            {"version": i + 1, **{k: v for k, v in entry.items() if k not in ("delta", "snapshot")}}
+            for i, entry in enumerate(self.versions)
+        ]
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"schedule_id": self.schedule_id, "versions": self.versions}
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any], snapshot_every: int) -> "_History":
+        history = cls.__new__(cls)
+        history.schedule_id = data["schedule_id"]
+        history.snapshot_every = snapshot_every
+        history.versions = data["versions"]
+        history.latest = history._replay(len(history.versions))
+        return history
+
+    def _replay(self, version: int) -> Dict[str, Any]:
+        # Start from the closest full snapshot at or before the version
+        start = max(i for i in range(version) if "snapshot" in self.versions[i])
+        schedule = copy.deepcopy(self.versions[start]["snapshot"])
+        for entry in self.versions[start + 1:version]:
+            schedule = apply_patch(schedule, entry["delta"])
+        return schedule
+
+
+class ScheduleStore:
+    """Versioned schedules keyed by id, persisted as one JSON file per schedule.
+
+    Clients refer to a schedule by id; every generation or refinement adds a
+    version, and rollback adds a new version equal to an older one so no
+    history is lost. Recently used histories stay in memory.
+    """
+
+    def __init__(self, store_dir: str, snapshot_every: int = 20, max_in_memory: int = 256):
+        self.store_dir = store_dir
+        self.snapshot_every = max(1, snapshot_every)
+        self.max_in_memory = max_in_memory
+        self._histories: "OrderedDict[str, _History]" = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(store_dir, exist_ok=True)
+
+    def _path(self, schedule_id: str) -> str:
+        return os.path.join(self.store_dir, f"{schedule_id}.json")
+
+    def _load(self, schedule_id: str) -> _History:
+        history = self._histories.get(schedule_id)
+        if history is None:
+            if not schedule_id.isalnum():
+                raise ScheduleNotFound(f"Unknown schedule: {schedule_id}")
+            try:
+                with open(self._path(schedule_id), "r", encoding="utf-8") as f:
+                    history = _History.from_json(json.load(f), self.snapshot_every)
+            except (OSError, ValueError, KeyError):
+                raise ScheduleNotFound(f"Unknown schedule: {schedule_id}")
+            self._histories[schedule_id] = history
+        self._histories.move_to_end(schedule_id)
+        while len(self._histories) > self.max_in_memory:
+            self._histories.popitem(last=False)
+        return history
+
+    def _save(self, history: _History):
+        path = self._path(history.schedule_id)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(history.to_json(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _meta(source: str, note: Optional[str] = None) -> Dict[str, Any]:
+        meta = {"source": source, "created_at": round(time.time(), 3)}
+        if note:
+            meta["note"] = note
+        return meta
+
+    def create(self, schedule: Dict[str, Any], source: str = "generate") -> Dict[str, Any]:
+        """Start a new history; returns {schedule_id, version}"""
+        schedule_id = uuid.uuid4().hex[:16]
+        with self._lock:
+            history = _History(schedule_id, schedule, self._meta(source), self.snapshot_every)
+            self._histories[schedule_id] = history
+            self._save(history)
+        return {"schedule_id": schedule_id, "version": 1}
+
+    def commit(self, schedule_id: str, schedule: Dict[str, Any], source: str = "refine",
+               note: Optional[str] = None) -> Dict[str, Any]:
+        """Record a new version; unchanged schedules do not add one"""
+        with self._lock:
+            history = self._load(schedule_id)
+            if history.append(schedule, self._meta(source, note)):
+                self._save(history)
+            return {"schedule_id": schedule_id, "version": history.version}
+
+    def latest(self, schedule_id: str) -> Dict[str, Any]:
+        with self._lock:
+            history = self._load(schedule_id)
+            return {"schedule_id": schedule_id, "version": history.version, "schedule": copy.deepcopy(history.latest)}
+
+    def get(self, schedule_id: str, version: int) -> Dict[str, Any]:
+        with self._lock:
+            return self._load(schedule_id).get(version)
+
+    def history(self, schedule_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return self._load(schedule_id).summary()
+
+    def diff(self, schedule_id: str, from_version: int, to_version: Optional[int] = None) -> List[Dict[str, Any]]:
+        """JSON Patch from one version to another (default: to the latest)"""
+        with self._lock:
+            history = self._load(schedule_id)
+            return diff_schedules(history.get(from_version), history.get(to_version or history.version))
+
+    def rollback(self, schedule_id: str, version: int) -> Dict[str, Any]:
+        """Make an earlier version current again by recording it as a new version"""
+        with self._lock:
+            history = self._load(schedule_id)
+            target = history.get(version)
+            if history.append(target, self._meta("rollback", f"Restored version {version}")):
+                self._save(history)
+            return {"schedule_id": schedule_id, "version": history.version, "schedule": copy.deepcopy(history.latest)}
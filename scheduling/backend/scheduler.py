@@ -4,46 +4,60 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from typing import Dict, Any
 import json
+from config import Config
+from teaching_shared.llm_runtime import request_timer
+from .timetable_solver import solve_timetable, TimetableError
+from .schedule_patch import apply_patch, validate_schedule, sync_teacher_grid
+from .lesson_planner import LessonPlanner
 
 class ScheduleGenerator:
     def __init__(self):
-        self.llm = Ollama(model="llama2")
+        self.llm = Ollama(
+            model=Config.OLLAMA_MODEL,
+            base_url=Config.OLLAMA_BASE_URL,
+            keep_alive=Config.OLLAMA_KEEP_ALIVE,
+            callbacks=[request_timer]
+        )
         self.parser = JsonOutputParser()
         
         self.prompt_templates = {
-            "weekly_timetable": """You are an expert at creating school timetables. 
-            Create a weekly timetable based on these requirements:
-            {input}
-            
-            Preferences: {preferences}
-            
-            Structure your response as JSON with:
+            # Static instructions come first and request data last so the
+            # prompt prefix is identical across calls and can be cached.
+            # The LLM only turns free-text requirements into constraints;
+            # the timetable itself is built by the local solver.
+            "timetable_constraints": """You convert school timetable requirements into structured constraints.
+            Return only JSON with these keys (omit any that are not mentioned):
             - "days" (list of day names)
-            - "periods" (list of periods per day)
-            - "schedule" (dict mapping days to list of subjects/activities)
-            - "breaks" (dict with break times)
+            - "periods_per_day" (number), "day_periods" (dict of day to number, e.g. half-day Saturday)
+            - "start_time" ("HH:MM"), "period_minutes" (number)
+            - "breaks" (list of {{"after_period", "label", "minutes"}})
+            - "subjects" (list of {{"name", "periods_per_week", "teacher", "max_per_day", "preferred_periods", "avoid_periods"}})
+            - "teacher_unavailable" (list of {{"teacher", "day", "periods"}}; empty periods means the whole day)
+            - "fixed" (list of {{"day", "period", "subject"}} for slots that must hold a given activity)
+            Periods are numbered from 1. Do not invent a timetable.
             
             Example:
             {{
                 "days": ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"],
-                "periods": ["Period 1", "Period 2", "Period 3", "Period 4"],
-                "schedule": {{
-                    "Monday": ["Math", "Science", "Break", "English"],
-                    "Tuesday": ["History", "Geography", "Break", "Math"]
-                }},
-                "breaks": {{
-                    "time": "11:00-11:30",
-                    "after_period": 2
-                }}
+                "periods_per_day": 6,
+                "start_time": "09:00",
+                "period_minutes": 40,
+                "breaks": [{{"after_period": 3, "label": "Lunch", "minutes": 30}}],
+                "subjects": [
+                    {{"name": "Math", "periods_per_week": 6, "teacher": "Mrs. Rao", "preferred_periods": [1, 2]}},
+                    {{"name": "Science", "periods_per_week": 5, "teacher": "Mr. Iyer"}}
+                ],
+                "teacher_unavailable": [{{"teacher": "Mr. Iyer", "day": "Friday", "periods": []}}],
+                "fixed": [{{"day": "Monday", "period": 1, "subject": "Assembly"}}]
             }}
-            """,
             
-            "lesson_plan": """You are an expert at creating lesson plans. 
-            Create a {plan_type} lesson plan based on:
+            Extract the constraints from these requirements:
             {input}
             
             Preferences: {preferences}
+            """,
             
+            "lesson_plan": """You are an expert at creating lesson plans. 
             Structure your response as JSON with:
             - "topics" (list of topics to cover)
             - "time_allocation" (dict with time estimates)
@@ -62,9 +76,63 @@ class ScheduleGenerator:
                 "assessments": ["Weekly quizzes", "End-of-unit test"],
                 "resources": ["Textbook Chapter 3", "Online practice problems"]
             }}
+            
+            Create a {plan_type} lesson plan based on:
+            {input}
+            
+            Preferences: {preferences}
             """
         }
     
+        self.context_prompt = ChatPromptTemplate.from_template("""
+        Follow these rules:
+        - Preserve useful structure from reference doc
+        - Implement all text/voice instructions
+        - Maintain consistent formatting
+        - Return valid JSON only
+        
+        {format_instructions}
+        
+        Create a {schedule_type} using:
+        1. This reference document: ||{document_text}||
+        2. These text instructions: ||{text_prompt}||
+        3. These voice notes: ||{voice_transcript}||
+        
+        Preferences: {preferences}
+        """)
+
+        # Refinement asks for edit operations only; static part first
+        self.patch_prompt = ChatPromptTemplate.from_template("""
+        You edit school schedules. Reply only with JSON of the form {{"patch": [...]}}
+        where each item is a JSON Patch (RFC 6902) operation such as
+        {{"op": "replace", "path": "/schedule/Monday/2", "value": "Math"}}.
+        Paths use the keys of the current schedule and list indexes start at 0.
+        Use the fewest operations that implement the feedback and never return
+        the whole schedule. Keep every day's list the same length.
+        
+        Example, swapping Monday's first two periods (Math, Science):
+        {{"patch": [{{"op": "replace", "path": "/schedule/Monday/0", "value": "Science"}},
+                    {{"op": "replace", "path": "/schedule/Monday/1", "value": "Math"}}]}}
+        
+        Current Schedule:
+        {current_schedule}
+        
+        Teacher Feedback:
+        {feedback}
+        """)
+
+        # Rendered static head of the context prompt, used to prime the
+        # runtime's prompt cache at startup
+        self.prompt_prefix = self.context_prompt.format(
+            format_instructions=self.parser.get_format_instructions(),
+            schedule_type="", document_text="", text_prompt="",
+            voice_transcript="", preferences=""
+        ).split("Create a ")[0]
+
+        # Year- and month-long plans are split into segments generated in parallel
+        self.lesson_planner = LessonPlanner(self.llm, self.parser)
+        self.map_reduce_plans = ("annual", "monthly")
+    
     def _clean_json_response(self, response: str) -> Dict[str, Any]:
         """Extract JSON from potentially messy AI response"""
         try:
@@ -81,19 +149,49 @@ class ScheduleGenerator:
                     pass
         return {"error": "Failed to parse response", "raw_response": response}
     
+    def extract_timetable_constraints(self, input_content: str, preferences: Dict[str, Any]) -> Dict[str, Any]:
+        """Ask the LLM for structured timetable constraints; explicit ones in preferences win"""
+        explicit = dict(preferences.get("constraints") or {})
+        if not input_content.strip():
+            return explicit
+        prompt = ChatPromptTemplate.from_template(self.prompt_templates["timetable_constraints"])
+        chain = prompt | self.llm | self.parser
+        other_preferences = {k: v for k, v in preferences.items() if k != "constraints"}
+        extracted = chain.invoke({
+            "input": input_content,
+            "preferences": json.dumps(other_preferences) if other_preferences else "None"
+        })
+        if not isinstance(extracted, dict):
+            raise ValueError("AI returned non-dict constraints")
+        return {**extracted, **explicit}
+
+    def build_timetable(self, input_content: str, preferences: Dict[str, Any]) -> Dict[str, Any]:
+        """Extract constraints with the LLM and solve the timetable locally"""
+        try:
+            constraints = self.extract_timetable_constraints(input_content, preferences)
+        except Exception as e:
+            return {"status": "error", "message": f"Could not read timetable requirements: {str(e)}"}
+        try:
+            timetable = solve_timetable(constraints)
+        except (TimetableError, KeyError, TypeError, ValueError) as e:
+            return {"status": "error", "message": f"Timetable constraints cannot be met: {str(e)}",
+                    "constraints": constraints}
+        return {"status": "success", "schedule": timetable, "constraints": constraints}
+
     def generate_schedule(self, request: Dict[str, Any]) -> Dict[str, Any]:
         schedule_type = request["schedule_type"]
         input_content = request["input_content"]
         preferences = request.get("preferences", {})
         
         if "timetable" in schedule_type:
-            prompt_template = self.prompt_templates["weekly_timetable"]
-            prompt = ChatPromptTemplate.from_template(prompt_template)
-        else:
-            plan_type = schedule_type.split("_")[0]
-            prompt_template = self.prompt_templates["lesson_plan"]
-            prompt = ChatPromptTemplate.from_template(prompt_template)
-            input_content = f"Plan Type: {plan_type}\nRequirements: {input_content}"
+            return self.build_timetable(input_content, preferences)
+
+        plan_type = schedule_type.split("_")[0]
+        if plan_type in self.map_reduce_plans:
+            return self.lesson_planner.generate(plan_type, input_content, preferences)
+        prompt_template = self.prompt_templates["lesson_plan"]
+        prompt = ChatPromptTemplate.from_template(prompt_template)
+        input_content = f"Plan Type: {plan_type}\nRequirements: {input_content}"
         
         chain = prompt | self.llm | self.parser
         
@@ -101,7 +199,7 @@ class ScheduleGenerator:
             response = chain.invoke({
                 "input": input_content,
                 "preferences": json.dumps(preferences) if preferences else "None",
-                "plan_type": plan_type if "lesson_plan" in schedule_type else ""
+                "plan_type": plan_type
             })
             
             # Ensure we have a valid dictionary
@@ -113,17 +211,17 @@ class ScheduleGenerator:
         except Exception as e:
             return {"status": "error", "message": f"AI generation failed: {str(e)}"}
     
-    def refine_schedule(self, current_schedule: Dict[str, Any], feedback: str) -> Dict[str, Any]:
+    def _full_refinement(self, current_schedule: Dict[str, Any], feedback: str) -> Dict[str, Any]:
+        """Regenerate the whole schedule; used when a patch cannot be applied"""
         prompt = ChatPromptTemplate.from_template("""
         Refine this schedule based on teacher feedback. Only return valid JSON.
+        Return the improved schedule in the same JSON format as the current one.
         
         Current Schedule:
         {current_schedule}
         
         Teacher Feedback:
         {feedback}
-        
-        Return the improved schedule in the same JSON format as the current one.
         """)
         
         chain = prompt | self.llm | self.parser
@@ -140,6 +238,42 @@ class ScheduleGenerator:
             
         except Exception as e:
             return {"status": "error", "message": f"Refinement failed: {str(e)}"}
+
+    def refine_schedule(self, current_schedule: Dict[str, Any], text_feedback: str = "",
+                        voice_feedback: str = "") -> Dict[str, Any]:
+        """Apply teacher feedback as a small JSON Patch, validated locally.
+
+        The model returns only the edit operations, so output size depends on
+        the change rather than the schedule. If the patch is malformed, does
+        not apply or breaks the schedule structure, the whole schedule is
+        regenerated instead.
+        """
+        feedback = "\n".join(f for f in (text_feedback, voice_feedback) if f)
+        if not feedback.strip():
+            return {"status": "error", "message": "No refinement instructions given"}
+
+        chain = self.patch_prompt | self.llm | self.parser
+        try:
+            response = chain.invoke({
+                "current_schedule": json.dumps(current_schedule, separators=(",", ":")),
+                "feedback": feedback
+            })
+            operations = response.get("patch") if isinstance(response, dict) else response
+            updated = apply_patch(current_schedule, operations)
+            validate_schedule(current_schedule, updated)
+            updated = sync_teacher_grid(current_schedule, updated)
+            return {
+                "status": "success",
+                "schedule": updated,
+                "refinement": {"mode": "patch", "operations": operations}
+            }
+        except Exception as e:
+            reason = str(e)
+            print(f"Patch refinement failed, regenerating full schedule: {reason}")
+
+        result = self._full_refinement(current_schedule, feedback)
+        result["refinement"] = {"mode": "full", "fallback_reason": reason}
+        return result
         
 
 
@@ -159,30 +293,26 @@ class ScheduleGenerator:
         VOICE NOTES:
         {voice_transcript}
         """
+
+        if "timetable" in schedule_type:
+            return self.build_timetable(combined_input, preferences or {})
+
+        plan_type = schedule_type.split("_")[0]
+        if plan_type in self.map_reduce_plans:
+            return self.lesson_planner.generate(plan_type, combined_input, preferences or {})
         
-        prompt = ChatPromptTemplate.from_template("""
-        Create a {schedule_type} using:
-        1. This reference document: ||{document_text}||
-        2. These text instructions: ||{text_prompt}||
-        3. These voice notes: ||{voice_transcript}||
-        
-        Preferences: {preferences}
-        
-        Follow these rules:
-        - Preserve useful structure from reference doc
-        - Implement all text/voice instructions
-        - Maintain consistent formatting
-        - Return valid JSON only
-        
-        {format_instructions}
-        """)
-        
-        chain = prompt | self.llm | self.parser
-        return chain.invoke({
-            "document_text": document_text,
-            "text_prompt": text_prompt,
-            "voice_transcript": voice_transcript,
-            "preferences": preferences,
-            "schedule_type": schedule_type,
-            "format_instructions": self.parser.get_format_instructions()
-        })
\ No newline at end of file
+        chain = self.context_prompt | self.llm | self.parser
+        try:
+            response = chain.invoke({
+                "document_text": document_text,
+                "text_prompt": text_prompt,
+                "voice_transcript": voice_transcript,
+                "preferences": preferences,
+                "schedule_type": schedule_type,
+                "format_instructions": self.parser.get_format_instructions()
+            })
+        except Exception as e:
+            return {"status": "error", "message": f"AI generation failed: {str(e)}"}
+        if isinstance(response, dict):
+            return {"status": "success", "schedule": response}
+        return {"status": "error", "message": "AI returned non-dict response", "raw_response": response}
@@ -0,0 +1,292 @@
+#backend/school_planner.py
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import Config
+from .conflicts import ConflictIndex
+from .timetable_solver import TimetableSolver, TimetableError, normalize_constraints
+
+# job id -> progress and, once finished, results; polled by the API
+school_jobs: Dict[str, Dict[str, Any]] = {}
+
+# Whole-school settings every section inherits unless it overrides them
+SHARED_KEYS = ("days", "periods_per_day", "day_periods", "start_time", "period_minutes", "breaks", "free_label")
+
+_school_jobs_lock = threading.Lock()
+
+_plan_executor: Optional[ProcessPoolExecutor] = None
+_plan_executor_lock = threading.Lock()
+
+
+def merge_constraints(shared: Dict[str, Any], section: Dict[str, Any]) -> Dict[str, Any]:
+    """A section's constraints on top of the school-wide ones.
+
+    Bell schedule keys fall back to the shared value; staff unavailability
+    and fixed slots (e.g. assembly) from both are combined.
+    """
+    merged = {key: shared[key] for key in SHARED_KEYS if key in shared}
+    merged.update(section)
+    for key in ("teacher_unavailable", "fixed"):
+        merged[key] = list(shared.get(key) or []) + list(section.get(key) or [])
+    return merged
+
+
+def _resources(constraints: Dict[str, Any]) -> List[Tuple[str, str]]:
+    return [
+        (kind, subject[kind]) for subject in constraints["subjects"]
+        for kind in ("teacher", "room") if subject[kind]
+    ]
+
+
+def group_sections(sections: Dict[str, Dict[str, Any]]) -> List[List[str]]:
+    """Sections linked by a shared teacher or room, directly or through others.
+
+    Different groups cannot clash with each other, so each group is planned
+    on its own and groups run in parallel.
+    """
+    parent = {section_id: section_id for section_id in sections}
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    owner: Dict[Tuple[str, str], str] = {}
+    for section_id, constraints in sections.items():
+        for resource in _resources(constraints):
+            if resource in owner:
+                parent[find(section_id)] = find(owner[resource])
+            else:
+                owner[resource] = section_id
+
+    groups: Dict[str, List[str]] = {}
+    for section_id in sections:
+        groups.setdefault(find(section_id), []).append(section_id)
+    return sorted(groups.values(), key=len, reverse=True)
+
+
+def _load(constraints: Dict[str, Any], shared_load: Dict[Tuple[str, str], int]) -> int:
+    """How heavily a section's teachers and rooms are booked across the school"""
+    return sum(
+        shared_load[(kind, subject[kind])] * subject["periods_per_week"]
+        for subject in constraints["subjects"] for kind in ("teacher", "room") if subject[kind]
+    )
+
+
+def _place(sections: Dict[str, Dict[str, Any]], order: List[str],
+           errors: Dict[str, str]) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+    """One pass over ``order``; sections that cannot be placed are skipped"""
+    teacher_busy: Dict[str, set] = {}
+    room_busy: Dict[str, set] = {}
+    results: Dict[str, Dict[str, Any]] = {}
+    failed: List[str] = []
+    for section_id in order:
+        solver = TimetableSolver(sections[section_id], busy=teacher_busy, room_busy=room_busy)
+        try:
+            timetable = solver.solve()
+        except TimetableError as e:
+            errors[section_id] = str(e)
+            failed.append(section_id)
+            continue
+        results[section_id] = {"status": "success", "schedule": timetable}
+        for subject in solver.subjects:
+            taken = {(solver.days[d], p) for (d, p), name in solver.grid.items() if name == subject["name"]}
+            if subject.get("teacher"):
+                teacher_busy.setdefault(subject["teacher"], set()).update(taken)
+            if subject.get("room"):
+                room_busy.setdefault(subject["room"], set()).update(taken)
+    return results, failed
+
+
+def plan_group(sections: Dict[str, Dict[str, Any]], seed: int = 0) -> Dict[str, Dict[str, Any]]:
+    """Worker entry point: solve sections that share staff or rooms one after another.
+
+    Each section is solved with the slots already taken by earlier sections
+    blocked for its teachers and rooms, so the group comes out clash-free.
+    The most heavily shared sections go first (``seed`` > 0 shuffles that
+    order a little, so several workers can try different orderings). A
+    section that cannot be placed is skipped and the rest are still placed;
+    the failed ones are then moved to the front and the group is planned
+    again, keeping the attempt that placed the most sections.
+    """
+    load: Dict[Tuple[str, str], int] = {}
+    for constraints in sections.values():
+        for resource in set(_resources(constraints)):
+            load[resource] = load.get(resource, 0) + 1
+    rng = random.Random(seed)
+    jitter = {s: rng.uniform(0.5, 1.5) if seed else 1.0 for s in sorted(sections)}
+    order = sorted(sections, key=lambda s: (-_load(sections[s], load) * jitter[s], s))
+
+    errors: Dict[str, str] = {}
+    best, best_failed = None, None
+    for _ in range(min(len(order), Config.SCHOOL_PLAN_RETRIES) + 1):
+        results, failed = _place(sections, order, errors)
+        if best is None or len(failed) < len(best_failed):
+            best, best_failed = results, failed
+        if not failed:
+            break
+        order = failed + [s for s in order if s not in failed]
+
+    # Keep what could be placed; report the rest
+    for section_id in best_failed:
+        best[section_id] = {"status": "error", "message": f"Timetable constraints cannot be met: {errors[section_id]}"}
+    return best
+
+
+def _placed(results: Dict[str, Dict[str, Any]]) -> int:
+    return sum(1 for result in results.values() if result["status"] == "success")
+
+
+def _executor() -> ProcessPoolExecutor:
+    global _plan_executor
+    with _plan_executor_lock:
+        if _plan_executor is None:
+            _plan_executor = ProcessPoolExecutor(max_workers=Config.SCHOOL_PLAN_WORKERS)
+    return _plan_executor
+
+
+def _plan_in_pool(groups: List[Dict[str, Dict[str, Any]]]):
+    """Yield each group's results as its worker(s) finish.
+
+    Groups run in parallel; workers left over (e.g. when the whole school
+    is one big group) try other orderings of the larger groups, and the
+    ordering that places the most sections wins.
+    """
+    orderings = max(1, Config.SCHOOL_PLAN_WORKERS // len(groups))
+    futures = {}
+    for i, group in enumerate(groups):
+        for seed in range(orderings if len(group) > 1 else 1):
+            futures[_executor().submit(plan_group, group, seed)] = (i, seed)
+    attempts: Dict[int, Dict[int, Dict[str, Dict[str, Any]]]] = {}
+    for future in as_completed(futures):
+        i, seed = futures[future]
+        attempts.setdefault(i, {})[seed] = future.result()
+        if len(attempts[i]) == (orderings if len(groups[i]) > 1 else 1):
+            # Most sections placed; the default ordering wins ties
+            tried = attempts.pop(i)
+            yield tried[max(sorted(tried), key=lambda seed: _placed(tried[seed]))]
+
+
+def plan_school(sections: Dict[str, Dict[str, Any]], shared: Optional[Dict[str, Any]] = None,
+                on_progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+    """Timetables for every section with no teacher or room booked twice.
+
+    ``sections`` maps section id to its constraints (timetable_constraints
+    format); ``shared`` holds the school-wide bell schedule and staff
+    availability. Large schools are solved in worker processes, one or more
+    orderings per group; ``on_progress(done, total)`` is called as sections
+    finish.
+    """
+    start = time.perf_counter()
+    shared = shared or {}
+    normalized, results = {}, {}
+    for section_id, constraints in sections.items():
+        try:
+            normalized[section_id] = normalize_constraints(merge_constraints(shared, constraints))
+        except (KeyError, TypeError, ValueError) as e:
+            results[section_id] = {"status": "error", "message": f"Invalid constraints: {str(e)}"}
+
+    groups = group_sections(normalized)
+    done = len(results)
+    if on_progress:
+        on_progress(done, len(sections))
+
+    if len(normalized) >= Config.SCHOOL_PARALLEL_MIN_SECTIONS:
+        pending = _plan_in_pool([{s: normalized[s] for s in group} for group in groups])
+    else:
+        pending = (plan_group({s: normalized[s] for s in group}) for group in groups)
+    for group_results in pending:
+        results.update(group_results)
+        done += len(group_results)
+        if on_progress:
+            on_progress(done, len(sections))
+
+    # Independent check of the combined result
+    index = ConflictIndex()
+    for section_id, result in results.items():
+        if result["status"] == "success":
+            index.set_section(section_id, result["schedule"])
+    return {
+        "sections": {section_id: results[section_id] for section_id in sections},
+        "conflicts": index.conflicts(),
+        "groups": len(groups),
+        "solve_seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def _evict_finished(max_finished_jobs: int) -> None:
+    """Forget the oldest finished jobs; their timetables stay in the schedule store"""
+    with _school_jobs_lock:
+        finished = sorted(
+            (job["finished_at"], job_id) for job_id, job in school_jobs.items()
+            if job.get("finished_at") is not None
+        )
+        for _, job_id in finished[:max(0, len(finished) - max_finished_jobs)]:
+            del school_jobs[job_id]
+
+
+def start_school_job(sections: List[Dict[str, Any]], shared: Optional[Dict[str, Any]] = None,
+                     extract: Optional[Callable[[str], Dict[str, Any]]] = None,
+                     on_planned: Optional[Callable[[str, Dict[str, Any]], Dict[str, Any]]] = None) -> str:
+    """Plan every section in a background thread; returns the job id to poll.
+
+    Each section is {"section_id", "constraints"} or {"section_id",
+    "requirements"}; free-text requirements are turned into constraints
+    with ``extract`` (the LLM step) a few at a time before solving.
+    ``on_planned(section_id, timetable)`` may add fields to a section's
+    result, e.g. the id it was stored under.
+    """
+    section_ids = [str(section["section_id"]) for section in sections]
+    if len(set(section_ids)) != len(section_ids):
+        raise ValueError("Section ids must be unique")
+    _evict_finished(Config.SCHOOL_MAX_FINISHED_JOBS)
+    job_id = uuid.uuid4().hex[:12]
+    job = school_jobs[job_id] = {
+        "job_id": job_id, "status": "running", "phase": "queued",
+        "total": len(sections), "done": 0, "started_at": time.time(), "finished_at": None,
+    }
+
+    def run():
+        try:
+            constraints: Dict[str, Dict[str, Any]] = {}
+            errors: Dict[str, Dict[str, Any]] = {}
+            to_extract = [s for s in sections if not s.get("constraints")]
+            for section in sections:
+                if section.get("constraints"):
+                    constraints[str(section["section_id"])] = section["constraints"]
+            if to_extract:
+                job["phase"] = "reading requirements"
+                with ThreadPoolExecutor(max_workers=Config.LESSON_PLAN_CONCURRENCY) as pool:
+                    futures = {pool.submit(extract, s.get("requirements", "")): str(s["section_id"]) for s in to_extract}
+                    for future in as_completed(futures):
+                        try:
+                            constraints[futures[future]] = future.result()
+                        except Exception as e:
+                            errors[futures[future]] = {
+                                "status": "error", "message": f"Could not read timetable requirements: {str(e)}"
+                            }
+
+            job["phase"] = "solving"
+            result = plan_school(constraints, shared, on_progress=lambda done, total: job.update(done=done))
+            result["sections"].update(errors)
+            for section_id, section in result["sections"].items():
+                if section["status"] == "success" and on_planned:
+                    section.update(on_planned(section_id, section["schedule"]))
+            job.update(result)
+            job["done"] = len(sections)
+            job["status"] = "completed"
+        except Exception as e:
+            print(f"School timetable job {job_id} failed: {e}")
+            job.update(status="failed", message=str(e))
+        finally:
+            job["phase"] = "finished"
+            job["finished_at"] = time.time()
+            job["elapsed_seconds"] = round(job["finished_at"] - job["started_at"], 2)
+
+    threading.Thread(target=run, daemon=True).start()
+    return job_id
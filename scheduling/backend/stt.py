@@ -0,0 +1,253 @@
+#backend/stt.py
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import numpy as np
+from config import Config
+from .audio import TARGET_RATE, StreamResampler, preprocess_audio
+
+# Latest transcription measurements, exposed through the API for monitoring
+stt_metrics: Dict[str, object] = {}
+# Keys a client that transcribed locally (the live recorder) may report to the API
+REPORTED_METRICS = ("engine", "source", "audio_seconds", "processing_seconds",
+                    "real_time_factor", "final_latency_seconds")
+
+
+def _record_metrics(engine: str, audio_seconds: float, processing_seconds: float,
+                    final_latency: Optional[float] = None, source: str = "upload"):
+    stt_metrics.update({
+        "engine": engine,
+        "source": source,
+        "audio_seconds": round(audio_seconds, 3),
+        "processing_seconds": round(processing_seconds, 3),
+        # < 1 means faster than real time
+        "real_time_factor": round(processing_seconds / audio_seconds, 3) if audio_seconds else None,
+        "final_latency_seconds": round(final_latency, 3) if final_latency is not None else None,
+    })
+
+
+class STTEngine:
+    """Speech-to-text backend. Engines are created once and reused."""
+
+    name = "base"
+
+    def open_stream(self, sample_rate: int) -> "TranscriptionStream":
+        return BufferedStream(self, sample_rate)
+
+    def transcribe(self, samples: np.ndarray, sample_rate: int) -> str:
+        raise NotImplementedError
+
+    def warm_up(self):
+        """Load the model ahead of the first request"""
+
+
+class TranscriptionStream:
+    """Feed int16 mono chunks while the teacher speaks, then call finish()"""
+
+    def __init__(self, engine: STTEngine, sample_rate: int):
+        self.engine = engine
+        self.sample_rate = sample_rate
+        self.audio_seconds = 0.0
+        self.processing_seconds = 0.0
+
+    def feed(self, samples: np.ndarray) -> str:
+        """Process a chunk; returns the partial transcript so far"""
+        start = time.perf_counter()
+        partial = self._feed(np.asarray(samples, dtype=np.int16))
+        self.audio_seconds += len(samples) / self.sample_rate
+        self.processing_seconds += time.perf_counter() - start
+        return partial
+
+    def finish(self) -> str:
+        start = time.perf_counter()
+        text = self._finish()
+        latency = time.perf_counter() - start
+        self.processing_seconds += latency
+        _record_metrics(self.engine.name, self.audio_seconds, self.processing_seconds, latency, source="live")
+        return text
+
+    def _feed(self, samples: np.ndarray) -> str:
+        raise NotImplementedError
+
+    def _finish(self) -> str:
+        raise NotImplementedError
+
+
+class BufferedStream(TranscriptionStream):
+    """For engines without incremental decoding: transcribe once at the end"""
+
+    def __init__(self, engine, sample_rate):
+        super().__init__(engine, sample_rate)
+        self._chunks = []
+
+    def _feed(self, samples):
+        self._chunks.append(samples)
+        return ""
+
+    def _finish(self):
+        samples = np.concatenate(self._chunks) if self._chunks else np.zeros(0, dtype=np.int16)
+        return self.engine.transcribe(samples, self.sample_rate)
+
+
+class VoskEngine(STTEngine):
+    """Offline Kaldi recognizer; decodes incrementally so little is left at the end"""
+
+    name = "vosk"
+
+    def __init__(self, model_path: str):
+        self.model_path = model_path
+        self._model = None
+        self._lock = threading.Lock()
+
+    def warm_up(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from vosk import Model, SetLogLevel
+                    SetLogLevel(-1)
+                    self._model = Model(self.model_path)
+        return self._model
+
+    def open_stream(self, sample_rate):
+        return VoskStream(self, sample_rate)
+
+    def transcribe(self, samples, sample_rate):
+        stream = VoskStream(self, sample_rate)
+        chunk = int(sample_rate * Config.STT_CHUNK_SECONDS)
+        for start in range(0, len(samples), chunk):
+            stream.feed(samples[start:start + chunk])
+        return stream.finish()
+
+
+class VoskStream(TranscriptionStream):
+    def __init__(self, engine, sample_rate):
+        super().__init__(engine, sample_rate)
+        from vosk import KaldiRecognizer
+        self._recognizer = KaldiRecognizer(engine.warm_up(), sample_rate)
+        self._final = []
+
+    def _feed(self, samples):
+        if self._recognizer.AcceptWaveform(samples.tobytes()):
+            self._final.append(json.loads(self._recognizer.Result()).get("text", ""))
+            return " ".join(t for t in self._final if t)
+        partial = json.loads(self._recognizer.PartialResult()).get("partial", "")
+        return " ".join(t for t in self._final + [partial] if t)
+
+    def _finish(self):
+        self._final.append(json.loads(self._recognizer.FinalResult()).get("text", ""))
+        return " ".join(t for t in self._final if t)
+
+
+class WhisperEngine(STTEngine):
+    """faster-whisper on CPU with int8 weights"""
+
+    name = "whisper"
+
+    def __init__(self, model_size: str, language: Optional[str]):
+        self.model_size = model_size
+        self.language = language
+        self._model = None
+        self._lock = threading.Lock()
+
+    def warm_up(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from faster_whisper import WhisperModel
+                    self._model = WhisperModel(self.model_size, device="cpu", compute_type="int8")
+        return self._model
+
+    def transcribe(self, samples, sample_rate):
+        if not len(samples):
+            return ""
+        audio = samples.astype(np.float32) / 32768.0
+        if sample_rate != TARGET_RATE:
+            # Whisper expects 16 kHz
+            audio = StreamResampler(sample_rate).process(audio)
+        segments, _ = self.warm_up().transcribe(audio, language=self.language, beam_size=1, vad_filter=True)
+        return " ".join(segment.text.strip() for segment in segments).strip()
+
+
+class GoogleEngine(STTEngine):
+    """Online Google Web Speech API (needs internet)"""
+
+    name = "google"
+
+    def transcribe(self, samples, sample_rate):
+        import speech_recognition as sr
+        audio = sr.AudioData(samples.astype(np.int16).tobytes(), sample_rate, 2)
+        try:
+            return sr.Recognizer().recognize_google(audio)
+        except sr.UnknownValueError:
+            return "Could not understand audio"
+        except sr.RequestError:
+            return "API unavailable"
+
+
+_engine: Optional[STTEngine] = None
+_engine_lock = threading.Lock()
+
+
+def _create_engine(name: str) -> STTEngine:
+    if name == "vosk":
+        if not os.path.isdir(Config.VOSK_MODEL_PATH):
+            raise RuntimeError(f"Vosk model not found at {Config.VOSK_MODEL_PATH}")
+        import vosk  # noqa: F401
+        return VoskEngine(Config.VOSK_MODEL_PATH)
+    if name == "whisper":
+        import faster_whisper  # noqa: F401
+        return WhisperEngine(Config.WHISPER_MODEL, Config.STT_LANGUAGE or None)
+    if name == "google":
+        return GoogleEngine()
+    raise ValueError(f"Unknown STT backend: {name}")
+
+
+def get_stt_engine() -> STTEngine:
+    """The configured engine; "auto" prefers on-device engines and falls back to Google"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                names = ["vosk", "whisper", "google"] if Config.STT_BACKEND == "auto" else [Config.STT_BACKEND]
+                for name in names:
+                    try:
+                        _engine = _create_engine(name)
+                        break
+                    except (ImportError, RuntimeError) as e:
+                        print(f"STT backend '{name}' unavailable: {e}")
+                if _engine is None:
+                    raise RuntimeError("No speech-to-text backend available")
+    return _engine
+
+
+def warm_up_stt_in_background():
+    """Load the STT model off the request path so the first voice note is fast"""
+    def run():
+        try:
+            start = time.perf_counter()
+            engine = get_stt_engine()
+            engine.warm_up()
+            stt_metrics["engine"] = engine.name
+            stt_metrics["load_seconds"] = round(time.perf_counter() - start, 3)
+        except Exception as e:
+            print(f"STT warm-up failed: {e}")
+    threading.Thread(target=run, daemon=True).start()
+
+
+def transcribe_audio(audio_bytes: bytes) -> str:
+    """Transcribe a complete recording with the configured engine.
+
+    The audio is resampled to 16 kHz mono and silence is trimmed first, so
+    the engine only decodes speech.
+    """
+    samples, stats = preprocess_audio(audio_bytes)
+    engine = get_stt_engine()
+    start = time.perf_counter()
+    text = engine.transcribe(samples, TARGET_RATE) if len(samples) else ""
+    if engine.name != "vosk" or not len(samples):  # Vosk streams record their own metrics
+        _record_metrics(engine.name, stats["speech_seconds"], time.perf_counter() - start)
+    stt_metrics.update(stats)
+    return text
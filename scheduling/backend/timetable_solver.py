@@ -0,0 +1,319 @@
+#backend/timetable_solver.py
+import math
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+FREE_PERIOD = "Free Period"
+
+
+class TimetableError(ValueError):
+    """Constraints are contradictory or cannot be satisfied"""
+
+
+def _as_int_list(values) -> List[int]:
+    if values is None:
+        return []
+    if not isinstance(values, (list, tuple, set)):
+        values = [values]
+    return [int(v) for v in values]
+
+
+def _parse_time(value: str) -> int:
+    hours, minutes = str(value).split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def _format_time(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def normalize_constraints(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Fill defaults and coerce loosely structured constraints (e.g. from the LLM).
+
+    Accepted keys: days, periods_per_day, day_periods ({day: n}), start_time,
+    period_minutes, breaks ([{after_period, label, minutes}]), subjects
+    ([{name, periods_per_week, teacher, room, max_per_day,
+    preferred_periods, avoid_periods}] or {name: periods_per_week}), teacher_unavailable
+    ([{teacher, day, periods}]), fixed ([{day, period, subject}]) and
+    free_label. Periods are numbered from 1.
+    """
+    days = list(raw.get("days") or DEFAULT_DAYS)
+    periods_per_day = int(raw.get("periods_per_day") or 8)
+    day_periods = {day: int((raw.get("day_periods") or {}).get(day, periods_per_day)) for day in days}
+
+    breaks = raw.get("breaks") or []
+    if isinstance(breaks, dict):
+        # Single break in the {"time": ..., "after_period": n} timetable format
+        breaks = [breaks] if "after_period" in breaks else [
+            {"label": label, **value} for label, value in breaks.items() if isinstance(value, dict)
+        ]
+    normalized_breaks = []
+    for i, brk in enumerate(breaks):
+        minutes = brk.get("minutes")
+        if minutes is None and "time" in brk and "-" in str(brk["time"]):
+            start, end = str(brk["time"]).split("-")
+            minutes = _parse_time(end) - _parse_time(start)
+        normalized_breaks.append({
+            "after_period": int(brk["after_period"]),
+            "label": brk.get("label") or ("Break" if len(breaks) == 1 else f"Break {i + 1}"),
+            "minutes": int(minutes or 15),
+        })
+    normalized_breaks.sort(key=lambda b: b["after_period"])
+
+    subjects = raw.get("subjects") or []
+    if isinstance(subjects, dict):
+        subjects = [{"name": name, "periods_per_week": count} for name, count in subjects.items()]
+    normalized_subjects = []
+    for subject in subjects:
+        per_week = int(subject.get("periods_per_week", 0))
+        if per_week <= 0:
+            continue
+        normalized_subjects.append({
+            "name": str(subject["name"]),
+            "periods_per_week": per_week,
+            "teacher": subject.get("teacher") or None,
+            "room": subject.get("room") or None,
+            # Two a day by default; spreading across days is a soft preference
+            "max_per_day": int(subject.get("max_per_day") or max(2, math.ceil(per_week / len(days)))),
+            "preferred_periods": _as_int_list(subject.get("preferred_periods")),
+            "avoid_periods": _as_int_list(subject.get("avoid_periods")),
+        })
+
+    unavailable = []
+    for entry in raw.get("teacher_unavailable") or []:
+        entry_days = entry.get("days") or ([entry["day"]] if entry.get("day") else days)
+        unavailable.append({
+            "teacher": entry["teacher"],
+            "days": [d for d in entry_days if d in day_periods],
+            "periods": _as_int_list(entry.get("periods")),  # empty = whole day
+        })
+
+    return {
+        "days": days,
+        "day_periods": day_periods,
+        "start_time": raw.get("start_time"),
+        "period_minutes": int(raw.get("period_minutes") or 40),
+        "breaks": normalized_breaks,
+        "subjects": normalized_subjects,
+        "teacher_unavailable": unavailable,
+        "fixed": [
+            {"day": f["day"], "period": int(f["period"]), "subject": str(f["subject"])}
+            for f in raw.get("fixed") or []
+        ],
+        "free_label": raw.get("free_label") or FREE_PERIOD,
+    }
+
+
+class TimetableSolver:
+    """Backtracking search with forward checking for a weekly class timetable.
+
+    Every open slot gets exactly one subject (or the free-period filler).
+    Hard constraints: periods per subject, at most ``max_per_day`` per day,
+    teacher unavailability (including slots already taken elsewhere, via
+    ``busy``), rooms taken elsewhere (``room_busy``), avoided periods and
+    fixed slots. Slots are chosen by minimum
+    remaining values; subjects are tried tightest-first while preferring
+    preferred periods and avoiding back-to-back repeats. The search is fully
+    deterministic, so the same constraints always give the same timetable.
+    """
+
+    def __init__(self, constraints: Dict[str, Any], busy: Optional[Dict[str, set]] = None,
+                 max_nodes: int = 200000, room_busy: Optional[Dict[str, set]] = None):
+        self.c = normalize_constraints(constraints)
+        self.busy = busy or {}  # teacher -> {(day, period)} occupied by other classes
+        self.room_busy = room_busy or {}  # room -> {(day, period)} occupied by other classes
+        self.max_nodes = max_nodes
+        self.nodes = 0
+
+    def _setup(self):
+        c = self.c
+        self.days = c["days"]
+        self.slots = [(d, p) for d, day in enumerate(self.days) for p in range(1, c["day_periods"][day] + 1)]
+        self.grid: Dict[Tuple[int, int], str] = {}
+
+        fixed_counts: Dict[str, int] = {}
+        for f in c["fixed"]:
+            if f["day"] not in self.days or not 1 <= f["period"] <= c["day_periods"][f["day"]]:
+                raise TimetableError(f"Fixed slot {f['day']} period {f['period']} is outside the timetable")
+            self.grid[(self.days.index(f["day"]), f["period"])] = f["subject"]
+            fixed_counts[f["subject"]] = fixed_counts.get(f["subject"], 0) + 1
+
+        self.subjects = [dict(s) for s in c["subjects"]]
+        for s in self.subjects:
+            s["remaining"] = max(0, s["periods_per_week"] - fixed_counts.get(s["name"], 0))
+            s["per_day"] = [0] * len(self.days)
+            s["blocked"] = self._blocked_slots(s)
+        for (d, _), name in self.grid.items():
+            for s in self.subjects:
+                if s["name"] == name:
+                    s["per_day"][d] += 1
+
+        open_slots = len(self.slots) - len(self.grid)
+        demand = sum(s["remaining"] for s in self.subjects)
+        if demand > open_slots:
+            raise TimetableError(
+                f"Subjects need {demand} periods but only {open_slots} free periods exist in the week"
+            )
+        if demand < open_slots:
+            self.subjects.append({
+                "name": c["free_label"], "teacher": None, "remaining": open_slots - demand,
+                "max_per_day": max(c["day_periods"].values()), "per_day": [0] * len(self.days),
+                "preferred_periods": [], "avoid_periods": [], "blocked": set(), "filler": True,
+            })
+
+    def _blocked_slots(self, subject) -> set:
+        blocked = {(d, p) for d, p in self.slots if p in subject["avoid_periods"]}
+        teacher = subject["teacher"]
+        if teacher:
+            for entry in self.c["teacher_unavailable"]:
+                if entry["teacher"] != teacher:
+                    continue
+                for day in entry["days"]:
+                    d = self.days.index(day)
+                    periods = entry["periods"] or range(1, self.c["day_periods"][day] + 1)
+                    blocked.update((d, p) for p in periods)
+            for day, p in self.busy.get(teacher, ()):
+                if day in self.days:
+                    blocked.add((self.days.index(day), p))
+        for day, p in self.room_busy.get(subject["room"], ()) if subject["room"] else ():
+            if day in self.days:
+                blocked.add((self.days.index(day), p))
+        return blocked
+
+    def _allowed(self, s, slot) -> bool:
+        return (s["remaining"] > 0 and slot not in s["blocked"]
+                and s["per_day"][slot[0]] < s["max_per_day"])
+
+    def _capacity(self, s) -> int:
+        """Upper bound on how many more periods ``s`` can still get"""
+        per_day_open = [0] * len(self.days)
+        for slot in self.slots:
+            if slot not in self.grid and slot not in s["blocked"]:
+                per_day_open[slot[0]] += 1
+        return sum(min(s["max_per_day"] - s["per_day"][d], per_day_open[d]) for d in range(len(self.days)))
+
+    def _consistent(self) -> bool:
+        return all(self._capacity(s) >= s["remaining"] for s in self.subjects if s["remaining"])
+
+    def _order(self, slot, candidates):
+        d, p = slot
+        neighbours = {self.grid.get((d, p - 1)), self.grid.get((d, p + 1))}
+
+        def key(item):
+            i, s = item
+            tightness = s["remaining"] / max(1, self._capacity(s))
+            return (
+                s["name"] in neighbours,               # avoid back-to-back repeats
+                s["per_day"][d] if not s.get("filler") else 0,  # spread across the week
+                p not in s["preferred_periods"] if s["preferred_periods"] else False,
+                -tightness,                            # most constrained subject first
+                bool(s.get("filler")) and p <= 2,      # keep free periods out of the morning
+                i,
+            )
+        return [s for _, s in sorted(enumerate(candidates), key=key)]
+
+    def _search(self) -> bool:
+        if self.nodes >= self.max_nodes:
+            return False
+        self.nodes += 1
+
+        best_slot, best_candidates = None, None
+        for slot in self.slots:
+            if slot in self.grid:
+                continue
+            candidates = [s for s in self.subjects if self._allowed(s, slot)]
+            if best_candidates is None or len(candidates) < len(best_candidates):
+                best_slot, best_candidates = slot, candidates
+                if not candidates:
+                    return False
+        if best_slot is None:
+            return True
+
+        for s in self._order(best_slot, best_candidates):
+            self.grid[best_slot] = s["name"]
+            s["remaining"] -= 1
+            s["per_day"][best_slot[0]] += 1
+            if self._consistent() and self._search():
+                return True
+            del self.grid[best_slot]
+            s["remaining"] += 1
+            s["per_day"][best_slot[0]] -= 1
+        return False
+
+    def solve(self) -> Dict[str, Any]:
+        """Solve and return the timetable in the days/periods/schedule/breaks format"""
+        start = time.perf_counter()
+        self._setup()
+        short = [s["name"] for s in self.subjects if self._capacity(s) < s["remaining"]]
+        if short:
+            raise TimetableError(
+                f"Not enough available periods for: {', '.join(short)} "
+                f"(check teacher availability, avoided periods and max_per_day)"
+            )
+        if not self._search():
+            reason = "search limit reached" if self.nodes >= self.max_nodes else "constraints cannot all be met"
+            raise TimetableError(f"No valid timetable found ({reason})")
+        timetable = self._format()
+        timetable["solver"] = {
+            "solve_ms": round((time.perf_counter() - start) * 1000, 2),
+            "nodes": self.nodes,
+        }
+        return timetable
+
+    def _format(self) -> Dict[str, Any]:
+        c = self.c
+        teachers = {s["name"]: s["teacher"] for s in c["subjects"]}
+        rooms = {s["name"]: s["room"] for s in c["subjects"]}
+        breaks_after = {b["after_period"]: b for b in c["breaks"]}
+        longest = max(c["day_periods"].values())
+
+        # Period labels, with clock times when the school day start is known
+        periods, breaks = [], {}
+        clock = _parse_time(c["start_time"]) if c["start_time"] else None
+        for p in range(1, longest + 1):
+            label = f"Period {p}"
+            if clock is not None:
+                label += f" ({_format_time(clock)}-{_format_time(clock + c['period_minutes'])})"
+                clock += c["period_minutes"]
+            periods.append(label)
+            if p in breaks_after:
+                brk = breaks_after[p]
+                periods.append(brk["label"])
+                breaks[brk["label"]] = {"after_period": p}
+                if clock is not None:
+                    breaks[brk["label"]]["time"] = f"{_format_time(clock)}-{_format_time(clock + brk['minutes'])}"
+                    clock += brk["minutes"]
+
+        schedule, teacher_schedule, room_schedule = {}, {}, {}
+        for d, day in enumerate(self.days):
+            row, teacher_row, room_row = [], [], []
+            for p in range(1, longest + 1):
+                subject = self.grid.get((d, p), "") if p <= c["day_periods"][day] else ""
+                row.append(subject)
+                teacher_row.append(teachers.get(subject) or "")
+                room_row.append(rooms.get(subject) or "")
+                if p in breaks_after:
+                    row.append(breaks_after[p]["label"] if p < c["day_periods"][day] else "")
+                    teacher_row.append("")
+                    room_row.append("")
+            schedule[day] = row
+            teacher_schedule[day] = teacher_row
+            room_schedule[day] = room_row
+
+        timetable = {
+            "days": self.days,
+            "periods": periods,
+            "schedule": schedule,
+            "breaks": breaks,
+            "teachers": teacher_schedule,
+        }
+        if any(rooms.values()):
+            timetable["rooms"] = room_schedule
+        return timetable
+
+
+def solve_timetable(constraints: Dict[str, Any], busy: Optional[Dict[str, set]] = None,
+                    room_busy: Optional[Dict[str, set]] = None) -> Dict[str, Any]:
+    """Solve a weekly timetable from structured constraints"""
+    return TimetableSolver(constraints, busy=busy, room_busy=room_busy).solve()
@@ -2,36 +2,256 @@
 import pdfplumber
 import pandas as pd
 from io import BytesIO
-import speech_recognition as sr
-from typing import Union
 import soundfile as sf
 import io
 import numpy as np
-from typing import Optional
+import datetime
+import hashlib
+import math
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from config import Config
+from .audio import preprocess_audio
+from .stt import transcribe_audio
+
+# sha256 of an uploaded file -> extracted text, so re-uploads are free
+_extraction_cache: "OrderedDict[str, str]" = OrderedDict()
+_extraction_lock = threading.Lock()
+_pdf_executor = None
+
+def _cached(key: str) -> Optional[str]:
+    with _extraction_lock:
+        if key in _extraction_cache:
+            _extraction_cache.move_to_end(key)
+            return _extraction_cache[key]
+    return None
+
+def _remember(key: str, text: str) -> str:
+    with _extraction_lock:
+        _extraction_cache[key] = text
+        _extraction_cache.move_to_end(key)
+        while len(_extraction_cache) > Config.EXTRACTION_CACHE_ENTRIES:
+            _extraction_cache.popitem(last=False)
+    return text
+
+def _clean_cell(cell) -> str:
+    return " ".join(str(cell).split()) if cell is not None else ""
+
+def _extract_page(page) -> str:
+    """Text of one page with its tables kept as tab-separated rows"""
+    tables = page.find_tables()
+    bboxes = [table.bbox for table in tables]
+
+    def outside_tables(obj):
+        if "x0" not in obj or "top" not in obj:
+            return True
+        x = (obj["x0"] + obj["x1"]) / 2
+        y = (obj["top"] + obj["bottom"]) / 2
+        return not any(x0 <= x <= x1 and top <= y <= bottom for x0, top, x1, bottom in bboxes)
+
+    parts = []
+    text = (page.filter(outside_tables) if bboxes else page).extract_text()
+    if text and text.strip():
+        parts.append(text.strip())
+    for i, table in enumerate(tables, 1):
+        rows = [[_clean_cell(cell) for cell in row] for row in table.extract()]
+        rows = [row for row in rows if any(row)]
+        if rows:
+            parts.append(f"[Table {i}]\n" + "\n".join("\t".join(row) for row in rows))
+    return "\n".join(parts)
+
+def _extract_pages(file_bytes: bytes, page_numbers: List[int]) -> List[Tuple[int, str]]:
+    """Worker entry point: each worker opens its own copy of the document"""
+    with pdfplumber.open(BytesIO(file_bytes)) as pdf:
+        return [(n, _extract_page(pdf.pages[n])) for n in page_numbers]
 
 def extract_text_from_pdf(file_bytes: bytes) -> str:
-    """Extract text content from PDF file"""
+    """Extract text content from PDF file.
+
+    Tables (e.g. last year's timetable) come out as tab-separated rows
+    instead of flattened text. Large documents are split across a process
+    pool, and results are cached by file hash.
+    """
+    key = hashlib.sha256(file_bytes).hexdigest()
+    cached = _cached(key)
+    if cached is not None:
+        return cached
+
     with pdfplumber.open(BytesIO(file_bytes)) as pdf:
-        text = "\n".join(page.extract_text() for page in pdf.pages if page.extract_text())
-    return text
+        page_count = len(pdf.pages)
+    workers = min(Config.PDF_EXTRACT_WORKERS, page_count)
+
+    if page_count < Config.PDF_PARALLEL_MIN_PAGES or workers <= 1:
+        pages = _extract_pages(file_bytes, list(range(page_count)))
+    else:
+        global _pdf_executor
+        if _pdf_executor is None:
+            _pdf_executor = ProcessPoolExecutor(max_workers=Config.PDF_EXTRACT_WORKERS)
+        chunks = [list(range(page_count))[i::workers] for i in range(workers)]
+        pages = [page for result in _pdf_executor.map(_extract_pages, [file_bytes] * workers, chunks)
+                 for page in result]
+
+    text = "\n\n".join(page_text for _, page_text in sorted(pages) if page_text)
+    return _remember(key, text)
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count (~4 bytes per token; UTF-8 bytes weigh Indic scripts fairly)"""
+    return math.ceil(len(text.encode("utf-8")) / 4)
+
+def _format_cell(value) -> str:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, datetime.datetime):
+        return value.strftime("%Y-%m-%d %H:%M") if (value.hour or value.minute) else value.strftime("%Y-%m-%d")
+    if isinstance(value, datetime.time):
+        return value.strftime("%H:%M")
+    return " ".join(str(value).split())
+
+_DAY_PREFIXES = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+def _kind(cell: str) -> str:
+    """Rough type of a cell, used to tell a header row from data rows"""
+    if not cell:
+        return "blank"
+    if re.fullmatch(r"\d{1,2}:\d{2}(\s*-\s*\d{1,2}:\d{2})?", cell):
+        return "time"
+    if cell.replace(".", "", 1).isdigit():
+        return "number"
+    if cell.isalpha() and len(cell) <= 9 and cell[:3].lower() in _DAY_PREFIXES:
+        return "day"
+    return "text"
+
+def _looks_like_header(row: List[str], below: pd.DataFrame) -> bool:
+    """A header differs from the rows under it: a blank top-left corner,
+    a cell of another kind than its column (``Day``/``1`` over ``Mon``/
+    ``Maths``), or labels that never recur in columns whose values do"""
+    if not row[0] and below.iloc[:, 0].ne("").any():
+        return True
+    repeats = False
+    for position, cell in enumerate(row):
+        column = [c for c in below.iloc[:, position] if c]
+        if not column or not cell:
+            continue
+        kinds = [_kind(c) for c in column]
+        if _kind(cell) != max(set(kinds), key=kinds.count):
+            return True
+        if cell in column:
+            return False
+        repeats = repeats or len(set(column)) < len(column)
+    return repeats
+
+def _header_row(frame: pd.DataFrame) -> Optional[int]:
+    """Index of the header row, or None for a sheet without one.
+
+    The candidate is the first of the top rows that spans the table (a blank
+    top-left cell is allowed); rows above it are titles. It is only taken as
+    the header when the rows after it look different from it.
+    """
+    top = frame.head(10)
+    widest = top.ne("").sum(axis=1).max()
+    for i in range(len(top)):
+        row = list(top.iloc[i])
+        filled = sum(1 for c in row if c)
+        if filled == widest or (filled == widest - 1 and not row[0]):
+            below = frame.iloc[i + 1:i + 21]
+            return i if not below.empty and _looks_like_header(row, below) else None
+    return None
+
+def encode_sheet(name: str, raw: pd.DataFrame) -> Dict[str, Any]:
+    """Trim one sheet and split it into title lines, header and data rows"""
+    frame = raw.apply(lambda column: column.map(_format_cell))
+    frame = frame.loc[frame.ne("").any(axis=1), frame.ne("").any(axis=0)].reset_index(drop=True)
+    if frame.empty:
+        return {"name": name, "title": [], "header": [], "rows": []}
+
+    header_at = _header_row(frame)
+    title, header = [], []
+    if header_at is not None:
+        title = [" ".join(c for c in row if c) for row in frame.iloc[:header_at].itertuples(index=False)]
+        # Merged header cells arrive as one label followed by blanks
+        header = frame.iloc[header_at].replace("", np.nan).ffill().fillna("").tolist()
+        frame = frame.iloc[header_at + 1:]
+    rows = [list(row) for row in frame.itertuples(index=False)]
+    return {"name": name, "title": title, "header": header, "rows": rows}
+
+def encode_excel(file_bytes: bytes, token_budget: Optional[int] = None) -> Dict[str, Any]:
+    """Compact TSV encoding of every sheet in a workbook, within a token budget.
+
+    Empty rows and columns are dropped and header rows detected. When the
+    workbook is over budget, small sheets are kept whole and larger ones keep
+    their header and as many rows as their share of the budget allows, with
+    a note of how many rows were omitted.
+    """
+    budget = token_budget or Config.EXCEL_TOKEN_BUDGET
+    sheets = pd.read_excel(BytesIO(file_bytes), sheet_name=None, header=None)
+    encoded = [encode_sheet(name, frame) for name, frame in sheets.items()]
+    encoded = [sheet for sheet in encoded if sheet["header"] or sheet["rows"]]
+
+    def head(sheet):
+        lines = [f"## Sheet: {sheet['name']} ({len(sheet['rows'])} rows x "
+                 f"{len(sheet['header']) or len(sheet['rows'][0])} columns)"]
+        lines += [f"Title: {line}" for line in sheet["title"]]
+        if sheet["header"]:
+            lines.append("\t".join(sheet["header"]))
+        return "\n".join(lines)
+
+    def tsv(rows):
+        return ["\t".join(row).rstrip("\t") for row in rows]
+
+    sizes = [estimate_tokens(head(s)) + estimate_tokens("\n".join(tsv(s["rows"]))) for s in encoded]
+    total = sum(sizes)
+
+    # Split the budget so small sheets stay whole and big ones share the rest
+    allowances = {}
+    remaining = budget
+    order = sorted(range(len(encoded)), key=lambda i: sizes[i])
+    for position, i in enumerate(order):
+        allowances[i] = max(estimate_tokens(head(encoded[i])), min(sizes[i], remaining // (len(order) - position)))
+        remaining -= allowances[i]
+
+    blocks, truncated = [], False
+    for i, sheet in enumerate(encoded):
+        lines = tsv(sheet["rows"])
+        if sizes[i] > allowances[i]:
+            used = estimate_tokens(head(sheet))
+            kept = []
+            for line in lines:
+                cost = estimate_tokens(line) + 1
+                if used + cost > allowances[i]:
+                    break
+                kept.append(line)
+                used += cost
+            truncated = True
+            kept.append(f"... {len(lines) - len(kept)} more rows omitted")
+            lines = kept
+        blocks.append("\n".join([head(sheet)] + lines))
+
+    text = "\n\n".join(blocks)
+    return {
+        "text": text,
+        "sheets": [sheet["name"] for sheet in encoded],
+        "token_estimate": estimate_tokens(text),
+        "original_token_estimate": total,
+        "truncated": truncated,
+    }
 
 def extract_text_from_excel(file_bytes: bytes) -> str:
-    """Extract text content from Excel file"""
-    df = pd.read_excel(BytesIO(file_bytes))
-    return df.to_string()
+    """Extract text content from Excel file as compact per-sheet TSV (cached by file hash)"""
+    key = f"xlsx:{Config.EXCEL_TOKEN_BUDGET}:{hashlib.sha256(file_bytes).hexdigest()}"
+    cached = _cached(key)
+    if cached is not None:
+        return cached
+    return _remember(key, encode_excel(file_bytes)["text"])
 
 def speech_to_text(audio_file: bytes) -> str:
-    """Convert speech to text using Google's speech recognition"""
-    recognizer = sr.Recognizer()
-    with sr.AudioFile(BytesIO(audio_file)) as source:
-        audio_data = recognizer.record(source)
-        try:
-            text = recognizer.recognize_google(audio_data)
-            return text
-        except sr.UnknownValueError:
-            return "Could not understand audio"
-        except sr.RequestError:
-            return "API unavailable"
+    """Convert a recording (WAV/FLAC/OGG, or raw int16) to text with the configured STT backend"""
+    text = transcribe_audio(audio_file)
+    return text or "Could not understand audio"
 
 def format_schedule_as_table(schedule_data: dict) -> str:
     """Format schedule data as a markdown table"""
@@ -46,10 +266,9 @@ def format_schedule_as_table(schedule_data: dict) -> str:
     return df.to_markdown()
 
 def process_audio_buffer(audio_buffer: bytes) -> Optional[bytes]:
-    """Convert audio buffer to WAV format"""
+    """Convert an audio buffer to 16 kHz mono WAV with silence trimmed"""
     try:
-        # Convert bytes to numpy array
-        audio_array = np.frombuffer(audio_buffer, dtype=np.int16)
+        audio_array, _ = preprocess_audio(audio_buffer)
         
         # Convert to WAV format in memory
         with io.BytesIO() as wav_buffer:
@@ -3,4 +3,36 @@ import os
 class Config:
     BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
     OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama2")
-    AUDIO_SAMPLE_RATE = 16000
\ No newline at end of file
+    OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+    # How long Ollama keeps the model loaded after a request (e.g. "30m", "-1")
+    OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+    AUDIO_SAMPLE_RATE = 16000
+
+    # Document extraction: worker processes for large PDFs, cached results by file hash
+    PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", "4"))
+    PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))
+    EXTRACTION_CACHE_ENTRIES = int(os.getenv("EXTRACTION_CACHE_ENTRIES", "32"))
+    # Uploaded workbooks are truncated to roughly this many prompt tokens
+    EXCEL_TOKEN_BUDGET = int(os.getenv("EXCEL_TOKEN_BUDGET", "3000"))
+
+    # Speech-to-text: "auto" prefers on-device engines (vosk, then whisper) over google
+    STT_BACKEND = os.getenv("STT_BACKEND", "auto")
+    VOSK_MODEL_PATH = os.getenv("VOSK_MODEL_PATH", os.path.join("models", "vosk-model-small-en-in-0.4"))
+    WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
+    STT_LANGUAGE = os.getenv("STT_LANGUAGE", "en")
+    STT_CHUNK_SECONDS = float(os.getenv("STT_CHUNK_SECONDS", "0.5"))
+
+    # Versioned schedules: one JSON file per schedule id, full snapshot every N versions
+    SCHEDULE_STORE_DIR = os.getenv("SCHEDULE_STORE_DIR", os.path.join("data", "schedules"))
+    SCHEDULE_SNAPSHOT_EVERY = int(os.getenv("SCHEDULE_SNAPSHOT_EVERY", "20"))
+
+    # Annual/monthly lesson plans are generated per segment ("term" or "month")
+    ANNUAL_PLAN_SPLIT = os.getenv("ANNUAL_PLAN_SPLIT", "term")
+    LESSON_PLAN_CONCURRENCY = int(os.getenv("LESSON_PLAN_CONCURRENCY", "3"))
+
+    # Whole-school timetabling: worker processes for independent groups of sections
+    SCHOOL_PLAN_WORKERS = int(os.getenv("SCHOOL_PLAN_WORKERS", str(os.cpu_count() or 2)))
+    SCHOOL_PARALLEL_MIN_SECTIONS = int(os.getenv("SCHOOL_PARALLEL_MIN_SECTIONS", "8"))
+    SCHOOL_PLAN_RETRIES = int(os.getenv("SCHOOL_PLAN_RETRIES", "5"))
+    # Finished whole-school jobs kept in memory for polling (oldest are dropped first)
+    SCHOOL_MAX_FINISHED_JOBS = int(os.getenv("SCHOOL_MAX_FINISHED_JOBS", "100"))
@@ -6,17 +6,26 @@ from session_manager import init_session_state, safe_get
 from backend.utils import (
     extract_text_from_pdf, 
     extract_text_from_excel,
-    process_audio
+    estimate_tokens
 )
+from backend.audio import AudioPreprocessor, TARGET_RATE, frame_to_mono
+from backend.stt import get_stt_engine, stt_metrics, REPORTED_METRICS, warm_up_stt_in_background
 from streamlit_webrtc import webrtc_streamer, WebRtcMode
-from av import AudioFrame
-import numpy as np
-import io
-import soundfile as sf
+import json
+import time
 
 # Initialize session state
 init_session_state()
 
+@st.cache_resource
+def warm_up_live_stt():
+    """The live recorder transcribes in this process, so load its speech model
+    here once per server start instead of on the first recording"""
+    warm_up_stt_in_background()
+    return True
+
+warm_up_live_stt()
+
 # Configuration
 BACKEND_URL = "http://localhost:8000"
 
@@ -40,6 +49,17 @@ def display_schedule(schedule_data):
     else:
         st.write(schedule_data)
 
+def report_stt_metrics():
+    """Send the live recorder's latency to the API so /stt_metrics covers it"""
+    try:
+        requests.post(
+            f"{BACKEND_URL}/stt_metrics",
+            json={key: stt_metrics[key] for key in REPORTED_METRICS if key in stt_metrics},
+            timeout=5
+        )
+    except requests.RequestException as e:
+        print(f"Could not report speech-to-text metrics: {e}")
+
 def voice_recorder():
     ctx = webrtc_streamer(
         key="voice-recorder",
@@ -50,18 +70,28 @@ def voice_recorder():
     
     if ctx.audio_receiver:
         st.info("Recording... Speak now")
-        audio_frames = []
+        # Transcribe while recording so the text is ready when speech stops
+        stream = None
+        preprocessor = None
+        partial_text = st.empty()
         while True:
             frame = ctx.audio_receiver.get_frame()
             if frame is None:
                 break
-            audio_frames.append(frame.to_ndarray())
+            if stream is None:
+                # Browser audio is usually 48 kHz stereo; recognizers want 16 kHz mono speech
+                preprocessor = AudioPreprocessor(frame.sample_rate)
+                stream = get_stt_engine().open_stream(TARGET_RATE)
+            samples = preprocessor.process(frame_to_mono(frame))
+            if not len(samples):
+                continue
+            partial = stream.feed(samples)
+            if partial:
+                partial_text.caption(partial)
         
-        if audio_frames:
-            audio_array = np.concatenate(audio_frames)
-            wav_bytes = io.BytesIO()
-            sf.write(wav_bytes, audio_array, samplerate=44100, format='WAV')
-            text = process_audio(wav_bytes.getvalue())
+        if stream is not None:
+            text = stream.finish()
+            report_stt_metrics()
             st.session_state.multi_input['voice'] = text
             st.success("Voice note captured!")
 
@@ -70,7 +100,16 @@ def handle_api_response(response):
         result = response.json()
         if result.get("status") == "success":
             st.session_state.current_schedule = result["schedule"]
-            st.session_state.schedule_history.append(result["schedule"])
+            st.session_state.schedule_id = result.get("schedule_id")
+            st.session_state.schedule_version = result.get("version")
+            for conflict in result.get("conflicts", []):
+                st.warning(
+                    f"{conflict['type'].capitalize()} {conflict['resource']} is double-booked on "
+                    f"{conflict['day']} {conflict['period']} ({', '.join(conflict['sections'])})"
+                )
+            refinement = result.get("refinement")
+            if refinement and refinement.get("mode") == "patch":
+                st.toast(f"Applied {len(refinement['operations'])} edit(s) to the schedule")
             return True
         else:
             st.error(f"Error: {result.get('message', 'Unknown error')}")
@@ -101,6 +140,7 @@ if doc_file:
     else:
         doc_text = extract_text_from_excel(doc_file.read())
     st.session_state.multi_input['document'] = doc_text
+    st.caption(f"Extracted about {estimate_tokens(doc_text)} tokens from {doc_file.name}")
 
 # Text Instructions
 st.session_state.multi_input['text'] = st.text_area(
@@ -135,6 +175,61 @@ if st.button("Generate Schedule"):
             except Exception as e:
                 st.error(f"Connection error: {str(e)}")
 
+# Whole-school timetables: every section in one clash-free batch
+with st.expander("Timetables for the whole school"):
+    st.caption(
+        'Sections as JSON: {"shared": {"periods_per_day": 8, "teacher_unavailable": [...]}, '
+        '"sections": [{"section_id": "7A", "constraints": {"subjects": [...]}}, '
+        '{"section_id": "7B", "requirements": "Math 6 periods with Mrs. Rao, ..."}]}'
+    )
+    batch_text = st.text_area("School sections", height=150)
+    if st.button("Plan All Sections"):
+        try:
+            payload = json.loads(batch_text)
+            job = requests.post(f"{BACKEND_URL}/timetables/batch", json=payload).json()
+            if job.get("status") != "success":
+                st.error(f"Error: {job.get('message', 'Unknown error')}")
+            else:
+                progress_bar = st.progress(0.0, text="Planning sections...")
+                while True:
+                    status = requests.get(f"{BACKEND_URL}/timetables/batch/{job['job_id']}").json()
+                    progress_bar.progress(
+                        status.get("done", 0) / max(1, status.get("total", 1)),
+                        text=f"{status.get('phase', '').capitalize()}: {status.get('done', 0)}/{status.get('total', 0)}"
+                    )
+                    if status.get("status") != "running":
+                        break
+                    time.sleep(0.5)
+                if status.get("status") == "completed":
+                    st.session_state.school_timetables = status
+                else:
+                    st.error(f"Error: {status.get('message', 'Unknown error')}")
+        except json.JSONDecodeError as e:
+            st.error(f"Invalid JSON: {str(e)}")
+        except Exception as e:
+            st.error(f"Connection error: {str(e)}")
+
+    school = safe_get('school_timetables')
+    if school:
+        failed = {k: v for k, v in school["sections"].items() if v.get("status") != "success"}
+        st.success(
+            f"Planned {len(school['sections']) - len(failed)} of {len(school['sections'])} sections "
+            f"in {school.get('elapsed_seconds', 0)}s"
+        )
+        for conflict in school.get("conflicts", []):
+            st.warning(f"{conflict['resource']} double-booked on {conflict['day']} {conflict['period']}")
+        for section_id, result in failed.items():
+            st.error(f"{section_id}: {result.get('message')}")
+        planned = [k for k in school["sections"] if k not in failed]
+        if planned:
+            chosen = st.selectbox("Section", planned)
+            display_schedule(school["sections"][chosen]["schedule"])
+            if st.button("Refine this section"):
+                st.session_state.current_schedule = school["sections"][chosen]["schedule"]
+                st.session_state.schedule_id = school["sections"][chosen].get("schedule_id")
+                st.session_state.schedule_version = 1
+                st.rerun()
+
 # Refinement Section - Only show if we have a current schedule
 current_schedule = safe_get('current_schedule')
 if current_schedule:
@@ -147,6 +242,7 @@ if current_schedule:
     
     with col2:
         st.subheader("Make Changes")
+        section_id = st.text_input("Class / Section", help="Used to check teacher and room clashes with other sections")
         refine_method = st.radio("Refinement Method",
                                ["Text Instructions", "Voice Notes", "Both"],
                                horizontal=True)
@@ -162,8 +258,12 @@ if current_schedule:
             feedback = {
                 "text": new_text,
                 "voice": st.session_state.multi_input['voice'],
-                "current_schedule": current_schedule
+                "section_id": section_id
             }
+            if safe_get('schedule_id'):
+                feedback["schedule_id"] = st.session_state.schedule_id
+            else:
+                feedback["current_schedule"] = current_schedule
             
             try:
                 response = requests.post(
@@ -175,5 +275,33 @@ if current_schedule:
                     st.rerun()
             except Exception as e:
                 st.error(f"Connection error: {str(e)}")
+
+    schedule_id = safe_get('schedule_id')
+    if schedule_id and (safe_get('schedule_version') or 0) > 1:
+        with st.expander(f"Version history (current: v{st.session_state.schedule_version})"):
+            try:
+                history = requests.get(f"{BACKEND_URL}/schedules/{schedule_id}/history").json()
+                versions = history.get("versions", [])
+                labels = {
+                    v["version"]: f"v{v['version']} · {v.get('note') or v.get('source', '')}"
+                    for v in versions
+                }
+                chosen = st.selectbox("Compare with", list(labels)[:-1], format_func=labels.get)
+                if chosen:
+                    diff = requests.get(
+                        f"{BACKEND_URL}/schedules/{schedule_id}/diff",
+                        params={"from_version": chosen}
+                    ).json()
+                    st.caption(f"{len(diff.get('operations', []))} change(s) since v{chosen}")
+                    st.json(diff.get("operations", []), expanded=False)
+                    if st.button(f"Restore v{chosen}"):
+                        response = requests.post(
+                            f"{BACKEND_URL}/schedules/{schedule_id}/rollback",
+                            json={"version": chosen}
+                        )
+                        if handle_api_response(response):
+                            st.rerun()
+            except Exception as e:
+                st.error(f"Connection error: {str(e)}")
 else:
     st.info("Please generate a schedule first to enable refinement")
\ No newline at end of file
@@ -4,7 +4,9 @@ def init_session_state():
     """Initialize all session state variables with default values"""
     defaults = {
         'current_schedule': None,
-        'schedule_history': [],
+        'schedule_id': None,  # Versions live on the server, keyed by this id
+        'schedule_version': None,
+        'school_timetables': None,  # Last whole-school batch result
         'multi_input': {
             'document': None,
             'text': "",
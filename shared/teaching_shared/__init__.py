@@ -0,0 +1,2 @@
+# teaching_shared/__init__.py
+"""Helpers shared by the quiz, documents, scheduling and RAG services."""
@@ -0,0 +1,150 @@
+# teaching_shared/llm_runtime.py
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+import requests
+
+try:
+    from langchain_core.callbacks import BaseCallbackHandler
+except ImportError:
+    # Older langchain releases without langchain_core
+    from langchain.callbacks.base import BaseCallbackHandler
+
+# Warm-up probe results plus latency of real requests, served by /llm_metrics
+llm_metrics: Dict[str, Any] = {}
+
+
+def measure_ttft(model: str, prompt: str, base_url: str,
+                 keep_alive: str) -> Optional[float]:
+    """Seconds until Ollama streams the first token for ``prompt``"""
+    start = time.perf_counter()
+    try:
+        with requests.post(
+            f"{base_url}/api/generate",
+            json={
+                "model": model,
+                "prompt": prompt,
+                "keep_alive": keep_alive,
+                "stream": True,
+                "options": {"num_predict": 1},
+            },
+            stream=True,
+            timeout=300,
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line and json.loads(line).get("response") is not None:
+                    return time.perf_counter() - start
+    except Exception as e:
+        print(f"Error measuring time to first token: {e}")
+    return None
+
+
+def warm_up(model: str, base_url: str, keep_alive: str, prefix: str = "") -> dict:
+    """Load the model and prime Ollama's prompt cache with the static prefix.
+
+    The first probe pays the model load (cold); the second reuses the
+    loaded model and the cached prefix (warm).
+    """
+    prompt = prefix or "Hello"
+    llm_metrics["warm_up"] = {
+        "model": model,
+        "keep_alive": keep_alive,
+        "ttft_cold_seconds": measure_ttft(model, prompt, base_url, keep_alive),
+        "ttft_warm_seconds": measure_ttft(model, prompt, base_url, keep_alive),
+        "warmed_up_at": time.time(),
+    }
+    print(f"LLM warm-up: {llm_metrics['warm_up']}")
+    return llm_metrics
+
+
+def warm_up_in_background(model: str, base_url: str, keep_alive: str,
+                          prefix: str = ""):
+    """Run warm_up without delaying API startup"""
+    threading.Thread(
+        target=warm_up, args=(model, base_url, keep_alive, prefix), daemon=True
+    ).start()
+
+
+def _summary(values) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return {
+        "last": round(values[-1], 3),
+        "p50": round(ordered[len(ordered) // 2], 3),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+    }
+
+
+class RequestTimer(BaseCallbackHandler):
+    """LangChain callback that times every real LLM call.
+
+    Time to first token comes from the first streamed token when the call
+    streams, otherwise from Ollama's own load + prompt-evaluation durations
+    in the response. Results over the last ``window`` calls are published
+    under ``llm_metrics["requests"]``.
+    """
+
+    def __init__(self, window: int = 200):
+        self._runs: Dict[Any, Dict[str, float]] = {}
+        self._ttft = deque(maxlen=window)
+        self._latency = deque(maxlen=window)
+        self._count = 0
+        self._errors = 0
+        self._lock = threading.Lock()
+
+    def on_llm_start(self, serialized, prompts, *, run_id=None, **kwargs):
+        with self._lock:
+            self._runs[run_id] = {"start": time.perf_counter()}
+
+    def on_llm_new_token(self, token, *, run_id=None, **kwargs):
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is not None and "first_token" not in run:
+                run["first_token"] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id=None, **kwargs):
+        end = time.perf_counter()
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+            if run is None:
+                return
+            ttft = run["first_token"] - run["start"] if "first_token" in run else _ollama_ttft(response)
+            self._count += 1
+            self._latency.append(end - run["start"])
+            if ttft is not None:
+                self._ttft.append(ttft)
+            self._publish()
+
+    def on_llm_error(self, error, *, run_id=None, **kwargs):
+        with self._lock:
+            self._runs.pop(run_id, None)
+            self._errors += 1
+            self._publish()
+
+    def _publish(self):
+        llm_metrics["requests"] = {
+            "count": self._count,
+            "errors": self._errors,
+            "ttft_seconds": _summary(list(self._ttft)),
+            "latency_seconds": _summary(list(self._latency)),
+        }
+
+
+def _ollama_ttft(response) -> Optional[float]:
+    """Load + prompt evaluation time reported by Ollama (nanoseconds) for a non-streamed call"""
+    try:
+        info = response.generations[0][0].generation_info or {}
+    except (AttributeError, IndexError):
+        return None
+    if "prompt_eval_duration" not in info:
+        return None
+    return (info.get("load_duration", 0) + info["prompt_eval_duration"]) / 1e9
+
+
+# One timer per process; pass ``callbacks=[request_timer]`` when creating the LLM
+request_timer = RequestTimer()